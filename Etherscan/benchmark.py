@@ -0,0 +1,524 @@
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from run_all import (
+    _collect_import_closure,
+    _detect_vyper_file,
+    _ensure_solc,
+    _iter_addresses,
+    _iter_project_solidity_files,
+    _peak_rss_kb,
+    _pick_solidity_root,
+    _reset_peak_rss,
+    _resolve_addr_dir,
+    _select_solc_version_for_files,
+    _solc_remaps,
+)
+
+
+def _load_address(addr: str) -> Any:
+    """
+    Compile and analyze one address of the corpus the way run_all.py does, returning the ContractPreprocess.
+    """
+    from contract_preprocess import ContractPreprocess  # pylint: disable=import-outside-toplevel
+
+    target, kwargs = _address_target(addr)
+    return ContractPreprocess(target, **kwargs)
+
+
+def _address_target(addr: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    ContractPreprocess target and kwargs (resolved compiler) of one address, as run_all.py compiles it
+    """
+    addr_dir = _resolve_addr_dir(addr)
+    if addr_dir is None or not addr_dir.is_dir():
+        raise FileNotFoundError(f"no source directory for {addr}")
+
+    vyper_file = _detect_vyper_file(addr_dir)
+    if vyper_file is not None:
+        from contract_preprocess.tools.preprocess.vyper_support import (  # pylint: disable=import-outside-toplevel
+            detect_vyper_version_spec,
+            ensure_vyper_binary,
+            resolve_vyper_version,
+        )
+
+        version = resolve_vyper_version(detect_vyper_version_spec(vyper_file.read_text(encoding="utf8")))
+        if version is None:
+            raise RuntimeError(f"cannot resolve a Vyper version for {vyper_file}")
+        cache_dir = Path(os.environ.get("CONTRACT_PREPROCESS_CACHE", Path.home() / ".cache")) / "contract-preprocess"
+        return str(vyper_file), {"vyper": str(ensure_vyper_binary(version, cache_dir=cache_dir))}
+
+    sol_files = _iter_project_solidity_files(addr_dir)
+    root = _pick_solidity_root(addr_dir, sol_files)
+    if root is None:
+        raise FileNotFoundError(f"no Solidity/Vyper sources for {addr}")
+    closure = _collect_import_closure(addr_dir, root)
+    solc_ver = _select_solc_version_for_files(closure) or _select_solc_version_for_files(sol_files) or "0.8.24"
+    kwargs: Dict[str, Any] = {"solc": str(_ensure_solc(solc_ver)), "compile_force_framework": "solc"}
+    remaps = _solc_remaps(addr_dir)
+    if remaps:
+        kwargs["solc_remaps"] = remaps
+    return str(root), kwargs
+
+
+def _iter_loaded(addrs: List[str]) -> Iterator[Tuple[str, Any]]:
+    for addr in addrs:
+        try:
+            yield addr, _load_address(addr)
+        except Exception as e:  # pylint: disable=broad-except
+            print(f"SKIP\t{addr}\t{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ''}", flush=True)
+
+
+def _iter_functions(instance: Any) -> Iterator[Any]:
+    for compilation_unit in instance.compilation_units:
+        for function in compilation_unit.functions_and_modifiers:
+            if function.nodes:
+                yield function
+
+
+def _timed(f: Callable[[], Any]) -> Tuple[float, Any]:
+    started = time.perf_counter()
+    ret = f()
+    return time.perf_counter() - started, ret
+
+
+# ---------------------------------------------------------------------------
+# dominators
+# ---------------------------------------------------------------------------
+
+
+def _reference_dominators(nodes: List[Any]) -> Dict[Any, Optional[Any]]:
+    """
+    Former core/dominators/utils.py engine (set intersections until fixpoint, then a scan of the
+    candidate sets), on side tables. Returns the immediate dominator of each node.
+    """
+    dominators: Dict[Any, Set[Any]] = {n: set(nodes) for n in nodes}
+
+    def intersection_predecessor(node: Any) -> Set[Any]:
+        if not node.fathers:
+            return set()
+        if not any(father.is_reachable for father in node.fathers):
+            return set()
+        ret: Set[Any] = set()
+        for pred in node.fathers:
+            ret = ret.union(dominators.get(pred, set()))
+        for pred in node.fathers:
+            if pred.is_reachable:
+                ret = ret.intersection(dominators.get(pred, set()))
+        return ret
+
+    changed = True
+    while changed:
+        changed = False
+        for node in nodes:
+            new_set = intersection_predecessor(node).union({node})
+            if new_set != dominators[node]:
+                dominators[node] = new_set
+                changed = True
+
+    idoms: Dict[Any, Optional[Any]] = {}
+    for node in nodes:
+        idom_candidates = set(dominators[node])
+        idom_candidates.remove(node)
+        idoms[node] = None
+        if len(idom_candidates) == 1:
+            idoms[node] = idom_candidates.pop()
+            continue
+        all_dominators: Set[Any] = set()
+        for d in idom_candidates:
+            if d in all_dominators:
+                continue
+            all_dominators |= dominators[d] - {d}
+        idom_candidates = all_dominators.symmetric_difference(idom_candidates)
+        if idom_candidates:
+            idoms[node] = idom_candidates.pop()
+    return idoms
+
+
+def _bench_dominators(args: argparse.Namespace) -> int:
+    from contract_preprocess.core.dominators.utils import (  # pylint: disable=import-outside-toplevel
+        compute_dominators,
+    )
+
+    total_ref = total_new = 0.0
+    mismatches = 0
+    print("addr\tfunctions\tnodes\treference_s\tcurrent_s", flush=True)
+    for addr, instance in _iter_loaded(args.addresses or _iter_addresses()):
+        ref_s = new_s = 0.0
+        n_functions = n_nodes = 0
+        for function in _iter_functions(instance):
+            nodes = function.nodes
+            n_functions += 1
+            n_nodes += len(nodes)
+            for _ in range(args.repeat):
+                elapsed, idoms = _timed(lambda: _reference_dominators(nodes))  # pylint: disable=cell-var-from-loop
+                ref_s += elapsed
+                # compute_dominators is idempotent on an already analyzed function
+                new_s += _timed(lambda: compute_dominators(nodes))[0]  # pylint: disable=cell-var-from-loop
+            if any(idoms[n] is not n.immediate_dominator for n in nodes):
+                mismatches += 1
+                print(f"MISMATCH\t{addr}\t{function.canonical_name}", flush=True)
+        total_ref += ref_s
+        total_new += new_s
+        print(f"{addr}\t{n_functions}\t{n_nodes}\t{ref_s:.4f}\t{new_s:.4f}", flush=True)
+
+    speedup = total_ref / total_new if total_new else float("nan")
+    print(f"TOTAL\treference={total_ref:.4f}s\tcurrent={total_new:.4f}s\tspeedup={speedup:.1f}x")
+    return 1 if mismatches else 0
+
+
+# ---------------------------------------------------------------------------
+# memory
+# ---------------------------------------------------------------------------
+
+
+def _rss_kb() -> Optional[int]:
+    try:
+        with open("/proc/self/status", encoding="utf8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _measure_memory(target: str, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Peak RSS while analyzing one target, and the RSS still held by the analyzed model,
+    both relative to the process once contract_preprocess is imported.
+    """
+    from contract_preprocess import ContractPreprocess  # pylint: disable=import-outside-toplevel
+
+    gc.collect()
+    _reset_peak_rss()
+    before_kb = _rss_kb() or 0
+    instance = ContractPreprocess(target, **kwargs)
+    peak_kb = _peak_rss_kb() or 0
+    gc.collect()
+    retained_kb = (_rss_kb() or 0) - before_kb
+    functions = list(_iter_functions(instance))
+    nodes = [node for function in functions for node in function.nodes]
+    return {
+        "functions": len(functions),
+        "nodes": len(nodes),
+        "irs": sum(len(node.irs) + len(node.irs_ssa) for node in nodes),
+        "peak_kb": peak_kb - before_kb,
+        "retained_kb": retained_kb,
+    }
+
+
+def _measure_memory_in_child(
+    target: Tuple[str, Dict[str, Any]], pythonpath: Optional[str]
+) -> Optional[Dict[str, Any]]:
+    """
+    Run _measure_memory in a fresh interpreter (so that peaks do not carry over between addresses),
+    with contract_preprocess imported from pythonpath if given.
+    The compiler is resolved by the caller: the child only needs ContractPreprocess, which any revision has.
+    """
+    env = os.environ.copy()
+    if pythonpath:
+        env["PYTHONPATH"] = os.pathsep.join(p for p in (pythonpath, env.get("PYTHONPATH")) if p)
+    proc = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), "memory", "--child", json.dumps(target)],
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+        check=False,
+    )
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode != 0 or not lines:
+        return None
+    return json.loads(lines[-1])
+
+
+def _bench_memory(args: argparse.Namespace) -> int:
+    if args.child:
+        for target in args.addresses:
+            print(json.dumps(_measure_memory(*json.loads(target))), flush=True)
+        return 0
+
+    columns = ["peak_mb", "retained_mb"]
+    if args.baseline:
+        columns += ["baseline_peak_mb", "baseline_retained_mb"]
+    print("\t".join(["addr", "functions", "nodes", "irs"] + columns), flush=True)
+    totals = {c: 0.0 for c in columns}
+    for addr in args.addresses or _iter_addresses():
+        try:
+            target = _address_target(addr)
+        except Exception as e:  # pylint: disable=broad-except
+            print(f"SKIP\t{addr}\t{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ''}", flush=True)
+            continue
+        current = _measure_memory_in_child(target, None)
+        if current is None:
+            print(f"SKIP\t{addr}", flush=True)
+            continue
+        row = {"peak_mb": current["peak_kb"] / 1024, "retained_mb": current["retained_kb"] / 1024}
+        if args.baseline:
+            baseline = _measure_memory_in_child(target, args.baseline)
+            if baseline is None:
+                print(f"SKIP\t{addr}\tbaseline failed", flush=True)
+                continue
+            row["baseline_peak_mb"] = baseline["peak_kb"] / 1024
+            row["baseline_retained_mb"] = baseline["retained_kb"] / 1024
+        for c in columns:
+            totals[c] += row[c]
+        counts = [str(current[k]) for k in ("functions", "nodes", "irs")]
+        print("\t".join([addr] + counts + [f"{row[c]:.1f}" for c in columns]), flush=True)
+
+    print("TOTAL\t" + "\t".join(f"{c}={totals[c]:.1f}" for c in columns))
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# ir
+# ---------------------------------------------------------------------------
+
+
+def _bench_ir(args: argparse.Namespace) -> int:
+    """
+    Per-contract cost of the IR/SSA generation: the share of the largest contract of a compilation bounds what
+    converting the contracts concurrently could gain on it
+    """
+    # pylint: disable=import-outside-toplevel
+    from crytic_compile import CryticCompile
+    from contract_preprocess import ContractPreprocess
+    from contract_preprocess.solc_parsing.compilation_unit_solc import SolcCompilationUnitParser
+
+    timings: List[Tuple[float, Any]] = []
+    convert_contract_to_ir = SolcCompilationUnitParser._convert_contract_to_ir  # pylint: disable=protected-access
+
+    def timed_convert_contract_to_ir(parser: Any, contract: Any) -> None:
+        started = time.perf_counter()
+        try:
+            convert_contract_to_ir(parser, contract)
+        finally:
+            timings.append((time.perf_counter() - started, contract))
+
+    SolcCompilationUnitParser._convert_contract_to_ir = timed_convert_contract_to_ir  # pylint: disable=protected-access
+
+    largest: List[Tuple[float, str, str, int]] = []
+    total_s = total_largest_s = 0.0
+    print("addr\tcontracts\tnodes\tir_s\tlargest\tlargest_s\tlargest_share", flush=True)
+    for addr in args.addresses or _iter_addresses():
+        try:
+            target, kwargs = _address_target(addr)
+            compilation = CryticCompile(target, **kwargs)
+        except Exception as e:  # pylint: disable=broad-except
+            print(f"SKIP\t{addr}\t{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ''}", flush=True)
+            continue
+        # contract name -> (seconds over the runs, nodes)
+        per_contract: Dict[str, Tuple[float, int]] = {}
+        for _ in range(args.repeat):
+            timings.clear()
+            ContractPreprocess(compilation)
+            for elapsed_s, contract in timings:
+                n_nodes = sum(len(function.nodes) for function in contract.functions + contract.modifiers)
+                per_contract[contract.name] = (per_contract.get(contract.name, (0.0, 0))[0] + elapsed_s, n_nodes)
+        address_s = sum(elapsed_s for elapsed_s, _ in per_contract.values())
+        name, (name_s, _) = max(per_contract.items(), key=lambda item: item[1][0], default=("-", (0.0, 0)))
+        print(
+            f"{addr}\t{len(per_contract)}\t{sum(n for _, n in per_contract.values())}\t{address_s:.4f}"
+            f"\t{name}\t{name_s:.4f}\t{name_s / address_s if address_s else 0.0:.2f}",
+            flush=True,
+        )
+        largest += [(elapsed_s, addr, contract_name, n) for contract_name, (elapsed_s, n) in per_contract.items()]
+        total_s += address_s
+        total_largest_s += name_s
+
+    print(f"TOTAL\tir={total_s:.4f}s\tlargest_contracts={total_largest_s:.4f}s")
+    for elapsed_s, addr, name, n_nodes in sorted(largest, key=lambda item: item[0], reverse=True)[: args.top]:
+        print(f"LARGEST\t{addr}\t{name}\t{n_nodes}\t{elapsed_s:.4f}")
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# yul
+# ---------------------------------------------------------------------------
+
+
+def _assembly_addresses() -> List[str]:
+    """
+    Addresses of the corpus with inline assembly in their sources
+    """
+    addrs: List[str] = []
+    for addr in _iter_addresses():
+        addr_dir = _resolve_addr_dir(addr)
+        if addr_dir is not None and any(
+            "assembly" in p.read_text(encoding="utf8", errors="ignore") for p in _iter_project_solidity_files(addr_dir)
+        ):
+            addrs.append(addr)
+    return addrs
+
+
+def _function_irs(instance: Any) -> List[Any]:
+    """
+    IR of every function, by canonical name (the function order varies between two analyses of a compilation)
+    """
+    return sorted(
+        [function.canonical_name, [[str(ir) for ir in node.irs] for node in function.nodes]]
+        for compilation_unit in instance.compilation_units
+        for function in compilation_unit.functions_and_modifiers
+    )
+
+
+def _reference_yul_lookups() -> Dict[str, Callable[..., Any]]:
+    """
+    The former Yul scope lookups: a scan of the scope per identifier, for every enclosing scope
+    """
+    # pylint: disable=import-outside-toplevel,protected-access
+    from contract_preprocess.solc_parsing.yul.parse_yul import YulFunction, _name_to_yul_name
+
+    def get_yul_local_variable_from_name(scope: Any, variable_name: str) -> Any:
+        return next(
+            (
+                v
+                for v in scope._yul_local_variables.values()
+                if v.underlying.name == _name_to_yul_name(variable_name, scope.id)
+            ),
+            None,
+        )
+
+    def get_yul_local_function_from_name(scope: Any, func_name: str) -> Any:
+        return next((v for v in scope._yul_local_functions if v.underlying.name == func_name), None)
+
+    def get_yul_function_in_scope(scope: Any, func_name: str) -> Any:
+        while True:
+            func = get_yul_local_function_from_name(scope, func_name)
+            if func is not None or not isinstance(scope, YulFunction):
+                return func
+            scope = scope.root
+
+    return {
+        "get_yul_local_variable_from_name": get_yul_local_variable_from_name,
+        "get_yul_local_function_from_name": get_yul_local_function_from_name,
+        "get_yul_function_in_scope": get_yul_function_in_scope,
+    }
+
+
+def _bench_yul(args: argparse.Namespace) -> int:
+    # pylint: disable=import-outside-toplevel,protected-access
+    from crytic_compile import CryticCompile
+    from contract_preprocess import ContractPreprocess
+    from contract_preprocess.solc_parsing.yul.parse_yul import YulBlock, YulScope
+
+    elapsed = [0.0]
+    blocks = [0]
+
+    def timed(method: Callable[..., Any], count: bool) -> Callable[..., Any]:
+        def wrapper(*a: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return method(*a)
+            finally:
+                elapsed[0] += time.perf_counter() - started
+                blocks[0] += count
+
+        return wrapper
+
+    # The Yul of a block is converted (identifiers of declarations, nested functions), then its expressions parsed
+    YulBlock.convert = timed(YulBlock.convert, True)
+    YulBlock.analyze_expressions = timed(YulBlock.analyze_expressions, False)
+    current = {name: getattr(YulScope, name) for name in _reference_yul_lookups()}
+
+    def parse(compilation: Any, lookups: Dict[str, Callable[..., Any]]) -> Tuple[float, Any]:
+        for name, method in lookups.items():
+            setattr(YulScope, name, method)
+        elapsed[0] = 0.0
+        blocks[0] = 0
+        instance = ContractPreprocess(compilation)
+        return elapsed[0], instance
+
+    total_ref = total_new = 0.0
+    mismatches = 0
+    print("addr	asm_blocks	reference_s	current_s", flush=True)
+    for addr in args.addresses or _assembly_addresses():
+        ref_s = new_s = 0.0
+        try:
+            target, kwargs = _address_target(addr)
+            compilation = CryticCompile(target, **kwargs)
+            for _ in range(args.repeat):
+                elapsed_s, reference = parse(compilation, _reference_yul_lookups())
+                ref_s += elapsed_s
+                elapsed_s, instance = parse(compilation, current)
+                new_s += elapsed_s
+        except Exception as e:  # pylint: disable=broad-except
+            print(f"SKIP\t{addr}\t{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ''}", flush=True)
+            continue
+        if _function_irs(reference) != _function_irs(instance):
+            mismatches += 1
+            print(f"MISMATCH\t{addr}", flush=True)
+        print(f"{addr}\t{blocks[0]}\t{ref_s:.4f}\t{new_s:.4f}", flush=True)
+        total_ref += ref_s
+        total_new += new_s
+
+    speedup = total_ref / total_new if total_new else float("nan")
+    print(f"TOTAL\treference={total_ref:.4f}s\tcurrent={total_new:.4f}s\tspeedup={speedup:.1f}x")
+    return 1 if mismatches else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmarks of contract_preprocess internals on the Etherscan/SourceCode corpus.",
+        usage="python Etherscan/benchmark.py <benchmark> [0xADDR ...]",
+    )
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    dominators = subparsers.add_parser(
+        "dominators",
+        help="Compare the dominator engine with the former fixpoint implementation (timings and idoms).",
+    )
+    dominators.add_argument("--repeat", type=int, default=1, help="Runs per function (default: 1).")
+    dominators.set_defaults(func=_bench_dominators)
+
+    memory = subparsers.add_parser(
+        "memory",
+        help="Peak and retained RSS of the analysis, per address (each address in a fresh process).",
+    )
+    memory.add_argument(
+        "--baseline",
+        metavar="DIR",
+        help="Also measure the contract_preprocess package found in DIR (e.g. a git worktree of another revision).",
+    )
+    memory.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    memory.set_defaults(func=_bench_memory)
+
+    ir = subparsers.add_parser(
+        "ir",
+        help="Time the IR/SSA generation per contract, and list the contracts that take the longest.",
+    )
+    ir.add_argument("--repeat", type=int, default=1, help="Runs per address (default: 1).")
+    ir.add_argument("--top", type=int, default=20, help="Contracts listed at the end (default: 20).")
+    ir.set_defaults(func=_bench_ir)
+
+    yul = subparsers.add_parser(
+        "yul",
+        help="Time the inline assembly parsing, former scope lookups against the current ones, and check the IR.",
+    )
+    yul.add_argument("--repeat", type=int, default=1, help="Runs per address (default: 1).")
+    yul.set_defaults(func=_bench_yul)
+
+    for sub in subparsers.choices.values():
+        sub.add_argument(
+            "addresses",
+            nargs="*",
+            help="Contract address(es) to use (0x...). If omitted, uses all folders under Etherscan/SourceCode/ "
+            "(yul: the ones with inline assembly).",
+        )
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
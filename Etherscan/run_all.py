@@ -1,18 +1,23 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
+import importlib
 import json
+import multiprocessing
 import os
 import re
 import shutil
 import subprocess
 import sys
+import time
+import traceback
+from dataclasses import dataclass
+from multiprocessing.connection import Connection, wait
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
 
-from packaging.specifiers import SpecifierSet
-from packaging.version import InvalidVersion, Version
-from solc_select.solc_select import artifact_path, install_artifacts, installed_versions
+from solc_select.solc_select import artifact_path, install_artifacts
 
 
 ROOT = Path(__file__).resolve().parent
@@ -20,13 +25,6 @@ SOURCE_DIR = ROOT / "SourceCode"
 RESULTS_DIR = ROOT / "Results"
 
 
-def _strip_solidity_comments(text: str) -> str:
-    # Remove /* */ then // comments (best effort; not a full lexer).
-    text = re.sub(r"/\*.*?\*/", "", text, flags=re.DOTALL)
-    text = re.sub(r"//.*?$", "", text, flags=re.MULTILINE)
-    return text
-
-
 def _iter_addresses() -> List[str]:
     addrs: List[str] = []
     for p in SOURCE_DIR.iterdir():
@@ -80,13 +78,6 @@ def _iter_project_solidity_files(addr_dir: Path) -> List[Path]:
     return sorted(files)
 
 
-def _parse_solidity_imports(text: str) -> List[str]:
-    # Handles: import "x"; import {A} from "x"; import * as X from "x";
-    # Not a full parser; good enough for repo-root detection.
-    no_comments = _strip_solidity_comments(text)
-    return re.findall(r"\bimport\b[^;]*?[\"']([^\"']+)[\"']\s*;", no_comments)
-
-
 def _build_remap_map(addr_dir: Path) -> Dict[str, Path]:
     remaps: Dict[str, Path] = {}
     for child in sorted(addr_dir.iterdir()):
@@ -129,12 +120,11 @@ def _collect_import_closure(addr_dir: Path, root: Path) -> Set[Path]:
             continue
         visited.add(p)
 
-        try:
-            txt = p.read_text(encoding="utf8", errors="ignore")
-        except Exception:
+        scan = _scan_solidity_file(p)
+        if scan is None:
             continue
 
-        for imp in _parse_solidity_imports(txt):
+        for imp in scan.imports:
             resolved = _resolve_import(addr_dir, p, imp, remaps)
             if resolved is not None and resolved not in visited:
                 stack.append(resolved)
@@ -148,11 +138,10 @@ def _pick_solidity_root(addr_dir: Path, files: Sequence[Path]) -> Optional[Path]
 
     imported: Set[Path] = set()
     for f in files:
-        try:
-            txt = f.read_text(encoding="utf8", errors="ignore")
-        except Exception:
+        scan = _scan_solidity_file(f)
+        if scan is None:
             continue
-        for imp in _parse_solidity_imports(txt):
+        for imp in scan.imports:
             if imp.startswith("@"):
                 continue
             if imp.startswith("http://") or imp.startswith("https://"):
@@ -166,105 +155,57 @@ def _pick_solidity_root(addr_dir: Path, files: Sequence[Path]) -> Optional[Path]
 
     best: Optional[Tuple[float, Path]] = None
     for p in candidates:
-        try:
-            txt = p.read_text(encoding="utf8", errors="ignore")
-        except Exception:
+        scan = _scan_solidity_file(p)
+        if scan is None:
             continue
-        stripped = _strip_solidity_comments(txt)
         # Heuristic: prefer files that declare contracts and import others.
-        n_contract = len(re.findall(r"\bcontract\s+\w+", stripped))
-        n_library = len(re.findall(r"\blibrary\s+\w+", stripped))
-        n_import = len(re.findall(r"\bimport\b", stripped))
+        n_contract = len(scan.contracts)
+        n_library = len(scan.libraries)
+        n_import = len(scan.imports)
         score = (n_contract * 10.0) + (n_library * 3.0) + (n_import * 1.0) - (p.as_posix().count("/") * 0.1)
         if best is None or score > best[0]:
             best = (score, p)
     return best[1] if best else candidates[0]
 
 
-def _solidity_pragma_spec(text: str) -> Optional[str]:
-    no_comments = _strip_solidity_comments(text)
-    m = re.search(r"\bpragma\s+solidity\s+([^;]+);", no_comments)
-    if not m:
-        return None
-    return m.group(1).strip()
+def _package_module(name: str) -> Any:
+    """
+    contract_preprocess.<name>, imported on first use, from this checkout unless the package is importable already.
+    """
+    if str(ROOT.parent) not in sys.path:
+        sys.path.append(str(ROOT.parent))
+    return importlib.import_module(f"contract_preprocess.{name}")
 
 
-def _caret_to_specifier(v: Version) -> SpecifierSet:
-    lower = f">={v.public}"
-    if v.major == 0:
-        # 0.y.z -> <0.(y+1).0
-        upper = f"<0.{v.minor + 1}.0"
-    else:
-        upper = f"<{v.major + 1}.0.0"
-    return SpecifierSet(",".join([lower, upper]))
-
-
-def _specifier_from_solidity_pragma(spec: str) -> SpecifierSet:
-    raw = spec.strip()
-    if not raw:
-        return SpecifierSet()
-    # Solidity allows multiple ranges separated by spaces.
-    parts = [p for p in re.split(r"\s+", raw) if p]
-    converted: List[str] = []
-    for p in parts:
-        p = p.strip()
-        if p.startswith("^"):
-            v = Version(p[1:])
-            caret = _caret_to_specifier(v)
-            converted.append(str(caret))
-        elif re.match(r"^\d+\.\d+\.\d+$", p):
-            converted.append(f"=={p}")
-        else:
-            converted.append(p)
-    # SpecifierSet expects comma-separated.
-    return SpecifierSet(",".join(converted))
+def _preprocess_module(name: str) -> Any:
+    """
+    contract_preprocess.tools.preprocess.<name> (shared helpers: Solidity scans, compiler versions)
+    """
+    return _package_module(f"tools.preprocess.{name}")
 
 
-def _select_solc_version_for_files(files: Iterable[Path]) -> Optional[str]:
-    wanted_sets: List[SpecifierSet] = []
-    exact_versions: Set[str] = set()
+def _scan_solidity_file(path: Path) -> Any:
+    # Imports, pragma and declarations of a file, memoized by content
+    return _preprocess_module("solidity_scan").scan_solidity_file(path)
 
-    for f in files:
-        try:
-            txt = f.read_text(encoding="utf8", errors="ignore")
-        except Exception:
-            continue
-        pragma = _solidity_pragma_spec(txt)
-        if not pragma:
-            continue
-        pragma = pragma.strip()
-        if re.fullmatch(r"\d+\.\d+\.\d+", pragma):
-            exact_versions.add(pragma)
-        try:
-            wanted_sets.append(_specifier_from_solidity_pragma(pragma))
-        except Exception:
-            continue
 
-    # If any file pins an exact version, prefer it (must be consistent to compile).
-    if len(exact_versions) == 1:
-        return next(iter(exact_versions))
+def _compiler_versions() -> Any:
+    # Process-wide resolver (memoized versions and pragmas)
+    return _preprocess_module("compiler_versions").compiler_versions()
 
-    # Prefer already-installed versions for speed.
-    installed: List[Version] = []
-    for v in installed_versions():
-        try:
-            installed.append(Version(v))
-        except InvalidVersion:
-            continue
-    installed = sorted(set(installed))
 
-    best: Optional[Version] = None
-    for v in installed:
-        if all(v in s for s in wanted_sets):
-            best = v
-    return best.public if best is not None else None
+def _select_solc_version_for_files(files: Iterable[Path]) -> Optional[str]:
+    # Installed versions only: the caller falls back to a default version
+    return _compiler_versions().pick_solc_version(files, include_available=False)
 
 
 def _ensure_solc(version: str) -> Path:
-    if version not in installed_versions():
+    versions = _compiler_versions()
+    if not versions.is_solc_installed(version):
         ok = install_artifacts([version])
         if not ok:
             raise RuntimeError(f"solc-select could not install {version}")
+        versions.solc_installed(version)
     return artifact_path(version)
 
 
@@ -276,19 +217,162 @@ def _solc_remaps(addr_dir: Path) -> Optional[str]:
     return " ".join(remaps) if remaps else None
 
 
-def _run(cmd: List[str], log_path: Path, *, env: Optional[Dict[str, str]] = None) -> int:
+PREPROCESS_MODULE = "contract_preprocess.tools.preprocess"
+
+
+def _apply_memory_limit(memory_limit_mb: Optional[int]) -> None:
+    if not memory_limit_mb:
+        return
+    try:
+        import resource  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return
+    limit = int(memory_limit_mb) * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _run(
+    argv: List[str],
+    log_path: Path,
+    *,
+    env: Optional[Dict[str, str]] = None,
+    timeout: Optional[float] = None,
+    memory_limit_mb: Optional[int] = None,
+) -> Tuple[int, Optional[int]]:
+    """
+    Run the preprocess CLI as a subprocess; returns (exit code or -1 on timeout, child peak RSS in KB).
+    """
+    cmd = [sys.executable, "-m", PREPROCESS_MODULE] + argv
     log_path.parent.mkdir(parents=True, exist_ok=True)
     with log_path.open("w", encoding="utf8") as log:
         log.write("CMD: " + " ".join(cmd) + "\n")
         log.flush()
-        proc = subprocess.run(
+        proc = subprocess.Popen(
             cmd,
             stdout=log,
             stderr=log,
             env=env or os.environ.copy(),
-            check=False,
+            preexec_fn=(
+                (lambda: _apply_memory_limit(memory_limit_mb)) if memory_limit_mb and os.name == "posix" else None
+            ),
+        )
+        if not hasattr(os, "wait4"):
+            # No wait4 (e.g. Windows): no rusage of the child, hence no peak RSS
+            try:
+                proc.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+                log.write(f"TIMEOUT: exceeded {timeout}s\n")
+                return -1, None
+            return proc.returncode, None
+        # Reap with wait4 (instead of subprocess.run) to get this child's own rusage.
+        deadline = time.monotonic() + timeout if timeout else None
+        timed_out = False
+        while True:
+            pid, status, usage = os.wait4(proc.pid, os.WNOHANG)
+            if pid:
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                proc.kill()
+                _, status, usage = os.wait4(proc.pid, 0)
+                timed_out = True
+                break
+            time.sleep(0.05)
+        proc.returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+        if timed_out:
+            log.write(f"TIMEOUT: exceeded {timeout}s\n")
+            return -1, usage.ru_maxrss
+    return proc.returncode, usage.ru_maxrss
+
+
+def _reset_peak_rss() -> None:
+    # Linux: writing 5 to clear_refs resets the VmHWM high-water mark of this process.
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="utf8") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_kb() -> Optional[int]:
+    try:
+        with open("/proc/self/status", encoding="utf8") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    try:
+        import resource  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _run_in_process(argv: List[str], log_path: Path) -> int:
+    """
+    Run the preprocess CLI inside the current (worker) process.
+    stdout/stderr are redirected at the file-descriptor level so the log matches the subprocess mode
+    (including output of solc/dot children and already-configured logging handlers).
+    """
+    # pylint: disable=import-outside-toplevel
+    from contract_preprocess.tools.preprocess.__main__ import main as preprocess_main
+
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    with log_path.open("w", encoding="utf8") as log:
+        log.write("CMD: " + " ".join([sys.executable, "-m", PREPROCESS_MODULE] + argv) + "\n")
+        log.flush()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        saved = (os.dup(1), os.dup(2))
+        os.dup2(log.fileno(), 1)
+        os.dup2(log.fileno(), 2)
+        try:
+            preprocess_main(argv)
+            code = 0
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except Exception:  # pylint: disable=broad-except
+            traceback.print_exc()
+            code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.dup2(saved[0], 1)
+            os.dup2(saved[1], 2)
+            os.close(saved[0])
+            os.close(saved[1])
+    return code
+
+
+def _write_error_result(addr: str, stage: str, error: str) -> None:
+    out_json = RESULTS_DIR / f"{addr}.json"
+    out_json.write_text(
+        json.dumps(
+            {
+                "tool": "contract-preprocess",
+                "targets": [addr],
+                "compilations": [],
+                "errors": [{"target": addr, "stage": stage, "error": error}],
+            },
+            indent=2,
+            sort_keys=True,
         )
-    return proc.returncode
+        + "\n",
+        encoding="utf8",
+    )
+
+
+@dataclass(frozen=True)
+class AddressResult:
+    addr: str
+    success: bool
+    tag: str
+    wall_time: float = 0.0
+    peak_rss_kb: Optional[int] = None
+    # _input_fingerprint of the processed inputs
+    fingerprint: Optional[str] = None
 
 
 def _result_has_errors(path: Path) -> bool:
@@ -299,7 +383,180 @@ def _result_has_errors(path: Path) -> bool:
     return bool(data.get("errors"))
 
 
-def process_address(addr: str) -> Tuple[bool, str]:
+RESULT_CACHE_VERSION = 1
+
+
+def _tool_version() -> str:
+    """
+    Version of the contract_preprocess the runs use, with a hash of its sources: any code change
+    invalidates the manifest entries (and the cached results) of an older build
+    """
+    return _package_module("utils.tool_version").tool_version()
+
+
+def _default_cache_dir() -> Path:
+    base = Path(os.environ.get("CONTRACT_PREPROCESS_CACHE", Path.home() / ".cache")) / "contract-preprocess"
+    return base / "results"
+
+
+def _result_cache_key(
+    addr_dir: Path,
+    files: Iterable[Path],
+    *,
+    compiler: str,
+    remaps: Sequence[str],
+    flags: Sequence[str],
+) -> str:
+    """
+    Content address of one run: the import closure (paths relative to the address directory + content hashes),
+    the tool version (with the hash of its sources), the selected compiler, the remap prefixes and the tool flags.
+    Output paths are not part of the key.
+    """
+    h = hashlib.sha256()
+    h.update(f"v{RESULT_CACHE_VERSION}\0{_tool_version()}\0{compiler}\0".encode("utf8"))
+    h.update(("\0".join(sorted(remaps)) + "\0\0").encode("utf8"))
+    h.update(("\0".join(flags) + "\0\0").encode("utf8"))
+    base = addr_dir.resolve()
+    for f in sorted(files, key=lambda p: p.resolve().as_posix()):
+        rel = os.path.relpath(f.resolve(), base)
+        h.update(rel.replace(os.sep, "/").encode("utf8") + b"\0")
+        h.update(hashlib.sha256(f.read_bytes()).digest())
+    return h.hexdigest()
+
+
+def _iter_result_artifacts(addr: str) -> List[Path]:
+    # <addr>.json / .log / .callgraph.dot|svg / .callgraph/ and <addr>_external/
+    return sorted(RESULTS_DIR.glob(f"{addr}*"))
+
+
+# Cached artifacts are named after this instead of the address: <addr>.json is stored as result.json, ...
+_CACHED_ARTIFACT_STEM = "result"
+
+
+def _source_prefix(addr_dir: Path) -> str:
+    # How the outputs refer to the sources of an address: the CLI gets paths relative to the cwd
+    return os.path.relpath(addr_dir, Path.cwd()).replace(os.sep, "/")
+
+
+def _rebase_source_path(path: str, old: str, new: str) -> str:
+    if path == old or path.startswith(old + "/"):
+        return new + path[len(old) :]
+    return path
+
+
+def _rebase_result_json(src: Path, dst: Path, old: str, new: str) -> None:
+    # The source paths of a result: its targets, the targets of its compilations and errors
+    result = json.loads(src.read_text(encoding="utf8"))
+    result["targets"] = [_rebase_source_path(t, old, new) for t in result.get("targets", [])]
+    for entry in result.get("compilations", []) + result.get("errors", []):
+        if isinstance(entry.get("target"), str):
+            entry["target"] = _rebase_source_path(entry["target"], old, new)
+    dst.write_text(json.dumps(result, indent=2, sort_keys=True) + "\n", encoding="utf8")
+
+
+def _rebase_bundles(src: Path, dst: Path, old: str, new: str) -> None:
+    # The source paths of the external bundles: their "// source: <path>:<lines>" headers
+    dst.mkdir(parents=True, exist_ok=True)
+    for child in sorted(src.iterdir()):
+        if child.is_dir():
+            _rebase_bundles(child, dst / child.name, old, new)
+            continue
+        lines = child.read_text(encoding="utf8").split("\n")
+        for i, line in enumerate(lines):
+            if line.startswith("// source: "):
+                lines[i] = "// source: " + _rebase_source_path(line[len("// source: ") :], old, new)
+        (dst / child.name).write_text("\n".join(lines), encoding="utf8")
+
+
+def _cache_restore(cache_dir: Path, key: str, addr: str, addr_dir: Path) -> bool:
+    entry = cache_dir / key[:2] / key
+    try:
+        meta = json.loads((entry / "meta.json").read_text(encoding="utf8"))
+        old = meta["source_prefix"]
+    except Exception:
+        return False
+    for p in _iter_result_artifacts(addr):
+        if p.is_dir():
+            shutil.rmtree(p, ignore_errors=True)
+        else:
+            p.unlink()
+    # The same closure may have been cached from another address, whose sources are in another directory:
+    # only the source paths of the result and of the bundles are rebased (the closure is identical,
+    # and the key has the file names relative to the address directory)
+    new = _source_prefix(addr_dir)
+    for src in sorted((entry / "artifacts").iterdir()):
+        dst = RESULTS_DIR / (addr + src.name[len(_CACHED_ARTIFACT_STEM) :])
+        if old != new and src.name == f"{_CACHED_ARTIFACT_STEM}.json":
+            _rebase_result_json(src, dst, old, new)
+        elif old != new and src.name == f"{_CACHED_ARTIFACT_STEM}_external":
+            _rebase_bundles(src, dst, old, new)
+        elif src.is_dir():
+            shutil.copytree(src, dst)
+        else:
+            shutil.copy2(src, dst)
+    with (RESULTS_DIR / f"{addr}.log").open("a", encoding="utf8") as log:
+        log.write(f"CACHE: hit {key} (from {meta['addr']})\n")
+    return True
+
+
+def _cache_store(cache_dir: Path, key: str, addr: str, addr_dir: Path) -> None:
+    entry = cache_dir / key[:2] / key
+    if entry.exists():
+        return
+    tmp = cache_dir / key[:2] / f".{key}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    try:
+        (tmp / "artifacts").mkdir(parents=True)
+        for p in _iter_result_artifacts(addr):
+            name = _CACHED_ARTIFACT_STEM + p.name[len(addr) :]
+            if p.is_dir():
+                shutil.copytree(p, tmp / "artifacts" / name)
+            else:
+                shutil.copy2(p, tmp / "artifacts" / name)
+        (tmp / "meta.json").write_text(
+            json.dumps({"addr": addr, "source_prefix": _source_prefix(addr_dir)}, indent=2, sort_keys=True) + "\n",
+            encoding="utf8",
+        )
+        os.replace(tmp, entry)
+    except OSError:
+        # Lost a race with another worker storing the same key (or the cache is not writable).
+        pass
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def process_address(
+    addr: str,
+    *,
+    in_process: bool = False,
+    timeout: Optional[float] = None,
+    memory_limit_mb: Optional[int] = None,
+    cache_dir: Optional[Path] = None,
+) -> AddressResult:
+    """
+    Preprocess one address. With in_process=True the CLI runs inside the calling process
+    (used by the --jobs worker pool); otherwise it is spawned as a subprocess.
+    With cache_dir set, successful results are stored/served by _result_cache_key.
+    """
+    fingerprint = _input_fingerprint(addr)
+    started = time.monotonic()
+    peak_rss_kb: Optional[int] = None
+
+    def done(success: bool, tag: str) -> AddressResult:
+        return AddressResult(addr, success, tag, time.monotonic() - started, peak_rss_kb, fingerprint)
+
+    def run(argv: List[str]) -> int:
+        nonlocal peak_rss_kb
+        if in_process:
+            _reset_peak_rss()
+            code = _run_in_process(argv, out_log)
+            peak_rss_kb = _peak_rss_kb()
+            return code
+        code, peak_rss_kb = _run(argv, out_log, timeout=timeout, memory_limit_mb=memory_limit_mb)
+        if code == -1:
+            _write_error_result(addr, "timeout", f"preprocess exceeded {timeout}s")
+        return code
+
     addr_dir = _resolve_addr_dir(addr)
     RESULTS_DIR.mkdir(parents=True, exist_ok=True)
     out_json = RESULTS_DIR / f"{addr}.json"
@@ -311,86 +568,269 @@ def process_address(addr: str) -> Tuple[bool, str]:
         shutil.rmtree(out_external, ignore_errors=True)
 
     if addr_dir is None or not addr_dir.is_dir():
-        out_json.write_text(
-            json.dumps(
-                {
-                    "tool": "contract-preprocess",
-                    "targets": [addr],
-                    "compilations": [],
-                    "errors": [{"target": addr, "stage": "sourcecode", "error": "no source directory under Etherscan/SourceCode"}],
-                },
-                indent=2,
-                sort_keys=True,
-            )
-            + "\n",
-            encoding="utf8",
-        )
+        _write_error_result(addr, "sourcecode", "no source directory under Etherscan/SourceCode")
         out_log.write_text("SKIP: no source directory\n", encoding="utf8")
-        return False, "no-source-dir"
+        return done(False, "no-source-dir")
+
+    def run_and_store(argv: List[str], key: Optional[str], tag: str) -> AddressResult:
+        if run(argv) == -1:
+            return done(False, "timeout")
+        success = not _result_has_errors(out_json)
+        if success and cache_dir is not None and key is not None:
+            _cache_store(cache_dir, key, addr, addr_dir)
+        return done(success, tag)
+
+    flags = ["--no-fail", "--emit-callgraph"]
 
     vyper_file = _detect_vyper_file(addr_dir)
     if vyper_file is not None:
-        cmd = [
-            sys.executable,
-            "-m",
-            "contract_preprocess.tools.preprocess",
-            "--no-fail",
-            "--emit-callgraph",
+        key = (
+            _result_cache_key(addr_dir, [vyper_file], compiler="vyper", remaps=[], flags=flags)
+            if cache_dir is not None
+            else None
+        )
+        if cache_dir is not None and key is not None and _cache_restore(cache_dir, key, addr, addr_dir):
+            return done(not _result_has_errors(out_json), "vyper+cache")
+        argv = flags + [
             "--dump-external-dir",
             out_external_arg,
             "-o",
             out_json_arg,
             os.path.relpath(vyper_file, Path.cwd()),
         ]
-        _run(cmd, out_log)
-        return not _result_has_errors(out_json), "vyper"
+        return run_and_store(argv, key, "vyper")
 
     sol_files = _iter_project_solidity_files(addr_dir)
     root = _pick_solidity_root(addr_dir, sol_files)
     if root is None:
-        out_json.write_text(
-            json.dumps(
-                {
-                    "tool": "contract-preprocess",
-                    "targets": [addr],
-                    "compilations": [],
-                    "errors": [{"target": addr, "stage": "sourcecode", "error": "no Solidity/Vyper sources found"}],
-                },
-                indent=2,
-                sort_keys=True,
-            )
-            + "\n",
-            encoding="utf8",
-        )
+        _write_error_result(addr, "sourcecode", "no Solidity/Vyper sources found")
         out_log.write_text("SKIP: no sources found\n", encoding="utf8")
-        return False, "no-sources"
+        return done(False, "no-sources")
 
     closure = _collect_import_closure(addr_dir, root)
     solc_ver = _select_solc_version_for_files(closure) or _select_solc_version_for_files(sol_files) or "0.8.24"
-    solc_bin = _ensure_solc(solc_ver)
     remaps = _solc_remaps(addr_dir)
+    flags += ["--compile-force-framework", "solc"]
+    key = (
+        _result_cache_key(
+            addr_dir,
+            closure,
+            compiler=f"solc:{solc_ver}",
+            remaps=list(_build_remap_map(addr_dir)),
+            flags=flags + [os.path.relpath(root.resolve(), addr_dir.resolve())],
+        )
+        if cache_dir is not None
+        else None
+    )
+    if cache_dir is not None and key is not None and _cache_restore(cache_dir, key, addr, addr_dir):
+        return done(not _result_has_errors(out_json), f"solc:{solc_ver}+cache")
+    solc_bin = _ensure_solc(solc_ver)
 
-    cmd = [
-        sys.executable,
-        "-m",
-        "contract_preprocess.tools.preprocess",
-        "--no-fail",
-        "--emit-callgraph",
+    argv = flags + [
         "--dump-external-dir",
         out_external_arg,
-        "--compile-force-framework",
-        "solc",
         "--solc",
         os.path.relpath(solc_bin, Path.cwd()) if str(solc_bin).startswith(str(Path.cwd())) else str(solc_bin),
         "-o",
         out_json_arg,
     ]
     if remaps:
-        cmd += ["--solc-remaps", remaps]
-    cmd.append(os.path.relpath(root, Path.cwd()))
+        argv += ["--solc-remaps", remaps]
+    argv.append(os.path.relpath(root, Path.cwd()))
+
+    return run_and_store(argv, key, f"solc:{solc_ver}")
+
+
+def _worker_main(conn: Connection, memory_limit_mb: Optional[int], cache_dir: Optional[Path]) -> None:
+    """
+    Long-lived pool worker: import contract_preprocess once, then serve addresses from the pipe.
+    """
+    # `python -m` puts the cwd on sys.path; mirror that so the package resolves without an install.
+    if os.getcwd() not in sys.path:
+        sys.path.insert(0, os.getcwd())
+    _apply_memory_limit(memory_limit_mb)
+    import contract_preprocess.tools.preprocess.__main__  # pylint: disable=import-outside-toplevel,unused-import
+
+    while True:
+        try:
+            addr = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if addr is None:
+            return
+        started = time.monotonic()
+        try:
+            result = process_address(addr, in_process=True, cache_dir=cache_dir)
+        except MemoryError:
+            _write_error_result(addr, "memory", f"exceeded memory limit ({memory_limit_mb} MB)")
+            result = AddressResult(addr, False, "memory", time.monotonic() - started, _peak_rss_kb())
+        except Exception as e:  # pylint: disable=broad-except
+            _write_error_result(addr, "worker", str(e))
+            result = AddressResult(addr, False, "error", time.monotonic() - started, _peak_rss_kb())
+        conn.send(result)
+
+
+class _Worker:
+    def __init__(self, ctx: Any, memory_limit_mb: Optional[int], cache_dir: Optional[Path]) -> None:
+        self.conn, child_conn = ctx.Pipe()
+        self.proc = ctx.Process(target=_worker_main, args=(child_conn, memory_limit_mb, cache_dir), daemon=True)
+        self.proc.start()
+        child_conn.close()
+        self.addr: Optional[str] = None
+        self.started = 0.0
+        self.n_tasks = 0
+
+    def submit(self, addr: str) -> None:
+        self.addr = addr
+        self.started = time.monotonic()
+        self.n_tasks += 1
+        self.conn.send(addr)
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.proc.join(timeout=5)
+        if self.proc.is_alive():
+            self.kill()
+
+    def kill(self) -> None:
+        self.proc.kill()
+        self.proc.join()
+        self.conn.close()
+
+
+def process_addresses_parallel(
+    addrs: Sequence[str],
+    *,
+    jobs: int,
+    timeout: Optional[float] = None,
+    memory_limit_mb: Optional[int] = None,
+    max_tasks_per_worker: int = 0,
+    cache_dir: Optional[Path] = None,
+) -> Iterator[AddressResult]:
+    """
+    Process addresses on a pool of long-lived workers; yields an AddressResult per address as tasks complete.
+    A worker that exceeds the per-task timeout or dies (e.g. on the memory ceiling) is killed and replaced;
+    the address gets an error result with stage "timeout" / "worker-crash".
+    """
+    ctx = multiprocessing.get_context()
+    pending = list(reversed(addrs))
+    workers: List[_Worker] = [_Worker(ctx, memory_limit_mb, cache_dir) for _ in range(max(1, min(jobs, len(addrs))))]
+
+    def replace(worker: _Worker) -> None:
+        workers[workers.index(worker)] = _Worker(ctx, memory_limit_mb, cache_dir)
+
+    try:
+        while True:
+            for w in list(workers):
+                if w.addr is None and pending:
+                    if max_tasks_per_worker and w.n_tasks >= max_tasks_per_worker:
+                        w.stop()
+                        replace(w)
+                        continue
+                    w.submit(pending.pop())
+            busy = [w for w in workers if w.addr is not None]
+            if not busy:
+                if pending:
+                    continue
+                return
+
+            wait_for = None
+            if timeout:
+                now = time.monotonic()
+                wait_for = max(0.0, min(w.started + timeout for w in busy) - now)
+            ready = wait([w.conn for w in busy], timeout=wait_for)
+
+            for w in busy:
+                if w.conn in ready:
+                    try:
+                        result: AddressResult = w.conn.recv()
+                    except (EOFError, OSError):
+                        addr = w.addr
+                        assert addr is not None
+                        _write_error_result(
+                            addr, "worker-crash", f"worker exited with code {w.proc.exitcode} (memory limit or crash)"
+                        )
+                        w.kill()
+                        replace(w)
+                        yield AddressResult(addr, False, "worker-crash", time.monotonic() - w.started)
+                        continue
+                    w.addr = None
+                    yield result
+                elif timeout and time.monotonic() - w.started >= timeout:
+                    addr = w.addr
+                    assert addr is not None
+                    w.kill()
+                    replace(w)
+                    _write_error_result(addr, "timeout", f"preprocess exceeded {timeout}s")
+                    with (RESULTS_DIR / f"{addr}.log").open("a", encoding="utf8") as log:
+                        log.write(f"TIMEOUT: exceeded {timeout}s\n")
+                    yield AddressResult(addr, False, "timeout", time.monotonic() - w.started)
+    finally:
+        for w in workers:
+            if w.addr is None:
+                w.stop()
+            else:
+                w.kill()
+
+
+MANIFEST_PATH = RESULTS_DIR / "manifest.jsonl"
+
+
+def _input_fingerprint(addr: str) -> Optional[str]:
+    """Hash of every file under SourceCode/<addr> (relative paths + contents)."""
+    addr_dir = _resolve_addr_dir(addr)
+    if addr_dir is None:
+        return None
+    h = hashlib.sha256()
+    for p in sorted(addr_dir.rglob("*")):
+        if not p.is_file():
+            continue
+        h.update(p.relative_to(addr_dir).as_posix().encode("utf8") + b"\0")
+        h.update(hashlib.sha256(p.read_bytes()).digest())
+    return h.hexdigest()
 
-    _run(cmd, out_log)
-    return not _result_has_errors(out_json), f"solc:{solc_ver}"
+
+def _load_manifest(path: Path) -> Dict[str, Dict[str, Any]]:
+    """
+    The manifest is append-only JSON Lines (one record per processed address, last one wins),
+    so an interrupted run loses at most the record being written.
+    """
+    records: Dict[str, Dict[str, Any]] = {}
+    if not path.exists():
+        return records
+    with path.open("r", encoding="utf8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(rec, dict) and rec.get("address"):
+                records[rec["address"]] = rec
+    return records
+
+
+def _append_manifest(path: Path, record: Dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a", encoding="utf8") as f:
+        f.write(json.dumps(record, sort_keys=True) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _is_up_to_date(record: Optional[Dict[str, Any]], tool_version: str) -> bool:
+    # The fingerprint (hash of the whole source directory) last, only for the records that could be skipped
+    if not record:
+        return False
+    return (
+        record.get("status") == "ok"
+        and record.get("tool_version") == tool_version
+        and (RESULTS_DIR / f"{record['address']}.json").exists()
+        and record.get("fingerprint") is not None
+        and record.get("fingerprint") == _input_fingerprint(record["address"])
+    )
 
 
 def main() -> None:
@@ -403,6 +843,55 @@ def main() -> None:
         nargs="*",
         help="Contract address(es) to process (0x...). If omitted, processes all folders under Etherscan/SourceCode/.",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of long-lived worker processes (default: 1, one subprocess per address).",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=None,
+        help="Per-address timeout in seconds (default: none).",
+    )
+    parser.add_argument(
+        "--memory-limit-mb",
+        type=int,
+        default=None,
+        help="Address-space ceiling per worker/subprocess in MB (default: none).",
+    )
+    parser.add_argument(
+        "--max-tasks-per-worker",
+        type=int,
+        default=50,
+        help="Recycle a worker after this many addresses (0: never; default: 50).",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="Result cache directory (default: $CONTRACT_PREPROCESS_CACHE or ~/.cache, under contract-preprocess/results).",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        default=False,
+        help="Always re-run; do not read or write the result cache.",
+    )
+    parser.add_argument(
+        "--resume",
+        "--incremental",
+        dest="resume",
+        action="store_true",
+        default=False,
+        help="Skip addresses whose manifest record is successful with unchanged inputs and tool version.",
+    )
+    parser.add_argument(
+        "--manifest",
+        default=None,
+        help="Run manifest (JSON Lines) path (default: Etherscan/Results/manifest.jsonl).",
+    )
     args = parser.parse_args()
 
     addrs: List[str]
@@ -415,12 +904,55 @@ def main() -> None:
             addrs.append(a)
     else:
         addrs = _iter_addresses()
+    cache_dir: Optional[Path] = None
+    if not args.no_cache:
+        cache_dir = Path(args.cache_dir).resolve() if args.cache_dir else _default_cache_dir()
+        cache_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = Path(args.manifest) if args.manifest else MANIFEST_PATH
+    manifest = _load_manifest(manifest_path)
+    tool_version = _tool_version()
+
     ok = 0
+    todo: List[str] = []
     for addr in addrs:
-        success, tag = process_address(addr)
-        status = "OK" if success else "FAIL"
-        print(f"{status}\t{addr}\t{tag}")
-        ok += 1 if success else 0
+        if args.resume and _is_up_to_date(manifest.get(addr), tool_version):
+            print(f"SKIP\t{addr}\tunchanged")
+            ok += 1
+        else:
+            todo.append(addr)
+
+    results: Iterable[AddressResult]
+    if args.jobs > 1:
+        results = process_addresses_parallel(
+            todo,
+            jobs=args.jobs,
+            timeout=args.timeout,
+            memory_limit_mb=args.memory_limit_mb,
+            max_tasks_per_worker=args.max_tasks_per_worker,
+            cache_dir=cache_dir,
+        )
+    else:
+        results = (
+            process_address(addr, timeout=args.timeout, memory_limit_mb=args.memory_limit_mb, cache_dir=cache_dir)
+            for addr in todo
+        )
+    for res in results:
+        status = "OK" if res.success else "FAIL"
+        print(f"{status}\t{res.addr}\t{res.tag}")
+        ok += 1 if res.success else 0
+        _append_manifest(
+            manifest_path,
+            {
+                "address": res.addr,
+                # Computed by the worker, unless it was killed (timeout, crash)
+                "fingerprint": res.fingerprint if res.fingerprint is not None else _input_fingerprint(res.addr),
+                "tool_version": tool_version,
+                "status": "ok" if res.success else "fail",
+                "tag": res.tag,
+                "wall_time": round(res.wall_time, 3),
+                "peak_rss_kb": res.peak_rss_kb,
+            },
+        )
     print(f"done: {ok}/{len(addrs)} succeeded")
 
 
@@ -1,7 +1,6 @@
 """
     Compute the data depenency between all the SSA variables
 """
-from collections import defaultdict
 from typing import Union, Set, Dict, TYPE_CHECKING, List
 
 from contract_preprocess.core.cfg.node import Node
@@ -51,6 +50,9 @@ SUPPORTED_TYPES = Union[Variable, SolidityVariable]
 Context_types_API = Union[Contract, Function, Node]
 Context_types = Union[Contract, Function]
 
+# With analysis_level="calls", the dependencies are computed with the SSA on first use:
+# the getters below start with generate_ssa() (a no-op once generated)
+
 
 def is_dependent(
     variable: SUPPORTED_TYPES,
@@ -71,6 +73,7 @@ def is_dependent(
         bool
     """
     assert isinstance(context, (Contract, Function, Node))
+    context.compilation_unit.generate_ssa()
     if isinstance(context, Node):
         func = context.function
         context = func.contract if isinstance(func, FunctionContract) else func
@@ -108,6 +111,7 @@ def is_dependent_ssa(
         bool
     """
     assert isinstance(context, (Contract, Function, Node))
+    context.compilation_unit.generate_ssa()
     if isinstance(context, Node):
         func = context.function
         context = func.contract if isinstance(func, FunctionContract) else func
@@ -151,6 +155,7 @@ def is_tainted(
         bool
     """
     assert isinstance(context, (Contract, Function, Node))
+    context.compilation_unit.generate_ssa()
     if isinstance(context, Node):
         func = context.function
         context = func.contract if isinstance(func, FunctionContract) else func
@@ -184,6 +189,7 @@ def is_tainted_ssa(
         bool
     """
     assert isinstance(context, (Contract, Function, Node))
+    context.compilation_unit.generate_ssa()
     if isinstance(context, Node):
         func = context.function
         context = func.contract if isinstance(func, FunctionContract) else func
@@ -215,6 +221,7 @@ def get_dependencies(
     :return: set(Variable)
     """
     assert isinstance(context, (Contract, Function, Node))
+    context.compilation_unit.generate_ssa()
     if isinstance(context, Node):
         func = context.function
         context = func.contract if isinstance(func, FunctionContract) else func
@@ -237,6 +244,7 @@ def get_all_dependencies(
     :return: Dict(Variable, set(Variable))
     """
     assert isinstance(context, (Contract, Function, Node))
+    context.compilation_unit.generate_ssa()
     if isinstance(context, Node):
         func = context.function
         context = func.contract if isinstance(func, FunctionContract) else func
@@ -262,6 +270,7 @@ def get_dependencies_ssa(
     :return: set(Variable)
     """
     assert isinstance(context, (Contract, Function, Node))
+    context.compilation_unit.generate_ssa()
     if isinstance(context, Node):
         func = context.function
         context = func.contract if isinstance(func, FunctionContract) else func
@@ -284,6 +293,7 @@ def get_all_dependencies_ssa(
     :return: Dict(Variable, set(Variable))
     """
     assert isinstance(context, (Contract, Function, Node))
+    context.compilation_unit.generate_ssa()
     if isinstance(context, Node):
         func = context.function
         context = func.contract if isinstance(func, FunctionContract) else func
@@ -321,6 +331,7 @@ KEY_INPUT_SSA = "DATA_DEPENDENCY_INPUT_SSA"
 
 def pprint_dependency(caller_context: Context_types) -> None:
     print("#### SSA ####")
+    caller_context.compilation_unit.generate_ssa()
     context = caller_context.context
     for k, values in context[KEY_SSA].items():
         print(f"{k} ({id(k)}):")
@@ -377,7 +388,8 @@ def compute_dependency_contract(
 def propagate_function(
     contract: Contract, function: Function, context_key: str, context_key_non_ssa: str
 ) -> None:
-    transitive_close_dependencies(function, context_key, context_key_non_ssa)
+    # The function dependencies are closed once, by compute_dependency_function
+    # (an inherited function is propagated to every contract that has it)
     # Propage data dependency
     data_depencencies = function.context[context_key]
     for (key, values) in data_depencencies.items():
@@ -387,24 +399,110 @@ def propagate_function(
             contract.context[context_key][key].union(values)
 
 
+def _strongly_connected_components(successors: List[List[int]]) -> List[List[int]]:
+    """
+    Tarjan's algorithm (iterative): the components come out in reverse topological order,
+    every component after the ones it reaches
+    """
+    index: List[int] = [-1] * len(successors)
+    lowlink: List[int] = [0] * len(successors)
+    on_stack: List[bool] = [False] * len(successors)
+    stack: List[int] = []
+    components: List[List[int]] = []
+    counter = 0
+    for root in range(len(successors)):
+        if index[root] != -1:
+            continue
+        index[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, iter(successors[root]))]
+        while work:
+            node, it = work[-1]
+            for succ in it:
+                if index[succ] == -1:
+                    index[succ] = lowlink[succ] = counter
+                    counter += 1
+                    stack.append(succ)
+                    on_stack[succ] = True
+                    work.append((succ, iter(successors[succ])))
+                    break
+                if on_stack[succ] and index[succ] < lowlink[node]:
+                    lowlink[node] = index[succ]
+            else:
+                work.pop()
+                if work and lowlink[node] < lowlink[work[-1][0]]:
+                    lowlink[work[-1][0]] = lowlink[node]
+                if lowlink[node] == index[node]:
+                    component: List[int] = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+    return components
+
+
+def _close_dependencies(dependencies: Dict[SUPPORTED_TYPES, Set[SUPPORTED_TYPES]]) -> None:
+    """
+    Add to each variable's set everything it transitively depends on (but itself, unless it was already there)
+
+    The variables get integer ids and the sets become bitsets (Python ints). The keys are collapsed into
+    their strongly connected components, which are closed in reverse topological order: a component
+    reaches the union of its members' direct dependencies and of what the components they lead to reach.
+    A single pass, instead of a fixpoint over the whole map.
+    """
+    keys = list(dependencies)
+    variables: List[SUPPORTED_TYPES] = list(keys)
+    ids: Dict[SUPPORTED_TYPES, int] = {v: i for i, v in enumerate(variables)}
+    direct: List[int] = []
+    successors: List[List[int]] = []
+    for key in keys:
+        bits = 0
+        key_successors: List[int] = []
+        for v in dependencies[key]:
+            i = ids.get(v)
+            if i is None:
+                i = ids[v] = len(variables)
+                variables.append(v)
+            elif i < len(keys):
+                key_successors.append(i)
+            bits |= 1 << i
+        direct.append(bits)
+        successors.append(key_successors)
+
+    reach: List[int] = [0] * len(keys)
+    component_of: List[int] = [0] * len(keys)
+    for c, component in enumerate(_strongly_connected_components(successors)):
+        bits = 0
+        for member in component:
+            component_of[member] = c
+        for member in component:
+            bits |= direct[member]
+            for succ in successors[member]:
+                if component_of[succ] != c:
+                    bits |= reach[succ]
+        for member in component:
+            reach[member] = bits
+
+    for i, key in enumerate(keys):
+        added = reach[i] & ~direct[i] & ~(1 << i)
+        if added:
+            # Bit j of the int is character -j-1 of its binary representation
+            binary = bin(added)
+            dependencies[key].update(
+                variables[j] for j, bit in enumerate(reversed(binary[2:])) if bit == "1"
+            )
+
+
 def transitive_close_dependencies(
     context: Context_types, context_key: str, context_key_non_ssa: str
 ) -> None:
     # transitive closure
-    changed = True
-    keys = context.context[context_key].keys()
-    while changed:
-        changed = False
-        to_add = defaultdict(set)
-        for key, items in context.context[context_key].items():
-            for item in items & keys:
-                to_add[key].update(context.context[context_key][item] - {key} - items)
-        for k, v in to_add.items():
-            # Because we dont have any check on the update operation
-            # We might update an empty set with an empty set
-            if v:
-                changed = True
-                context.context[context_key][k] |= v
+    _close_dependencies(context.context[context_key])
     context.context[context_key_non_ssa] = convert_to_non_ssa(context.context[context_key])
 
 
@@ -452,10 +550,8 @@ def compute_dependency_function(function: Function) -> None:
                         add_dependency(lvalue, function, ir, is_protected)
                 add_dependency(ir.lvalue, function, ir, is_protected)
 
-    function.context[KEY_NON_SSA] = convert_to_non_ssa(function.context[KEY_SSA])
-    function.context[KEY_NON_SSA_UNPROTECTED] = convert_to_non_ssa(
-        function.context[KEY_SSA_UNPROTECTED]
-    )
+    transitive_close_dependencies(function, KEY_SSA, KEY_NON_SSA)
+    transitive_close_dependencies(function, KEY_SSA_UNPROTECTED, KEY_NON_SSA_UNPROTECTED)
 
 
 def convert_variable_to_non_ssa(v: SUPPORTED_TYPES) -> SUPPORTED_TYPES:
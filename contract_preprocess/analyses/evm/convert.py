@@ -1,4 +1,6 @@
 import logging
+from typing import Callable, Dict, List, Tuple
+
 from contract_preprocess.core.declarations import Contract, Function
 from contract_preprocess.core.cfg.node import Node
 from contract_preprocess.utils.function import get_function_id
@@ -8,6 +10,64 @@ from contract_preprocess.analyses.evm.evm_cfg_builder import load_evm_cfg_builde
 logger = logging.getLogger("ConvertToEVM")
 
 KEY_EVM_INS = "EVM_INSTRUCTIONS"
+KEY_EVM_CONTRACT_INFO = "EVM_CONTRACT_INFO"
+
+
+class _EVMContractInfo:
+    """
+    Per-contract EVM data, shared by the contract, its functions and its nodes.
+    Each CFG is built once, srcmaps are parsed once, and the source line -> pcs mappings
+    are computed once per bytecode (runtime/init), using the file's SourceIndex for line lookups.
+    """
+
+    def __init__(self, contract: Contract, contract_preprocess) -> None:
+        self.contract = contract
+        self.contract_preprocess = contract_preprocess
+        crytic_compile = contract_preprocess.crytic_compile
+        self.bytecode_runtime = crytic_compile.bytecode_runtime(contract.name)
+        self.srcmap_runtime = crytic_compile.srcmap_runtime(contract.name)
+        self.bytecode_init = crytic_compile.bytecode_init(contract.name)
+        self.srcmap_init = crytic_compile.srcmap_init(contract.name)
+        self._cfg = None
+        self._cfg_init = None
+        self._source_to_pcs: Dict[bool, Dict[int, List[int]]] = {}
+
+    @property
+    def cfg(self):
+        if self._cfg is None:
+            self._cfg = load_evm_cfg_builder()(self.bytecode_runtime)
+        return self._cfg
+
+    @property
+    def cfg_init(self):
+        if self._cfg_init is None:
+            self._cfg_init = load_evm_cfg_builder()(self.bytecode_init)
+        return self._cfg_init
+
+    def cfg_for(self, is_init: bool):
+        return self.cfg_init if is_init else self.cfg
+
+    @property
+    def filename(self) -> str:
+        return self.contract.source_mapping.filename.absolute
+
+    def line_of_offset(self, offset: int) -> int:
+        """1-based line of a byte offset in the contract's file (O(log n))."""
+        return self.contract_preprocess.source_index(self.filename).line_of(offset)
+
+    def source_to_pcs(self, is_init: bool) -> Dict[int, List[int]]:
+        if is_init not in self._source_to_pcs:
+            srcmap = self.srcmap_init if is_init else self.srcmap_runtime
+            self._source_to_pcs[is_init] = _source_line_to_pcs(
+                self.cfg_for(is_init).instructions, _parse_srcmap(srcmap), self.line_of_offset
+            )
+        return self._source_to_pcs[is_init]
+
+
+def _get_contract_info(contract: Contract) -> _EVMContractInfo:
+    if KEY_EVM_CONTRACT_INFO not in contract.context:
+        contract.context[KEY_EVM_CONTRACT_INFO] = _EVMContractInfo(contract, contract.contract_preprocess)
+    return contract.context[KEY_EVM_CONTRACT_INFO]
 
 
 def get_evm_instructions(obj):
@@ -15,41 +75,17 @@ def get_evm_instructions(obj):
 
     if KEY_EVM_INS not in obj.context:
 
-        CFG = load_evm_cfg_builder()
-
-        contract_preprocess = obj.contract_preprocess
-
-        if not contract_preprocess.crytic_compile:
+        if not obj.contract_preprocess.crytic_compile:
             raise PreprocessError("EVM features require to compile with crytic-compile")
 
-        contract_info = {}
-        function_info = {}
-        node_info = {}
-
         if isinstance(obj, Node):
-            contract_info["contract"] = obj.function.contract
+            contract = obj.function.contract
         elif isinstance(obj, Function):
-            contract_info["contract"] = obj.contract
+            contract = obj.contract
         else:
-            contract_info["contract"] = obj
-
-        # Get contract runtime bytecode, srcmap and cfg
-        contract_info["bytecode_runtime"] = contract_preprocess.crytic_compile.bytecode_runtime(
-            contract_info["contract"].name
-        )
-        contract_info["srcmap_runtime"] = contract_preprocess.crytic_compile.srcmap_runtime(
-            contract_info["contract"].name
-        )
-        contract_info["cfg"] = CFG(contract_info["bytecode_runtime"])
-
-        # Get contract init bytecode, srcmap and cfg
-        contract_info["bytecode_init"] = contract_preprocess.crytic_compile.bytecode_init(
-            contract_info["contract"].name
-        )
-        contract_info["srcmap_init"] = contract_preprocess.crytic_compile.srcmap_init(
-            contract_info["contract"].name
-        )
-        contract_info["cfg_init"] = CFG(contract_info["bytecode_init"])
+            contract = obj
+
+        contract_info = _get_contract_info(contract)
 
         # Get evm instructions
         if isinstance(obj, Contract):
@@ -58,43 +94,24 @@ def get_evm_instructions(obj):
 
         elif isinstance(obj, Function):
             # Get evm instructions for function
-            function_info["function"] = obj
-            function_info["contract_info"] = contract_info
-            obj.context[KEY_EVM_INS] = _get_evm_instructions_function(function_info)
+            obj.context[KEY_EVM_INS] = _get_evm_instructions_function(obj, contract_info)
 
         else:
             # Get evm instructions for node
-            node_info["node"] = obj
-
-            # CFG and srcmap depend on function being constructor or not
-            if node_info["node"].function.is_constructor:
-                cfg = contract_info["cfg_init"]
-                srcmap = contract_info["srcmap_init"]
-            else:
-                cfg = contract_info["cfg"]
-                srcmap = contract_info["srcmap_runtime"]
-
-            node_info["cfg"] = cfg
-            node_info["srcmap"] = srcmap
-            node_info["contract"] = contract_info["contract"]
-            node_info["contract_preprocess"] = contract_preprocess
-
-            obj.context[KEY_EVM_INS] = _get_evm_instructions_node(node_info)
+            obj.context[KEY_EVM_INS] = _get_evm_instructions_node(obj, contract_info)
 
     return obj.context.get(KEY_EVM_INS, [])
 
 
-def _get_evm_instructions_contract(contract_info):
+def _get_evm_instructions_contract(contract_info: _EVMContractInfo):
     # Combine the instructions of constructor and the rest of the contract
-    return contract_info["cfg_init"].instructions + contract_info["cfg"].instructions
+    return contract_info.cfg_init.instructions + contract_info.cfg.instructions
 
 
-def _get_evm_instructions_function(function_info):
-    function = function_info["function"]
-
+def _get_evm_instructions_function(function: Function, contract_info: _EVMContractInfo):
     # CFG depends on function being constructor or not
     if function.is_constructor:
-        cfg = function_info["contract_info"]["cfg_init"]
+        cfg = contract_info.cfg_init
         # _dispatcher is the only function recognised by evm-cfg-builder in bytecode_init.
         # _dispatcher serves the role of the constructor in init code,
         #    given that there are no other functions.
@@ -103,7 +120,7 @@ def _get_evm_instructions_function(function_info):
         name = "_dispatcher"
         func_hash = ""
     else:
-        cfg = function_info["contract_info"]["cfg"]
+        cfg = contract_info.cfg
         name = function.name
         # Get first four bytes of function singature's keccak-256 hash used as function selector
         func_hash = str(hex(get_function_id(function.full_name)))
@@ -122,28 +139,17 @@ def _get_evm_instructions_function(function_info):
     return function_ins
 
 
-def _get_evm_instructions_node(node_info):
-    # Get evm instructions for node's contract
-    contract_pcs = generate_source_to_evm_ins_mapping(
-        node_info["cfg"].instructions,
-        node_info["srcmap"],
-        node_info["contract_preprocess"],
-        node_info["contract"].source_mapping.filename.absolute,
-    )
-    contract_file = (
-        node_info["contract_preprocess"]
-        .source_code[node_info["contract"].source_mapping.filename.absolute]
-        .encode("utf8")
-    )
+def _get_evm_instructions_node(node: Node, contract_info: _EVMContractInfo):
+    # CFG and srcmap depend on function being constructor or not
+    is_init = node.function.is_constructor
+    cfg = contract_info.cfg_for(is_init)
 
     # Get evm instructions corresponding to node's source line number
-    node_source_line = (
-        contract_file[0 : node_info["node"].source_mapping.start].count("\n".encode("utf8")) + 1
-    )
-    node_pcs = contract_pcs.get(node_source_line, [])
+    node_source_line = contract_info.line_of_offset(node.source_mapping.start)
+    node_pcs = contract_info.source_to_pcs(is_init).get(node_source_line, [])
     node_ins = []
     for pc in node_pcs:
-        node_ins.append(node_info["cfg"].get_instruction_at(pc))
+        node_ins.append(cfg.get_instruction_at(pc))
 
     return node_ins
 
@@ -159,25 +165,17 @@ def _get_function_evm(cfg, function_name, function_hash):
     return None
 
 
-# pylint: disable=too-many-locals
-def generate_source_to_evm_ins_mapping(evm_instructions, srcmap_runtime, contract_preprocess, filename):
+def _parse_srcmap(srcmap) -> List[Tuple[int, str]]:
     """
-    Generate Solidity source to EVM instruction mapping using evm_cfg_builder:cfg.instructions
-    and solc:srcmap_runtime
-
-    Returns: Solidity source to EVM instruction mapping
+    Decompress a solc srcmap into one (offset, file_id) entry per instruction.
+    See https://solidity.readthedocs.io/en/v0.5.9/miscellaneous.html#source-mappings
+    In order to compress these source mappings especially for bytecode, the following rules are used:
+    If a field is empty, the value of the preceding element is used.
+    If a : is missing, all following fields are considered empty.
     """
-
-    source_to_evm_mapping = {}
-    file_source = contract_preprocess.source_code[filename].encode("utf8")
-    prev_mapping = []
-
-    for idx, mapping in enumerate(srcmap_runtime):
-        # Parse srcmap_runtime according to its format
-        # See https://solidity.readthedocs.io/en/v0.5.9/miscellaneous.html#source-mappings
-        # In order to compress these source mappings especially for bytecode, the following rules are used:
-        # If a field is empty, the value of the preceding element is used.
-        # If a : is missing, all following fields are considered empty.
+    parsed = []
+    prev_mapping: List[str] = []
+    for mapping in srcmap:
         mapping_item = mapping.split(":")
         mapping_item += prev_mapping[len(mapping_item) :]
 
@@ -187,17 +185,36 @@ def generate_source_to_evm_ins_mapping(evm_instructions, srcmap_runtime, contrac
 
         offset, _, file_id, *_ = mapping_item
         prev_mapping = mapping_item
+        parsed.append((int(offset), file_id))
+    return parsed
 
+
+def _source_line_to_pcs(
+    evm_instructions, parsed_srcmap: List[Tuple[int, str]], line_of_offset: Callable[[int], int]
+) -> Dict[int, List[int]]:
+    source_to_evm_mapping: Dict[int, List[int]] = {}
+    for idx, (offset, file_id) in enumerate(parsed_srcmap):
         if file_id == "-1":
             # Internal compiler-generated code snippets to be ignored
             # See https://github.com/ethereum/solidity/issues/6119#issuecomment-467797635
             continue
 
-        line_number = file_source[0 : int(offset)].count("\n".encode("utf8")) + 1
-
         # Append evm instructions to the corresponding source line number
         # Note: Some evm instructions in mapping are not necessarily in program execution order
         # Note: The order depends on how solc creates the srcmap_runtime
-        source_to_evm_mapping.setdefault(line_number, []).append(evm_instructions[idx].pc)
-
+        source_to_evm_mapping.setdefault(line_of_offset(offset), []).append(evm_instructions[idx].pc)
     return source_to_evm_mapping
+
+
+def generate_source_to_evm_ins_mapping(evm_instructions, srcmap_runtime, contract_preprocess, filename):
+    """
+    Generate Solidity source to EVM instruction mapping using evm_cfg_builder:cfg.instructions
+    and solc:srcmap_runtime
+
+    Returns: Solidity source to EVM instruction mapping
+    """
+    return _source_line_to_pcs(
+        evm_instructions,
+        _parse_srcmap(srcmap_runtime),
+        contract_preprocess.source_index(filename).line_of,
+    )
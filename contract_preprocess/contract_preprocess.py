@@ -1,13 +1,15 @@
 import logging
-from typing import Union, List, Optional
+from pathlib import Path
+from typing import Any, Dict, Union, List, Optional, Tuple
 
 from crytic_compile import CryticCompile, InvalidCompilation
 
 # pylint: disable= no-name-in-module
 from contract_preprocess.core.compilation_unit import CompilationUnitWrapper
-from contract_preprocess.core.core import Core
+from contract_preprocess.core.core import ANALYSIS_LEVELS, Core
 from contract_preprocess.exceptions import PreprocessError
 from contract_preprocess.solc_parsing.compilation_unit_solc import SolcCompilationUnitParser
+from contract_preprocess.utils.snapshot import load_snapshot, save_snapshot
 from contract_preprocess.vyper_parsing.vyper_compilation_unit import VyperCompilationUnit
 from contract_preprocess.vyper_parsing.ast.ast import parse
 
@@ -87,6 +89,10 @@ class ContractPreprocess(
             generate_patches (bool): if true, patches are generated (json output only)
             change_line_prefix (str): Change the line prefix (default #)
                 for the displayed source codes (i.e. file.sol#1).
+            analysis_level (str): "full" (default) or "calls": IR only, the SSA and the data
+                dependency are generated on first use
+            analyze_dependencies (bool): if false, the dependency contracts that no other contract
+                inherits or references are parsed to their signatures only (default true)
 
         """
         super().__init__()
@@ -108,6 +114,13 @@ class ContractPreprocess(
 
         self.no_fail = kwargs.get("no_fail", False)
 
+        self.analyze_dependencies = kwargs.get("analyze_dependencies", True)
+        self.analysis_level = kwargs.get("analysis_level", "full")
+        if self.analysis_level not in ANALYSIS_LEVELS:
+            raise PreprocessError(
+                f"Unknown analysis level {self.analysis_level!r} (expected one of {', '.join(ANALYSIS_LEVELS)})"
+            )
+
         self._parsers: List[SolcCompilationUnitParser] = []
         try:
             if isinstance(target, CryticCompile):
@@ -192,3 +205,24 @@ class ContractPreprocess(
     @property
     def triage_mode(self) -> bool:
         return self._triage_mode
+
+    def __getstate__(self) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        # The parsers (and their ASTs) are only needed until the analyses are done
+        state = dict(self.__dict__)
+        state["_parsers"] = []
+        # (instance dict, slots): _context is a slot of Context
+        return state, {"_context": self._context}
+
+    def save_snapshot(self, path: Union[str, Path]) -> None:
+        """
+        Save the analyzed model, see contract_preprocess.utils.snapshot
+        """
+        save_snapshot([self], Path(path))
+
+    @staticmethod
+    def load_snapshot(path: Union[str, Path], check_sources: bool = True) -> "ContractPreprocess":
+        """
+        Load a model saved by save_snapshot, without parsing or analyzing again.
+        Raise SnapshotError if the snapshot is stale.
+        """
+        return load_snapshot(Path(path), check_sources=check_sources)[0]
@@ -0,0 +1,192 @@
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from contract_preprocess.core.declarations import Function
+
+
+def internal_successors(function: "Function") -> List[Any]:
+    """
+    Callees followed by the recursive getters (Function.all_*):
+    internal calls, library calls and modifiers
+    """
+    from contract_preprocess.core.declarations import Function
+
+    ret = [ir.function for ir in function.internal_calls if isinstance(ir.function, Function)]
+    ret += [ir.function for ir in function.library_calls if isinstance(ir.function, Function)]
+    ret += function.modifiers
+    return ret
+
+
+class CallGraph:
+    """
+    Call graph over integer function ids, condensed into its strongly connected components.
+
+    SCC ids are assigned in Tarjan's completion order, which is a reverse topological order:
+    every callee SCC has a smaller id than its callers. Values that are transitive over the
+    calls (e.g. all the nodes reachable from a function) are computed once per SCC and shared
+    by every caller, instead of walking the graph again from each function.
+    """
+
+    def __init__(
+        self,
+        functions: Iterable[Any],
+        successors: Callable[[Any], Iterable[Any]] = internal_successors,
+    ) -> None:
+        self._functions: List[Any] = []
+        self._ids: Dict[Any, int] = {}
+        # adjacency arrays, indexed by function id
+        self._succs: List[List[int]] = []
+
+        to_explore = [self._add(f) for f in functions]
+        while to_explore:
+            fid = to_explore.pop()
+            succs: List[int] = []
+            for callee in successors(self._functions[fid]):
+                callee_id = self._ids.get(callee)
+                if callee_id is None:
+                    callee_id = self._add(callee)
+                    to_explore.append(callee_id)
+                succs.append(callee_id)
+            self._succs[fid] = succs
+
+        self._scc_of: List[int] = []
+        self._sccs: List[List[int]] = []
+        self._scc_succs: List[List[int]] = []
+        self._compute_sccs()
+
+        # key -> per SCC transitive values
+        self._values: Dict[Hashable, List[Optional[Set[Any]]]] = {}
+
+    def _add(self, function: Any) -> int:
+        fid = len(self._functions)
+        self._ids[function] = fid
+        self._functions.append(function)
+        self._succs.append([])
+        return fid
+
+    def _compute_sccs(self) -> None:
+        """Iterative Tarjan"""
+        n = len(self._functions)
+        index = [-1] * n
+        lowlink = [0] * n
+        on_stack = [False] * n
+        stack: List[int] = []
+        scc_of = [-1] * n
+        counter = 0
+
+        for root in range(n):
+            if index[root] != -1:
+                continue
+            index[root] = lowlink[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+            # (function id, position in its successors)
+            work = [(root, 0)]
+            while work:
+                v, i = work[-1]
+                succs = self._succs[v]
+                if i < len(succs):
+                    work[-1] = (v, i + 1)
+                    w = succs[i]
+                    if index[w] == -1:
+                        index[w] = lowlink[w] = counter
+                        counter += 1
+                        stack.append(w)
+                        on_stack[w] = True
+                        work.append((w, 0))
+                    elif on_stack[w]:
+                        lowlink[v] = min(lowlink[v], index[w])
+                    continue
+                work.pop()
+                if work:
+                    u = work[-1][0]
+                    lowlink[u] = min(lowlink[u], lowlink[v])
+                if lowlink[v] == index[v]:
+                    scc_id = len(self._sccs)
+                    members: List[int] = []
+                    while True:
+                        w = stack.pop()
+                        on_stack[w] = False
+                        scc_of[w] = scc_id
+                        members.append(w)
+                        if w == v:
+                            break
+                    self._sccs.append(members)
+
+        self._scc_of = scc_of
+        for members in self._sccs:
+            succs_scc = {scc_of[w] for v in members for w in self._succs[v]}
+            succs_scc.discard(scc_of[members[0]])
+            self._scc_succs.append(sorted(succs_scc))
+
+    def __contains__(self, function: Any) -> bool:
+        return function in self._ids
+
+    def __len__(self) -> int:
+        return len(self._functions)
+
+    @property
+    def functions(self) -> List[Any]:
+        return list(self._functions)
+
+    def function_id(self, function: Any) -> int:
+        return self._ids[function]
+
+    @property
+    def topological_order(self) -> List[int]:
+        """SCC ids, callers before callees"""
+        return list(range(len(self._sccs) - 1, -1, -1))
+
+    def scc(self, function: Any) -> List[Any]:
+        """Functions in the same strongly connected component (mutually recursive)"""
+        return [self._functions[fid] for fid in self._sccs[self._scc_of[self._ids[function]]]]
+
+    def reachable(self, function: Any) -> List[Any]:
+        """Functions reachable from function, including itself"""
+        return [
+            self._functions[fid]
+            for scc_id in self._reachable_sccs(self._scc_of[self._ids[function]])
+            for fid in self._sccs[scc_id]
+        ]
+
+    def _reachable_sccs(
+        self, root: int, known: Optional[List[Optional[Set[Any]]]] = None
+    ) -> List[int]:
+        """SCC ids reachable from root (stopping at the ones in known), callees first"""
+        seen = {root}
+        to_explore = [root]
+        while to_explore:
+            scc_id = to_explore.pop()
+            for succ in self._scc_succs[scc_id]:
+                if succ not in seen and (known is None or known[succ] is None):
+                    seen.add(succ)
+                    to_explore.append(succ)
+        return sorted(seen)
+
+    def transitive_values(
+        self, function: Any, key: Hashable, f_new_values: Callable[[Any], Iterable[Any]]
+    ) -> Set[Any]:
+        """
+        Union of f_new_values over the functions reachable from function (including itself).
+        The result is memoized per SCC under key: f_new_values must only depend on its argument.
+        Returns a shared set, which must not be modified.
+        """
+        values = self._values.get(key)
+        if values is None:
+            values = [None] * len(self._sccs)
+            self._values[key] = values
+
+        root = self._scc_of[self._ids[function]]
+        if values[root] is None:
+            # Callees have smaller SCC ids, so they are done before their callers
+            for scc_id in self._reachable_sccs(root, values):
+                if values[scc_id] is not None:
+                    continue
+                current: Set[Any] = set()
+                for fid in self._sccs[scc_id]:
+                    current.update(f_new_values(self._functions[fid]))
+                for succ in self._scc_succs[scc_id]:
+                    current |= values[succ]  # type: ignore
+                values[scc_id] = current
+        return values[root]  # type: ignore
@@ -107,6 +107,54 @@ class Node(SourceMapping):  # pylint: disable=too-many-public-methods
 
     """
 
+    __slots__ = [
+        "_node_type",
+        "_sons",
+        "_fathers",
+        "_immediate_dominator",
+        "_dom_successors",
+        "_dominance_frontier",
+        "_phi_origins_state_variables",
+        "_phi_origins_local_variables",
+        "_expression",
+        "_variable_declaration",
+        "_node_id",
+        "_vars_written",
+        "_vars_read",
+        "_ssa_vars_written",
+        "_ssa_vars_read",
+        "_internal_calls",
+        "_solidity_calls",
+        "_high_level_calls",
+        "_library_calls",
+        "_low_level_calls",
+        "_external_calls_as_expressions",
+        "_internal_calls_as_expressions",
+        "_irs",
+        "_all_ir_operations",
+        "_irs_ssa",
+        "_state_vars_written",
+        "_state_vars_read",
+        "_solidity_vars_read",
+        "_ssa_state_vars_written",
+        "_ssa_state_vars_read",
+        "_local_vars_read",
+        "_local_vars_written",
+        "_ir_vars",
+        "_ssa_local_vars_read",
+        "_ssa_local_vars_written",
+        "_expression_vars_written",
+        "_expression_vars_read",
+        "_expression_calls",
+        "_can_reenter",
+        "_can_send_eth",
+        "_asm_source_code",
+        "scope",
+        "file_scope",
+        "_function",
+        "_is_reachable",
+    ]
+
     def __init__(
         self,
         node_type: NodeType,
@@ -122,8 +170,6 @@ class Node(SourceMapping):  # pylint: disable=too-many-public-methods
         self._fathers: List["Node"] = []
 
         ## Dominators info
-        # Dominators nodes
-        self._dominators: Set["Node"] = set()
         self._immediate_dominator: Optional["Node"] = None
         ## Nodes of the dominators tree
         # self._dom_predecessors = set()
@@ -251,6 +297,7 @@ class Node(SourceMapping):  # pylint: disable=too-many-public-methods
         """
         list(Variable): Variables read (local/state/solidity)
         """
+        self.compilation_unit.generate_ssa()
         return list(self._vars_read)
 
     @property
@@ -258,6 +305,7 @@ class Node(SourceMapping):  # pylint: disable=too-many-public-methods
         """
         list(StateVariable): State variables read
         """
+        self.compilation_unit.generate_ssa()
         return list(self._state_vars_read)
 
     @property
@@ -265,6 +313,7 @@ class Node(SourceMapping):  # pylint: disable=too-many-public-methods
         """
         list(LocalVariable): Local variables read
         """
+        self.compilation_unit.generate_ssa()
         return list(self._local_vars_read)
 
     @property
@@ -279,6 +328,7 @@ class Node(SourceMapping):  # pylint: disable=too-many-public-methods
         """
         list(Variable): Variables read (local/state/solidity)
         """
+        self.compilation_unit.generate_ssa()
         return list(self._ssa_vars_read)
 
     @property
@@ -286,6 +336,7 @@ class Node(SourceMapping):  # pylint: disable=too-many-public-methods
         """
         list(StateVariable): State variables read
         """
+        self.compilation_unit.generate_ssa()
         return list(self._ssa_state_vars_read)
 
     @property
@@ -293,6 +344,7 @@ class Node(SourceMapping):  # pylint: disable=too-many-public-methods
         """
         list(LocalVariable): Local variables read
         """
+        self.compilation_unit.generate_ssa()
         return list(self._ssa_local_vars_read)
 
     @property
@@ -314,6 +366,7 @@ class Node(SourceMapping):  # pylint: disable=too-many-public-methods
         """
         list(Variable): Variables written (local/state/solidity)
         """
+        self.compilation_unit.generate_ssa()
         return list(self._vars_written)
 
     @property
@@ -321,6 +374,7 @@ class Node(SourceMapping):  # pylint: disable=too-many-public-methods
         """
         list(StateVariable): State variables written
         """
+        self.compilation_unit.generate_ssa()
         return list(self._state_vars_written)
 
     @property
@@ -328,6 +382,7 @@ class Node(SourceMapping):  # pylint: disable=too-many-public-methods
         """
         list(LocalVariable): Local variables written
         """
+        self.compilation_unit.generate_ssa()
         return list(self._local_vars_written)
 
     @property
@@ -335,6 +390,7 @@ class Node(SourceMapping):  # pylint: disable=too-many-public-methods
         """
         list(Variable): Variables written (local/state/solidity)
         """
+        self.compilation_unit.generate_ssa()
         return list(self._ssa_vars_written)
 
     @property
@@ -342,6 +398,7 @@ class Node(SourceMapping):  # pylint: disable=too-many-public-methods
         """
         list(StateVariable): State variables written
         """
+        self.compilation_unit.generate_ssa()
         return list(self._ssa_state_vars_written)
 
     @property
@@ -349,6 +406,7 @@ class Node(SourceMapping):  # pylint: disable=too-many-public-methods
         """
         list(LocalVariable): Local variables written
         """
+        self.compilation_unit.generate_ssa()
         return list(self._ssa_local_vars_written)
 
     @property
@@ -687,6 +745,8 @@ class Node(SourceMapping):  # pylint: disable=too-many-public-methods
         return
             list(Operation)
         """
+        # analysis_level="calls": generated on first use
+        self.compilation_unit.generate_ssa()
         return self._irs_ssa
 
     @irs_ssa.setter
@@ -734,14 +794,17 @@ class Node(SourceMapping):  # pylint: disable=too-many-public-methods
     @property
     def dominators(self) -> Set["Node"]:
         """
+        Derived from the dominator tree: the node and all its immediate dominators
         Returns:
             set(Node)
         """
-        return self._dominators
-
-    @dominators.setter
-    def dominators(self, dom: Set["Node"]) -> None:
-        self._dominators = dom
+        self.compilation_unit.generate_ssa()
+        dominators = {self}
+        node = self._immediate_dominator
+        while node is not None and node not in dominators:
+            dominators.add(node)
+            node = node.immediate_dominator
+        return dominators
 
     @property
     def immediate_dominator(self) -> Optional["Node"]:
@@ -749,6 +812,8 @@ class Node(SourceMapping):  # pylint: disable=too-many-public-methods
         Returns:
             Node or None
         """
+        # Computed with the SSA (analysis_level="calls": on first use)
+        self.compilation_unit.generate_ssa()
         return self._immediate_dominator
 
     @immediate_dominator.setter
@@ -761,6 +826,7 @@ class Node(SourceMapping):  # pylint: disable=too-many-public-methods
         Returns:
             set(Node)
         """
+        self.compilation_unit.generate_ssa()
         return self._dominance_frontier
 
     @dominance_frontier.setter
@@ -773,6 +839,7 @@ class Node(SourceMapping):  # pylint: disable=too-many-public-methods
 
     @property
     def dominator_successors(self) -> Set["Node"]:
+        self.compilation_unit.generate_ssa()
         return self._dom_successors
 
     @property
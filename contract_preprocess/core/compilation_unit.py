@@ -6,6 +6,7 @@ from crytic_compile import CompilationUnit, CryticCompile
 from crytic_compile.compiler.compiler import CompilerVersion
 from crytic_compile.utils.naming import Filename
 
+from contract_preprocess.core.call_graph.call_graph import CallGraph
 from contract_preprocess.core.context.context import Context
 from contract_preprocess.core.declarations import (
     Contract,
@@ -21,6 +22,7 @@ from contract_preprocess.core.declarations.function_top_level import FunctionTop
 from contract_preprocess.core.declarations.structure_top_level import StructureTopLevel
 from contract_preprocess.core.declarations.using_for_top_level import UsingForTopLevel
 from contract_preprocess.core.scope.scope import FileScope
+from contract_preprocess.core.scope.symbol_index import SymbolIndex
 from contract_preprocess.core.solidity_types.type_alias import TypeAliasTopLevel
 from contract_preprocess.core.variables.state_variable import StateVariable
 from contract_preprocess.core.variables.top_level_variable import TopLevelVariable
@@ -70,6 +72,14 @@ class CompilationUnitWrapper(Context):
         self._all_functions: Set[Function] = set()
         self._all_modifiers: Set[Modifier] = set()
 
+        # Lazy name -> declaration lookups used by the parsers
+        self._symbol_index = SymbolIndex()
+
+        self._is_ir_generated = False
+        # analysis_level="calls": the SSA (and data dependency) is generated on first use
+        self._is_ssa_pending = False
+        self._call_graph: Optional[CallGraph] = None
+
         # Memoize
         self._all_state_variables: Optional[Set[StateVariable]] = None
 
@@ -129,6 +139,10 @@ class CompilationUnitWrapper(Context):
     def crytic_compile(self) -> CryticCompile:
         return self._crytic_compile_compilation_unit.crytic_compile
 
+    @property
+    def symbol_index(self) -> SymbolIndex:
+        return self._symbol_index
+
     # endregion
     ###################################################################################
     ###################################################################################
@@ -207,6 +221,61 @@ class CompilationUnitWrapper(Context):
                         assert ir.function
                         ir.function.add_reachable_from_node(node, ir)
 
+    @property
+    def is_ssa_pending(self) -> bool:
+        return self._is_ssa_pending
+
+    def defer_ssa(self) -> None:
+        self._is_ssa_pending = True
+
+    def generate_ssa(self) -> None:
+        """
+        Generate the SSA deferred by analysis_level="calls", as the "full" level does after the IR:
+        dominators and SSA of every function, phi fixing, SSA reads/writes and data dependency.
+        No-op otherwise.
+
+        The SSA of a function depends on the other functions of its contract (state variable instances)
+        and on its callers (reachable_from_nodes), so it is generated for the whole compilation unit.
+        The variables read/written are completed from the SSA too (writes through storage references),
+        so their getters call it as well.
+        """
+        if not self._is_ssa_pending:
+            return
+        self._is_ssa_pending = False
+        # pylint: disable=import-outside-toplevel
+        from contract_preprocess.analyses.data_dependency.data_dependency import compute_dependency
+
+        for contract in self.contracts:
+            contract.convert_expression_to_ir_ssa()
+        for func in self.functions_top_level:
+            func.generate_ir_ssa({})
+        self.propagate_function_calls()
+        for contract in self.contracts:
+            contract.fix_phi()
+            contract.update_read_write_using_ssa()
+        # The SSA adds the writes through storage references: drop the values memoized on the call graph
+        self._call_graph = None
+        if not self.core.skip_data_dependency:
+            compute_dependency(self)
+
+    @property
+    def is_ir_generated(self) -> bool:
+        return self._is_ir_generated
+
+    def set_is_ir_generated(self, is_ir_generated: bool) -> None:
+        self._is_ir_generated = is_ir_generated
+        self._call_graph = None
+
+    @property
+    def call_graph(self) -> Optional[CallGraph]:
+        """
+        Graph of the internal calls, library calls and modifiers, used by Function.all_* getters
+        None until the IR of the compilation unit is generated (the calls are known from the IR)
+        """
+        if self._call_graph is None and self._is_ir_generated:
+            self._call_graph = CallGraph(self.functions_and_modifiers)
+        return self._call_graph
+
     # endregion
     ###################################################################################
     ###################################################################################
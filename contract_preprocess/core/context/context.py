@@ -1,15 +1,20 @@
 from collections import defaultdict
-from typing import Dict
+from typing import Dict, Optional
 
 
 class Context:  # pylint: disable=too-few-public-methods
+    __slots__ = ["_context"]
+
     def __init__(self) -> None:
         super().__init__()
-        self._context: Dict = {"MEMBERS": defaultdict(None)}
+        # Allocated on first use: most objects (IR operations, nodes, variables) never use it
+        self._context: Optional[Dict] = None
 
     @property
     def context(self) -> Dict:
         """
         Dict used by analysis
         """
+        if self._context is None:
+            self._context = {"MEMBERS": defaultdict(None)}
         return self._context
@@ -18,6 +18,7 @@ from contract_preprocess.core.compilation_unit import CompilationUnitWrapper
 from contract_preprocess.core.context.context import Context
 from contract_preprocess.core.declarations import Contract, FunctionContract
 from contract_preprocess.core.declarations.top_level import TopLevel
+from contract_preprocess.core.source_mapping.source_index import SourceIndex
 from contract_preprocess.core.source_mapping.source_mapping import SourceMapping, Source
 from contract_preprocess.ir.variables import Constant
 from contract_preprocess.utils.colors import red
@@ -35,7 +36,25 @@ def _relative_path_format(path: str) -> str:
     return path.split("..")[-1].strip(".").strip("/")
 
 
+# Module level default factories (instead of lambdas), so the defaultdicts can be pickled
+def _default_ignore_range() -> List[Tuple[int, ...]]:
+    return [(-1, -1)]
+
+
+def _ignore_ranges_of_file() -> Dict[str, List[Tuple[int, ...]]]:
+    return defaultdict(_default_ignore_range)
+
+
+def _offsets_of_file() -> Dict[int, Set]:
+    return defaultdict(set)
+
+
 # pylint: disable=too-many-instance-attributes,too-many-public-methods
+# "full": IR, SSA and data dependency of every function
+# "calls": IR only (enough for the calls, reads and writes); the SSA and data dependency are generated on first use
+ANALYSIS_LEVELS = ("full", "calls")
+
+
 class Core(Context):
     """
     ContractPreprocess static analyzer
@@ -46,6 +65,7 @@ class Core(Context):
 
         self._filename: Optional[str] = None
         self._raw_source_code: Dict[str, str] = {}
+        self._source_indexes: Dict[str, SourceIndex] = {}
         self._source_code_to_line: Optional[Dict[str, List[str]]] = None
 
         self._previous_results_filename: str = "contract_preprocess.db.json"
@@ -80,7 +100,7 @@ class Core(Context):
         # Maps from file to detector name to the start/end ranges for that detector.
         # Infinity is used to signal a detector has no end range.
         self._ignore_ranges: Dict[str, Dict[str, List[Tuple[int, ...]]]] = defaultdict(
-            lambda: defaultdict(lambda: [(-1, -1)])
+            _ignore_ranges_of_file
         )
 
         self._compilation_units: List[CompilationUnitWrapper] = []
@@ -105,6 +125,13 @@ class Core(Context):
 
         self.skip_data_dependency = False
 
+        # One of ANALYSIS_LEVELS
+        self.analysis_level = "full"
+
+        # If false, the dependency contracts that no other contract inherits or references are
+        # parsed to their signatures only (no function bodies, no IR)
+        self.analyze_dependencies = True
+
     @property
     def compilation_units(self) -> List[CompilationUnitWrapper]:
         return list(self._compilation_units)
@@ -180,9 +207,26 @@ class Core(Context):
         else:
             with open(path, encoding="utf8", newline="") as f:
                 self.source_code[path] = f.read()
+        self._source_indexes.pop(path, None)
 
         self.parse_ignore_comments(path)
 
+    def source_index(self, path: str) -> SourceIndex:
+        """
+        Cached UTF-8 buffer and line table of a file (see SourceIndex)
+        Falls back to crytic-compile's content for files not (yet) added with add_source_code
+        """
+        index = self._source_indexes.get(path)
+        if index is None:
+            if path in self.source_code:
+                source_code = self.source_code[path]
+            else:
+                assert self.crytic_compile
+                source_code = self.crytic_compile.src_content[path]
+            index = SourceIndex(source_code)
+            self._source_indexes[path] = index
+        return index
+
     @property
     def markdown_root(self) -> str:
         return self._markdown_root
@@ -255,11 +299,11 @@ class Core(Context):
             self._offset_to_references[ref.filename][ref.start] |= set(references)
 
     def _compute_offsets_to_ref_impl_decl(self):  # pylint: disable=too-many-branches
-        self._offset_to_references = defaultdict(lambda: defaultdict(lambda: set()))
-        self._offset_to_definitions = defaultdict(lambda: defaultdict(lambda: set()))
-        self._offset_to_implementations = defaultdict(lambda: defaultdict(lambda: set()))
-        self._offset_to_objects = defaultdict(lambda: defaultdict(lambda: set()))
-        self._offset_to_min_offset = defaultdict(lambda: defaultdict(lambda: set()))
+        self._offset_to_references = defaultdict(_offsets_of_file)
+        self._offset_to_definitions = defaultdict(_offsets_of_file)
+        self._offset_to_implementations = defaultdict(_offsets_of_file)
+        self._offset_to_objects = defaultdict(_offsets_of_file)
+        self._offset_to_min_offset = defaultdict(_offsets_of_file)
 
         for compilation_unit in self._compilation_units:
             for contract in compilation_unit.contracts:
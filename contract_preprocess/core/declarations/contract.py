@@ -9,6 +9,7 @@ from typing import Optional, List, Dict, Callable, Tuple, TYPE_CHECKING, Union,
 from crytic_compile.platform import Type as PlatformType
 
 from contract_preprocess.core.cfg.scope import Scope
+from contract_preprocess.core.scope.symbol_index import SymbolIndex, SymbolTable
 from contract_preprocess.core.source_mapping.source_mapping import SourceMapping
 from contract_preprocess.utils.using_for import USING_FOR, merge_using_for
 from contract_preprocess.core.declarations.function import Function, FunctionType, FunctionLanguage
@@ -67,8 +68,11 @@ class Contract(SourceMapping):  # pylint: disable=too-many-public-methods
         # contract B is A(1) { ..
         self._explicit_base_constructor_calls: List["Contract"] = []
 
-        self._enums: Dict[str, "EnumContract"] = {}
-        self._structures: Dict[str, "StructureContract"] = {}
+        # Lazy name -> declaration lookups used by the parsers
+        self._symbol_index = SymbolIndex()
+
+        self._enums: Dict[str, "EnumContract"] = SymbolTable(self._symbol_index)
+        self._structures: Dict[str, "StructureContract"] = SymbolTable(self._symbol_index)
         self._events: Dict[str, "EventContract"] = {}
         # map accessible variable from name -> variable
         # do not contain private variables inherited from contract
@@ -76,8 +80,8 @@ class Contract(SourceMapping):  # pylint: disable=too-many-public-methods
         self._variables_ordered: List["StateVariable"] = []
         # Reference id -> variable declaration (only available for compact AST)
         self._state_variables_by_ref_id: Dict[int, "StateVariable"] = {}
-        self._modifiers: Dict[str, "Modifier"] = {}
-        self._functions: Dict[str, "FunctionContract"] = {}
+        self._modifiers: Dict[str, "Modifier"] = SymbolTable(self._symbol_index)
+        self._functions: Dict[str, "FunctionContract"] = SymbolTable(self._symbol_index)
         self._linearizedBaseContracts: List[int] = []
         self._custom_errors: Dict[str, "CustomErrorContract"] = {}
         self._type_aliases: Dict[str, "TypeAliasContract"] = {}
@@ -105,6 +109,9 @@ class Contract(SourceMapping):  # pylint: disable=too-many-public-methods
 
         self._is_incorrectly_parsed: bool = False
 
+        # memoize is_from_dependency
+        self._is_from_dependency: Optional[bool] = None
+
         self._available_functions_as_dict: Optional[Dict[str, "Function"]] = None
         self._all_functions_called: Optional[List["Function"]] = None
 
@@ -289,6 +296,13 @@ class Contract(SourceMapping):  # pylint: disable=too-many-public-methods
     def enums_as_dict(self) -> Dict[str, "EnumContract"]:
         return self._enums
 
+    @property
+    def symbol_index(self) -> SymbolIndex:
+        """
+        Lazy name -> declaration lookups (structures, enums, functions, modifiers) used by the parsers
+        """
+        return self._symbol_index
+
     # endregion
     ###################################################################################
     ###################################################################################
@@ -650,7 +664,7 @@ class Contract(SourceMapping):  # pylint: disable=too-many-public-methods
         :param functions:  dict full_name -> function
         :return:
         """
-        self._functions = functions
+        self._functions = SymbolTable(self._symbol_index, functions)
 
     @property
     def functions_inherited(self) -> List["FunctionContract"]:
@@ -694,7 +708,7 @@ class Contract(SourceMapping):  # pylint: disable=too-many-public-methods
         :param modifiers:  dict full_name -> modifier
         :return:
         """
-        self._modifiers = modifiers
+        self._modifiers = SymbolTable(self._symbol_index, modifiers)
 
     @property
     def modifiers_inherited(self) -> List["Modifier"]:
@@ -1316,9 +1330,11 @@ class Contract(SourceMapping):  # pylint: disable=too-many-public-methods
     ###################################################################################
 
     def is_from_dependency(self) -> bool:
-        return self.compilation_unit.core.crytic_compile.is_dependency(
-            self.source_mapping.filename.absolute
-        )
+        if self._is_from_dependency is None:
+            self._is_from_dependency = self.compilation_unit.core.crytic_compile.is_dependency(
+                self.source_mapping.filename.absolute
+            )
+        return self._is_from_dependency
 
     # endregion
     ###################################################################################
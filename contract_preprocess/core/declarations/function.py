@@ -6,8 +6,20 @@ from abc import abstractmethod, ABCMeta
 from collections import namedtuple
 from enum import Enum
 from itertools import groupby
-from typing import Any, Dict, TYPE_CHECKING, List, Optional, Set, Union, Callable, Tuple
+from typing import (
+    Any,
+    Dict,
+    TYPE_CHECKING,
+    List,
+    Optional,
+    Set,
+    Union,
+    Callable,
+    Tuple,
+    Hashable,
+)
 
+from contract_preprocess.core.call_graph.call_graph import internal_successors
 from contract_preprocess.core.cfg.scope import Scope
 from contract_preprocess.core.declarations.solidity_variables import (
     SolidityFunction,
@@ -536,6 +548,12 @@ class Function(SourceMapping, metaclass=ABCMeta):  # pylint: disable=too-many-pu
     @is_shadowed.setter
     def is_shadowed(self, is_shadowed):
         self._is_shadowed = is_shadowed
+        self._invalidate_symbol_index()
+
+    def _invalidate_symbol_index(self) -> None:
+        """
+        Called when the function is shadowed: the lookups of the non shadowed functions of its contract are indexed
+        """
 
     @property
     def shadows(self) -> bool:
@@ -655,6 +673,7 @@ class Function(SourceMapping, metaclass=ABCMeta):  # pylint: disable=too-many-pu
         """
         list(LocalIRVariable): List of the parameters (SSA form)
         """
+        self.compilation_unit.generate_ssa()
         return list(self._parameters_ssa)
 
     def add_parameter_ssa(self, var: "LocalIRVariable") -> None:
@@ -708,6 +727,7 @@ class Function(SourceMapping, metaclass=ABCMeta):  # pylint: disable=too-many-pu
         """
         list(LocalIRVariable): List of the return variables (SSA form)
         """
+        self.compilation_unit.generate_ssa()
         return list(self._returns_ssa)
 
     def add_return_ssa(self, var: "LocalIRVariable") -> None:
@@ -797,6 +817,7 @@ class Function(SourceMapping, metaclass=ABCMeta):  # pylint: disable=too-many-pu
         """
         list(Variable): Variables read (local/state/solidity)
         """
+        self.compilation_unit.generate_ssa()
         return list(self._vars_read)
 
     @property
@@ -804,6 +825,7 @@ class Function(SourceMapping, metaclass=ABCMeta):  # pylint: disable=too-many-pu
         """
         list(Variable): Variables written (local/state/solidity)
         """
+        self.compilation_unit.generate_ssa()
         return list(self._vars_written)
 
     @property
@@ -811,6 +833,7 @@ class Function(SourceMapping, metaclass=ABCMeta):  # pylint: disable=too-many-pu
         """
         list(StateVariable): State variables read
         """
+        self.compilation_unit.generate_ssa()
         return list(self._state_vars_read)
 
     @property
@@ -825,6 +848,7 @@ class Function(SourceMapping, metaclass=ABCMeta):  # pylint: disable=too-many-pu
         """
         list(StateVariable): State variables written
         """
+        self.compilation_unit.generate_ssa()
         return list(self._state_vars_written)
 
     @property
@@ -832,6 +856,7 @@ class Function(SourceMapping, metaclass=ABCMeta):  # pylint: disable=too-many-pu
         """
         list(Variable): Variables read or written (local/state/solidity)
         """
+        self.compilation_unit.generate_ssa()
         return list(self._vars_read_or_written)
 
     @property
@@ -1079,10 +1104,12 @@ class Function(SourceMapping, metaclass=ABCMeta):  # pylint: disable=too-many-pu
         Return
             ReacheableNode
         """
+        self.compilation_unit.generate_ssa()
         return self._reachable_from_nodes
 
     @property
     def reachable_from_functions(self) -> Set["Function"]:
+        self.compilation_unit.generate_ssa()
         return self._reachable_from_functions
 
     @property
@@ -1117,65 +1144,52 @@ class Function(SourceMapping, metaclass=ABCMeta):  # pylint: disable=too-many-pu
     ###################################################################################
     ###################################################################################
 
-    def _explore_functions(self, f_new_values: Callable[["Function"], List]) -> List[Any]:
-        values = f_new_values(self)
-        explored = [self]
-        to_explore = [
-            ir.function
-            for ir in self.internal_calls
-            if isinstance(ir.function, Function) and ir.function not in explored
-        ]
-        to_explore += [
-            ir.function
-            for ir in self.library_calls
-            if isinstance(ir.function, Function) and ir.function not in explored
-        ]
-        to_explore += [m for m in self.modifiers if m not in explored]
+    def _explore_functions(
+        self, f_new_values: Callable[["Function"], List], key: Optional[Hashable] = None
+    ) -> List[Any]:
+        """
+        Union of f_new_values over the functions reachable through internal calls, library calls
+        and modifiers. Once the IR is generated, it is computed bottom-up on the compilation unit's
+        call graph and shared between callers under key
+        """
+        call_graph = self.compilation_unit.call_graph if key is not None else None
+        if call_graph is not None and self in call_graph:
+            return list(call_graph.transitive_values(self, key, f_new_values))
 
+        values = list(f_new_values(self))
+        explored = {self}
+        to_explore = [self]
         while to_explore:
-            f = to_explore[0]
-            to_explore = to_explore[1:]
-            if f in explored:
-                continue
-            explored.append(f)
-
-            values += f_new_values(f)
-
-            to_explore += [
-                ir.function
-                for ir in f.internal_calls
-                if isinstance(ir.function, Function)
-                and ir.function not in explored
-                and ir.function not in to_explore
-            ]
-            to_explore += [
-                ir.function
-                for ir in f.library_calls
-                if isinstance(ir.function, Function)
-                and ir.function not in explored
-                and ir.function not in to_explore
-            ]
-            to_explore += [m for m in f.modifiers if m not in explored and m not in to_explore]
+            f = to_explore.pop()
+            for callee in internal_successors(f):
+                if callee not in explored:
+                    explored.add(callee)
+                    values += f_new_values(callee)
+                    to_explore.append(callee)
 
         return list(set(values))
 
     def all_variables_read(self) -> List["Variable"]:
         """recursive version of variables_read"""
         if self._all_variables_read is None:
-            self._all_variables_read = self._explore_functions(lambda x: x.variables_read)
+            self._all_variables_read = self._explore_functions(
+                lambda x: x.variables_read, "variables_read"
+            )
         return self._all_variables_read
 
     def all_variables_written(self) -> List["Variable"]:
         """recursive version of variables_written"""
         if self._all_variables_written is None:
-            self._all_variables_written = self._explore_functions(lambda x: x.variables_written)
+            self._all_variables_written = self._explore_functions(
+                lambda x: x.variables_written, "variables_written"
+            )
         return self._all_variables_written
 
     def all_state_variables_read(self) -> List["StateVariable"]:
         """recursive version of variables_read"""
         if self._all_state_variables_read is None:
             self._all_state_variables_read = self._explore_functions(
-                lambda x: x.state_variables_read
+                lambda x: x.state_variables_read, "state_variables_read"
             )
         return self._all_state_variables_read
 
@@ -1183,69 +1197,83 @@ class Function(SourceMapping, metaclass=ABCMeta):  # pylint: disable=too-many-pu
         """recursive version of solidity_read"""
         if self._all_solidity_variables_read is None:
             self._all_solidity_variables_read = self._explore_functions(
-                lambda x: x.solidity_variables_read
+                lambda x: x.solidity_variables_read, "solidity_variables_read"
             )
         return self._all_solidity_variables_read
 
     def all_ir_variables(self) -> List["IRVariable"]:
         """recursive version of ir_variables"""
         if self._all_ir_variables is None:
-            self._all_ir_variables = self._explore_functions(lambda x: x.ir_variables)
+            self._all_ir_variables = self._explore_functions(
+                lambda x: x.ir_variables, "ir_variables"
+            )
         return self._all_ir_variables
 
     def all_nodes(self) -> List["Node"]:
         """recursive version of nodes"""
         if self._all_nodes is None:
-            self._all_nodes = self._explore_functions(lambda x: x.nodes)
+            self._all_nodes = self._explore_functions(lambda x: x.nodes, "nodes")
         return self._all_nodes
 
     def all_expressions(self) -> List["Expression"]:
         """recursive version of variables_read"""
         if self._all_expressions is None:
-            self._all_expressions = self._explore_functions(lambda x: x.expressions)
+            self._all_expressions = self._explore_functions(lambda x: x.expressions, "expressions")
         return self._all_expressions
 
     def all_ir_operations(self) -> List["Operation"]:
         if self._all_ir_operations is None:
-            self._all_ir_operations = self._explore_functions(lambda x: x.ir_operations)
+            self._all_ir_operations = self._explore_functions(
+                lambda x: x.ir_operations, "ir_operations"
+            )
         return self._all_ir_operations
 
     def all_state_variables_written(self) -> List[StateVariable]:
         """recursive version of variables_written"""
         if self._all_state_variables_written is None:
             self._all_state_variables_written = self._explore_functions(
-                lambda x: x.state_variables_written
+                lambda x: x.state_variables_written, "state_variables_written"
             )
         return self._all_state_variables_written
 
     def all_internal_calls(self) -> List["InternalCall"]:
         """recursive version of internal_calls"""
         if self._all_internals_calls is None:
-            self._all_internals_calls = self._explore_functions(lambda x: x.internal_calls)
+            self._all_internals_calls = self._explore_functions(
+                lambda x: x.internal_calls, "internal_calls"
+            )
         return self._all_internals_calls
 
     def all_low_level_calls(self) -> List["LowLevelCall"]:
         """recursive version of low_level calls"""
         if self._all_low_level_calls is None:
-            self._all_low_level_calls = self._explore_functions(lambda x: x.low_level_calls)
+            self._all_low_level_calls = self._explore_functions(
+                lambda x: x.low_level_calls, "low_level_calls"
+            )
         return self._all_low_level_calls
 
     def all_high_level_calls(self) -> List[Tuple["Contract", "HighLevelCall"]]:
         """recursive version of high_level calls"""
         if self._all_high_level_calls is None:
-            self._all_high_level_calls = self._explore_functions(lambda x: x.high_level_calls)
+            self._all_high_level_calls = self._explore_functions(
+                lambda x: x.high_level_calls, "high_level_calls"
+            )
         return self._all_high_level_calls
 
     def all_library_calls(self) -> List["LibraryCall"]:
         """recursive version of library calls"""
         if self._all_library_calls is None:
-            self._all_library_calls = self._explore_functions(lambda x: x.library_calls)
+            self._all_library_calls = self._explore_functions(
+                lambda x: x.library_calls, "library_calls"
+            )
         return self._all_library_calls
 
     def all_solidity_calls(self) -> List["SolidityCall"]:
         """recursive version of solidity calls"""
         if self._all_solidity_calls is None:
-            self._all_solidity_calls = self._explore_functions(lambda x: x.solidity_calls)
+            self._all_solidity_calls = self._explore_functions(
+                lambda x: x.solidity_calls, "solidity_calls"
+            )
         return self._all_solidity_calls
 
     @staticmethod
@@ -1263,12 +1291,14 @@ class Function(SourceMapping, metaclass=ABCMeta):  # pylint: disable=too-many-pu
         if include_loop:
             if self._all_conditional_state_variables_read_with_loop is None:
                 self._all_conditional_state_variables_read_with_loop = self._explore_functions(
-                    lambda x: self._explore_func_cond_read(x, include_loop)
+                    lambda x: self._explore_func_cond_read(x, include_loop),
+                    ("conditional_state_variables_read", include_loop),
                 )
             return self._all_conditional_state_variables_read_with_loop
         if self._all_conditional_state_variables_read is None:
             self._all_conditional_state_variables_read = self._explore_functions(
-                lambda x: self._explore_func_cond_read(x, include_loop)
+                lambda x: self._explore_func_cond_read(x, include_loop),
+                ("conditional_state_variables_read", include_loop),
             )
         return self._all_conditional_state_variables_read
 
@@ -1306,7 +1336,8 @@ class Function(SourceMapping, metaclass=ABCMeta):  # pylint: disable=too-many-pu
                 self._all_conditional_solidity_variables_read_with_loop = self._explore_functions(
                     lambda x: self._explore_func_conditional(
                         x, self._solidity_variable_in_binary, include_loop
-                    )
+                    ),
+                    ("conditional_solidity_variables_read", include_loop),
                 )
             return self._all_conditional_solidity_variables_read_with_loop
 
@@ -1314,7 +1345,8 @@ class Function(SourceMapping, metaclass=ABCMeta):  # pylint: disable=too-many-pu
             self._all_conditional_solidity_variables_read = self._explore_functions(
                 lambda x: self._explore_func_conditional(
                     x, self._solidity_variable_in_binary, include_loop
-                )
+                ),
+                ("conditional_solidity_variables_read", include_loop),
             )
         return self._all_conditional_solidity_variables_read
 
@@ -1344,7 +1376,8 @@ class Function(SourceMapping, metaclass=ABCMeta):  # pylint: disable=too-many-pu
         """
         if self._all_solidity_variables_used_as_args is None:
             self._all_solidity_variables_used_as_args = self._explore_functions(
-                lambda x: self._explore_func_nodes(x, self._solidity_variable_in_internal_calls)
+                lambda x: self._explore_func_nodes(x, self._solidity_variable_in_internal_calls),
+                "solidity_variables_used_as_args",
             )
         return self._all_solidity_variables_used_as_args
 
@@ -25,6 +25,10 @@ class FunctionContract(Function, ContractLevel):
     def set_contract_declarer(self, contract: "Contract") -> None:
         self._contract_declarer = contract
 
+    def _invalidate_symbol_index(self) -> None:
+        if self._contract is not None:
+            self._contract.symbol_index.bump()
+
     @property
     def contract_declarer(self) -> "Contract":
         """
@@ -1,4 +1,4 @@
-from typing import Set, List, TYPE_CHECKING
+from typing import Dict, List, TYPE_CHECKING
 
 from contract_preprocess.core.cfg.node import NodeType
 
@@ -6,83 +6,109 @@ if TYPE_CHECKING:
     from contract_preprocess.core.cfg.node import Node
 
 
-def intersection_predecessor(node: "Node") -> Set["Node"]:
-    if not node.fathers:
-        return set()
-
-    ret = node.fathers[0].dominators
-    for pred in node.fathers[1:]:
-        ret = ret.intersection(pred.dominators)
-    if not any(father.is_reachable for father in node.fathers):
-        return set()
-
-    ret = set()
-    for pred in node.fathers:
-        ret = ret.union(pred.dominators)
-
-    for pred in node.fathers:
-        if pred.is_reachable:
-            ret = ret.intersection(pred.dominators)
-    return ret
-
-
-def _compute_dominators(nodes: List["Node"]) -> None:
-    changed = True
-
-    while changed:
-        changed = False
-
-        for node in nodes:
-            new_set = intersection_predecessor(node).union({node})
-            if new_set != node.dominators:
-                node.dominators = new_set
-                changed = True
-
-
-def _compute_immediate_dominators(nodes: List["Node"]) -> None:
-    for node in nodes:
-        idom_candidates = set(node.dominators)
-        idom_candidates.remove(node)
-
-        if len(idom_candidates) == 1:
-            idom = idom_candidates.pop()
-            node.immediate_dominator = idom
-            idom.dominator_successors.add(node)
+def _reverse_postorder(preds: List[List[int]], roots: List[int]) -> List[int]:
+    """
+    Reverse postorder of the nodes reachable from roots, following the edges given by preds
+    """
+    succs: List[List[int]] = [[] for _ in preds]
+    for i, node_preds in enumerate(preds):
+        for p in node_preds:
+            succs[p].append(i)
+
+    visited = [False] * len(preds)
+    postorder: List[int] = []
+    for root in roots:
+        if visited[root]:
             continue
-
-        # all_dominators contain all the dominators of all the node's dominators
-        # But self inclusion is removed
-        # The idom is then the only node that in idom_candidate that is not in all_dominators
-        all_dominators = set()
-        for d in idom_candidates:
-            # optimization: if a node is already in all_dominators, then
-            # its dominators are already in too
-            if d in all_dominators:
+        visited[root] = True
+        # (node, position in its successors)
+        stack = [(root, 0)]
+        while stack:
+            i, pos = stack[-1]
+            if pos < len(succs[i]):
+                stack[-1] = (i, pos + 1)
+                succ = succs[i][pos]
+                if not visited[succ]:
+                    visited[succ] = True
+                    stack.append((succ, 0))
                 continue
-            all_dominators |= d.dominators - {d}
-
-        idom_candidates = all_dominators.symmetric_difference(idom_candidates)
-        assert len(idom_candidates) <= 1
-        if idom_candidates:
-            idom = idom_candidates.pop()
-            node.immediate_dominator = idom
-            idom.dominator_successors.add(node)
+            stack.pop()
+            postorder.append(i)
+    postorder.reverse()
+    return postorder
 
 
 def compute_dominators(nodes: List["Node"]) -> None:
     """
-    Naive implementation of Cooper, Harvey, Kennedy algo
+    Cooper, Harvey, Kennedy algo
     See 'A Simple,Fast Dominance Algorithm'
 
-    Compute strict domniators
+    Compute the immediate dominators (and the dominator tree) on integer arrays.
+    Only reachable fathers are considered; a node without reachable father is a root of
+    the dominator tree, and has no immediate dominator. Node.dominators is derived from the tree.
     """
+    n = len(nodes)
+    index: Dict["Node", int] = {node: i for i, node in enumerate(nodes)}
+
+    preds: List[List[int]] = []
+    roots: List[int] = []
+    for i, node in enumerate(nodes):
+        fathers = [father for father in node.fathers if father.is_reachable]
+        # A father outside of nodes has no dominators to intersect with
+        if not fathers or any(father not in index for father in fathers):
+            preds.append([])
+            roots.append(i)
+        else:
+            preds.append([index[father] for father in fathers])
+
+    order = _reverse_postorder(preds, roots)
+    # Nodes on a cycle unreachable from any root are handled as roots
+    if len(order) < n:
+        reached = set(order)
+        cycle_roots = [i for i in range(n) if i not in reached]
+        for i in cycle_roots:
+            preds[i] = []
+        order += _reverse_postorder(preds, cycle_roots)
+        roots += cycle_roots
+
+    # Every root is immediately dominated by a virtual node, numbered n, which comes first
+    virtual = n
+    rpo_number = [0] * (n + 1)
+    for number, i in enumerate(order):
+        rpo_number[i] = number + 1
+    idom = [-1] * (n + 1)
+    idom[virtual] = virtual
+    for root in roots:
+        idom[root] = virtual
+
+    def intersect(b1: int, b2: int) -> int:
+        while b1 != b2:
+            while rpo_number[b1] > rpo_number[b2]:
+                b1 = idom[b1]
+            while rpo_number[b2] > rpo_number[b1]:
+                b2 = idom[b2]
+        return b1
 
-    for n in nodes:
-        n.dominators = set(nodes)
-
-    _compute_dominators(nodes)
+    changed = True
+    while changed:
+        changed = False
+        for i in order:
+            if idom[i] == virtual and not preds[i]:
+                continue
+            new_idom = -1
+            for p in preds[i]:
+                if idom[p] == -1:
+                    continue
+                new_idom = p if new_idom == -1 else intersect(p, new_idom)
+            if new_idom != idom[i]:
+                idom[i] = new_idom
+                changed = True
 
-    _compute_immediate_dominators(nodes)
+    for i, node in enumerate(nodes):
+        if idom[i] not in (-1, virtual):
+            dominator = nodes[idom[i]]
+            node.immediate_dominator = dominator
+            dominator.dominator_successors.add(node)
 
 
 def compute_dominance_frontier(nodes: List["Node"]) -> None:
@@ -105,8 +131,8 @@ def compute_dominance_frontier(nodes: List["Node"]) -> None:
                     and runner.type == NodeType.IF
                     and node.type == NodeType.ENDIF
                 ):
-                    runner.dominance_frontier = runner.dominance_frontier.union({node})
+                    runner.dominance_frontier.add(node)
                 while runner != node.immediate_dominator:
-                    runner.dominance_frontier = runner.dominance_frontier.union({node})
+                    runner.dominance_frontier.add(node)
                     assert runner.immediate_dominator
                     runner = runner.immediate_dominator
@@ -11,6 +11,7 @@ from contract_preprocess.core.declarations.event_top_level import EventTopLevel
 from contract_preprocess.core.declarations.function_top_level import FunctionTopLevel
 from contract_preprocess.core.declarations.using_for_top_level import UsingForTopLevel
 from contract_preprocess.core.declarations.structure_top_level import StructureTopLevel
+from contract_preprocess.core.scope.symbol_index import SymbolIndex, SymbolTable
 from contract_preprocess.core.solidity_types import TypeAlias
 from contract_preprocess.core.variables.top_level_variable import TopLevelVariable
 from contract_preprocess.ir.variables import Constant
@@ -31,12 +32,15 @@ class FileScope:
         self.accessible_scopes: List[FileScope] = []
         self.exported_symbols: Set[int] = set()
 
-        self.contracts: Dict[str, Contract] = {}
+        # Lazy name -> declaration lookups used by the parsers
+        self.symbol_index = SymbolIndex()
+
+        self.contracts: Dict[str, Contract] = SymbolTable(self.symbol_index)
         # Custom error are a list instead of a dict
         # Because we parse the function signature later on
         # So we simplify the logic and have the scope fields all populated
         self.custom_errors: Set[CustomErrorTopLevel] = set()
-        self.enums: Dict[str, EnumTopLevel] = {}
+        self.enums: Dict[str, EnumTopLevel] = SymbolTable(self.symbol_index)
         # Functions is a list instead of a dict
         # Because we parse the function signature later on
         # So we simplify the logic and have the scope fields all populated
@@ -45,7 +49,7 @@ class FileScope:
         self.using_for_directives: Set[UsingForTopLevel] = set()
         self.imports: Set[Import] = set()
         self.pragmas: Set[Pragma] = set()
-        self.structures: Dict[str, StructureTopLevel] = {}
+        self.structures: Dict[str, StructureTopLevel] = SymbolTable(self.symbol_index)
         self.variables: Dict[str, TopLevelVariable] = {}
 
         # Renamed created by import
@@ -0,0 +1,121 @@
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class SymbolIndex:
+    """
+    Name -> declaration lookups of a FileScope, a Contract or a compilation unit, built lazily.
+
+    Every SymbolTable of the owner bumps its generation when it changes. A lookup is dropped once the generation
+    of its owner, or of one of the other indexes it reads (see get), changed, or when the stamp given for it differs
+    (for the containers that are not SymbolTables).
+    """
+
+    def __init__(self) -> None:
+        self.generation = 0
+        # key -> (stamp, indexes read, their generations, lookup)
+        self._lookups: Dict[Hashable, Tuple[Hashable, List["SymbolIndex"], List[int], Any]] = {}
+
+    def bump(self) -> None:
+        """
+        Mark the lookups that read this index as stale (for changes the SymbolTables do not see,
+        e.g. Function.is_shadowed)
+        """
+        self.generation += 1
+
+    def get(
+        self,
+        key: Hashable,
+        build: Callable[[], T],
+        stamp: Hashable = None,
+        reads: Optional[Callable[[], Iterable["SymbolIndex"]]] = None,
+    ) -> T:
+        """
+        reads: the indexes of the other owners whose tables build reads (e.g. the contracts of a scope).
+        It is called with build, so the tables that decide which owners they are must be read from this index
+        or from one of them.
+        """
+        cached = self._lookups.get(key)
+        if (
+            cached is not None
+            and cached[0] == stamp
+            and all(index.generation == generation for index, generation in zip(cached[1], cached[2]))
+        ):
+            return cached[3]
+        indexes = [self] + list(reads() if reads else [])
+        generations = [index.generation for index in indexes]
+        lookup = build()
+        self._lookups[key] = (stamp, indexes, generations, lookup)
+        return lookup
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Lookups are cheap to rebuild: never save them
+        return {"generation": 0, "_lookups": {}}
+
+
+class SymbolTable(dict):
+    """
+    dict of declarations (contracts, structures, enums, functions, modifiers) whose changes
+    invalidate the lookups of the SymbolIndex of its owner
+    """
+
+    __slots__ = ("_index",)
+
+    def __init__(self, index: SymbolIndex, *args: Any, **kwargs: Any) -> None:
+        self._index = index
+        # A new table replaces another one (e.g. Contract.set_functions)
+        index.bump()
+        super().__init__(*args, **kwargs)
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        self._index.bump()
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key: Any) -> None:
+        self._index.bump()
+        super().__delitem__(key)
+
+    def update(self, *args: Any, **kwargs: Any) -> None:  # pylint: disable=arguments-differ
+        self._index.bump()
+        super().update(*args, **kwargs)
+
+    def setdefault(self, key: Any, default: Any = None) -> Any:
+        self._index.bump()
+        return super().setdefault(key, default)
+
+    def pop(self, *args: Any) -> Any:  # pylint: disable=arguments-differ
+        self._index.bump()
+        return super().pop(*args)
+
+    def popitem(self) -> Tuple[Any, Any]:
+        self._index.bump()
+        return super().popitem()
+
+    def clear(self) -> None:
+        self._index.bump()
+        super().clear()
+
+    def __ior__(self, other: Any) -> "SymbolTable":  # type: ignore
+        self._index.bump()
+        return super().__ior__(other)
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # The owner's index is set before the items are restored (and not read: it may not be restored yet)
+        return _restore_table, (self._index,), None, None, iter(self.items())
+
+
+def _restore_table(index: SymbolIndex) -> SymbolTable:
+    table = dict.__new__(SymbolTable)
+    table._index = index  # pylint: disable=protected-access
+    return table
+
+
+def first_by(items: Iterable[T], key: Callable[[T], Hashable]) -> Dict[Hashable, T]:
+    """
+    key -> first item with this key (same result as next(i for i in items if key(i) == k))
+    """
+    ret: Dict[Hashable, T] = {}
+    for item in items:
+        ret.setdefault(key(item), item)
+    return ret
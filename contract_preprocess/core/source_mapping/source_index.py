@@ -0,0 +1,60 @@
+import re
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+
+# Same line breaks as bytes.splitlines (used by crytic-compile for offset -> line)
+_LINE_BREAK = re.compile(rb"\r\n|\r|\n")
+
+
+class SourceIndex:
+    """
+    UTF-8 buffer of one source file plus its sorted line start offsets.
+    All offsets are byte offsets (as in solc source mappings); lookups are O(log n)
+    and slicing goes through a memoryview, so no full-file copy is made per access.
+    """
+
+    def __init__(self, source_code: str) -> None:
+        self._data = source_code.encode("utf8")
+        self.buffer = memoryview(self._data)
+        self._line_starts: List[int] = [0] + [m.end() for m in _LINE_BREAK.finditer(self._data)]
+        # crytic-compile does not count a line after a trailing line break
+        self._n_lines = len(self._line_starts) - (1 if self._line_starts[-1] == len(self._data) else 0)
+        # Only needed if the file has a lone "\r", which is a line break for splitlines but not for "\n" counting
+        self._newline_starts: Optional[List[int]] = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # memoryviews cannot be pickled
+        state = dict(self.__dict__)
+        del state["buffer"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.buffer = memoryview(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def content(self, start: int, end: int) -> str:
+        return self.buffer[start:end].tobytes().decode("utf8")
+
+    def line_column(self, offset: int) -> Tuple[int, int]:
+        """
+        (line, column) of an offset, both starting from 1, with crytic-compile's get_line_from_offset semantics:
+        the end-of-file offset maps to (number of lines + 1, 0) and out-of-range offsets raise KeyError.
+        """
+        if offset < 0 or offset > len(self._data):
+            raise KeyError(offset)
+        if offset == len(self._data):
+            return self._n_lines + 1, 0
+        line = bisect_right(self._line_starts, offset)
+        return line, offset - self._line_starts[line - 1] + 1
+
+    def line_of(self, offset: int) -> int:
+        """1 + number of "\\n" before offset."""
+        if self._newline_starts is None:
+            if b"\r" in self._data and re.search(rb"\r(?!\n)", self._data):
+                self._newline_starts = [0] + [m.end() for m in re.finditer(rb"\n", self._data)]
+            else:
+                self._newline_starts = self._line_starts
+        return bisect_right(self._newline_starts, offset)
@@ -82,11 +82,7 @@ class Source:
         # If the compilation unit was not initialized, it means that the set_offset was never called
         # on the corresponding object, which should not happen
         assert self.compilation_unit
-        return (
-            self.compilation_unit.core.source_code[self.filename.absolute]
-            .encode("utf8")[self.start : self.end]
-            .decode("utf8")
-        )
+        return self.compilation_unit.core.source_index(self.filename.absolute).content(self.start, self.end)
 
     @property
     def content_hash(self) -> str:
@@ -133,17 +129,11 @@ def _compute_line(
     """
     Compute line(s) numbers and starting/ending columns
     from a start/end offset. All numbers start from 1.
-
-    Not done in an efficient way
     """
-
-    start_line, starting_column = compilation_unit.core.crytic_compile.get_line_from_offset(
-        filename, start
-    )
+    source_index = compilation_unit.core.source_index(filename.absolute)
+    start_line, starting_column = source_index.line_column(start)
     try:
-        end_line, ending_column = compilation_unit.core.crytic_compile.get_line_from_offset(
-            filename, start + length
-        )
+        end_line, ending_column = source_index.line_column(start + length)
     except KeyError:
         # This error may occur when the build is not synchronised with the source code on disk.
         # See the GitHub issue https://github.com/crytic/contract_preprocess/issues/2296
@@ -206,6 +196,8 @@ def _convert_source_mapping(
 
 
 class SourceMapping(Context):
+    __slots__ = ["source_mapping", "references", "_pattern"]
+
     def __init__(self) -> None:
         super().__init__()
         self.source_mapping: Optional[Source] = None
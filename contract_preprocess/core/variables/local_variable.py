@@ -12,6 +12,8 @@ if TYPE_CHECKING:  # type: ignore
 
 
 class LocalVariable(Variable):
+    __slots__ = ["_location", "_function"]
+
     def __init__(self) -> None:
         super().__init__()
         self._location: Optional[str] = None
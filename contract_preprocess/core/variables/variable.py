@@ -13,6 +13,18 @@ if TYPE_CHECKING:
 
 # pylint: disable=too-many-instance-attributes
 class Variable(SourceMapping):
+    __slots__ = [
+        "_name",
+        "_initial_expression",
+        "_type",
+        "_initialized",
+        "_visibility",
+        "_is_constant",
+        "_is_immutable",
+        "_is_reentrant",
+        "_write_protection",
+    ]
+
     def __init__(self) -> None:
         super().__init__()
         self._name: Optional[str] = None
@@ -101,6 +101,8 @@ class BinaryType(Enum):
 
 
 class Binary(OperationWithLValue):
+    __slots__ = ["_lvalue", "_variables", "_type"]
+
     def __init__(
         self,
         result: Variable,
@@ -6,6 +6,8 @@ from contract_preprocess.ir.operations.operation import Operation
 
 
 class Call(Operation):
+    __slots__ = ["_arguments", "_names"]
+
     def __init__(self, names: Optional[List[str]] = None) -> None:
         """
         #### Parameters
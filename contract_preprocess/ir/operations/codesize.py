@@ -9,6 +9,8 @@ from contract_preprocess.ir.variables.reference_ssa import ReferenceVariableSSA
 
 
 class CodeSize(OperationWithLValue):
+    __slots__ = ["_lvalue", "_value"]
+
     def __init__(
         self,
         value: Union[LocalVariable, LocalIRVariable],
@@ -4,6 +4,9 @@ from contract_preprocess.ir.variables.constant import Constant
 
 
 class EventCall(Call):
+    # call_id is set by ir.convert
+    __slots__ = ["_name", "call_id"]
+
     def __init__(self, name: Union[str, Constant]) -> None:
         super().__init__()
         self._name = name
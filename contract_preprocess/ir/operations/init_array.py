@@ -6,6 +6,8 @@ from contract_preprocess.ir.variables.temporary_ssa import TemporaryVariableSSA
 
 
 class InitArray(OperationWithLValue):
+    __slots__ = ["_lvalue", "_init_values"]
+
     def __init__(
         self, init_values: List[RVALUE], lvalue: Union[TemporaryVariableSSA, TemporaryVariable]
     ) -> None:
@@ -12,6 +12,18 @@ from contract_preprocess.ir.variables.tuple_ssa import TupleVariableSSA
 
 
 class InternalCall(Call, OperationWithLValue):  # pylint: disable=too-many-instance-attributes
+    __slots__ = [
+        "_lvalue",
+        "_contract_name",
+        "_nbr_arguments",
+        "_type_call",
+        "function_candidates",
+        "_function",
+        "_function_name",
+        # set by ir.convert
+        "call_id",
+    ]
+
     def __init__(
         self,
         function: Union[Function, Tuple[str, str]],
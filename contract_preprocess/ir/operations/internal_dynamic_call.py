@@ -14,6 +14,8 @@ from contract_preprocess.ir.variables.temporary_ssa import TemporaryVariableSSA
 class InternalDynamicCall(
     Call, OperationWithLValue
 ):  # pylint: disable=too-many-instance-attributes
+    __slots__ = ["_lvalue", "_function", "_function_type", "_callid", "_call_value", "_call_gas"]
+
     def __init__(
         self,
         lvalue: Optional[Union[TemporaryVariableSSA, TemporaryVariable]],
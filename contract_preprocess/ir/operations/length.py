@@ -11,6 +11,8 @@ from contract_preprocess.ir.variables.state_variable import StateIRVariable
 
 
 class Length(OperationWithLValue):
+    __slots__ = ["_lvalue", "_value"]
+
     def __init__(
         self,
         value: Union[StateVariable, LocalIRVariable, LocalVariable, StateIRVariable],
@@ -20,6 +20,17 @@ class LowLevelCall(Call, OperationWithLValue):  # pylint: disable=too-many-insta
     High level message call
     """
 
+    __slots__ = [
+        "_lvalue",
+        "_destination",
+        "_function_name",
+        "_nbr_arguments",
+        "_type_call",
+        "_callid",
+        "_call_value",
+        "_call_gas",
+    ]
+
     def __init__(
         self,
         destination: Union[LocalVariable, LocalIRVariable, TemporaryVariableSSA, TemporaryVariable],
@@ -9,6 +9,9 @@ class OperationWithLValue(Operation):
     Operation with a lvalue
     """
 
+    # _lvalue is a slot of the subclasses: many of them are also a Call, which has its own slots
+    __slots__ = []
+
     def __init__(self) -> None:
         super().__init__()
 
@@ -13,6 +13,8 @@ from contract_preprocess.ir.variables.reference_ssa import ReferenceVariableSSA
 
 
 class Member(OperationWithLValue):
+    __slots__ = ["_lvalue", "_variable_left", "_variable_right", "_gas", "_value"]
+
     def __init__(
         self,
         variable_left: SourceMapping,
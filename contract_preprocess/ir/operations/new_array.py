@@ -11,6 +11,8 @@ if TYPE_CHECKING:
 
 
 class NewArray(Call, OperationWithLValue):
+    __slots__ = ["_lvalue", "_array_type"]
+
     def __init__(
         self,
         array_type: "ArrayType",
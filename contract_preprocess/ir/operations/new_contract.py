@@ -11,6 +11,8 @@ from contract_preprocess.ir.variables.temporary_ssa import TemporaryVariableSSA
 
 
 class NewContract(Call, OperationWithLValue):  # pylint: disable=too-many-instance-attributes
+    __slots__ = ["_lvalue", "_contract_name", "_callid", "_call_value", "_call_salt"]
+
     def __init__(
         self,
         contract_name: UserDefinedType,
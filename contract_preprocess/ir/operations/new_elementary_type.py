@@ -5,6 +5,8 @@ from contract_preprocess.ir.utils.utils import is_valid_lvalue
 
 
 class NewElementaryType(Call, OperationWithLValue):
+    __slots__ = ["_lvalue", "_type"]
+
     def __init__(self, new_type, lvalue):
         assert isinstance(new_type, ElementaryType)
         assert is_valid_lvalue(lvalue)
@@ -13,6 +13,9 @@ from contract_preprocess.ir.variables.temporary_ssa import TemporaryVariableSSA
 
 
 class NewStructure(Call, OperationWithLValue):
+    # call_id is set by ir.convert
+    __slots__ = ["_lvalue", "_structure", "call_id"]
+
     def __init__(
         self,
         structure: StructureContract,
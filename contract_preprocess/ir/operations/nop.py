@@ -6,6 +6,8 @@ from contract_preprocess.ir.operations import Operation
 
 
 class Nop(Operation):
+    __slots__ = []
+
     @property
     def read(self) -> List[Variable]:
         return []
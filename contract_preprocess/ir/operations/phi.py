@@ -11,6 +11,8 @@ if TYPE_CHECKING:
 
 
 class Phi(OperationWithLValue):
+    __slots__ = ["_lvalue", "_rvalues", "_nodes"]
+
     def __init__(
         self, left_variable: Union[LocalIRVariable, StateIRVariable], nodes: Set["Node"]
     ) -> None:
@@ -13,6 +13,8 @@ from contract_preprocess.ir.variables.temporary_ssa import TemporaryVariableSSA
 
 
 class Send(Call, OperationWithLValue):
+    __slots__ = ["_lvalue", "_destination", "_call_value"]
+
     def __init__(
         self,
         destination: Union[LocalVariable, LocalIRVariable],
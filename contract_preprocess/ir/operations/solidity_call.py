@@ -6,6 +6,8 @@ from contract_preprocess.ir.operations.lvalue import OperationWithLValue
 
 
 class SolidityCall(Call, OperationWithLValue):
+    __slots__ = ["_lvalue", "_function", "_nbr_arguments", "_type_call"]
+
     def __init__(
         self,
         function: SolidityFunction,
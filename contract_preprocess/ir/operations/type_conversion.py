@@ -13,6 +13,8 @@ from contract_preprocess.ir.variables.temporary_ssa import TemporaryVariableSSA
 
 
 class TypeConversion(OperationWithLValue):
+    __slots__ = ["_lvalue", "_variable", "_type"]
+
     def __init__(
         self,
         result: Union[TemporaryVariableSSA, TemporaryVariable],
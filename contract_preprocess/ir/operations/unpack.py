@@ -9,6 +9,8 @@ from contract_preprocess.ir.variables.tuple_ssa import TupleVariableSSA
 
 
 class Unpack(OperationWithLValue):
+    __slots__ = ["_lvalue", "_tuple", "_idx"]
+
     def __init__(
         self,
         result: Union[LocalVariableInitFromTuple, LocalIRVariable],
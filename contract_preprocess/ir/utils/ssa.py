@@ -1,5 +1,18 @@
 import logging
-from typing import Any, Callable, Dict, List, Tuple, Union
+from itertools import chain
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
 import contract_preprocess.ir.variables.tuple_ssa
 from contract_preprocess.core.cfg.node import Node, NodeType
@@ -134,11 +147,13 @@ def add_ssa_ir(
         if v.name:
             init_definition[v.name] = (v, function.entry_point)
 
+    liveness = Liveness(function.nodes)
+
     # We only add phi function for state variable at entry node if
     # The state variable is used
     # And if the state variables is written in another function (otherwise its stay at index 0)
     for (_, variable_instance) in all_state_variables_instances.items():
-        if is_used_later(function.entry_point, variable_instance):
+        if liveness.is_used_later(function.entry_point, variable_instance):
             # rvalues are fixed in solc_parsing.declaration.function
             function.entry_point.add_ssa_ir(Phi(StateIRVariable(variable_instance), set()))
 
@@ -148,14 +163,12 @@ def add_ssa_ir(
         for (variable, nodes) in node.phi_origins_local_variables.values():
             if len(nodes) < 2:
                 continue
-            if not is_used_later(node, variable):
+            if not liveness.is_used_later(node, variable):
                 continue
             node.add_ssa_ir(Phi(LocalIRVariable(variable), nodes))
         for (variable, nodes) in node.phi_origins_state_variables.values():
             if len(nodes) < 2:
                 continue
-            # if not is_used_later(node, variable.name, []):
-            #    continue
             node.add_ssa_ir(Phi(StateIRVariable(variable), nodes))
 
     init_local_variables_instances = {}
@@ -195,24 +208,89 @@ def add_ssa_ir(
 
     generate_ssa_irs(
         function.entry_point,
-        dict(init_local_variables_instances),
+        init_local_variables_instances,
         all_init_local_variables_instances,
-        dict(init_state_variables_instances),
+        init_state_variables_instances,
         all_state_variables_instances,
         init_local_variables_instances,
-        [],
+        set(),
+        liveness,
     )
 
     fix_phi_rvalues_and_storage_ref(
         function.entry_point,
-        dict(init_local_variables_instances),
+        init_local_variables_instances,
         all_init_local_variables_instances,
-        dict(init_state_variables_instances),
+        init_state_variables_instances,
         all_state_variables_instances,
         init_local_variables_instances,
     )
 
 
+_UNDEFINED = object()
+
+
+class _RenameStack(dict):
+    """
+    Instances dict of the SSA renaming walk (variable name -> current instance).
+    Every write is pushed on a stack and popped once the walk leaves the node that made it
+    (push on def, pop on exit): a node sees the writes of its ancestors in the walk only,
+    without copying the dict on every edge.
+    """
+
+    __slots__ = ("_pushed",)
+
+    def __init__(self, initial: Dict[str, Any]) -> None:
+        super().__init__(initial)
+        self._pushed: List[Tuple[str, Any]] = []
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._pushed.append((key, dict.get(self, key, _UNDEFINED)))
+        super().__setitem__(key, value)
+
+    def mark(self) -> int:
+        return len(self._pushed)
+
+    def pop_to(self, mark: int) -> None:
+        pushed = self._pushed
+        while len(pushed) > mark:
+            key, previous = pushed.pop()
+            if previous is _UNDEFINED:
+                dict.__delitem__(self, key)
+            else:
+                dict.__setitem__(self, key, previous)
+
+
+def _rename_walk(
+    root: Node,
+    local_variables_instances: _RenameStack,
+    state_variables_instances: _RenameStack,
+    rename: Callable[[Node], bool],
+    children: Callable[[Node], Iterable[Node]],
+) -> None:
+    """
+    Depth-first walk from root with an explicit stack (no recursion limit on deep CFGs).
+    rename(node) returns False if the node is skipped; otherwise children(node) are walked next,
+    and the instances written by rename(node) are popped once they are all done.
+    """
+    stack: List[Tuple[Iterator[Node], int, int]] = []
+    node: Optional[Node] = root
+    while True:
+        if node is not None:
+            local_mark = local_variables_instances.mark()
+            state_mark = state_variables_instances.mark()
+            if rename(node):
+                stack.append((iter(children(node)), local_mark, state_mark))
+        if not stack:
+            return
+        successors, local_mark, state_mark = stack[-1]
+        node = next(successors, None)
+        if node is None:
+            stack.pop()
+            local_variables_instances.pop_to(local_mark)
+            state_variables_instances.pop_to(state_mark)
+
+
 def generate_ssa_irs(
     node: Node,
     local_variables_instances: Dict[str, LocalIRVariable],
@@ -220,20 +298,57 @@ def generate_ssa_irs(
     state_variables_instances: Dict[str, StateIRVariable],
     all_state_variables_instances: Dict[str, StateIRVariable],
     init_local_variables_instances: Dict[str, LocalIRVariable],
-    visited: List[Node],
+    visited: Set[Node],
+    liveness: Optional["Liveness"] = None,
 ) -> None:
+    """
+    Rename the variables of the nodes reached from node (dominator successors, then dominance frontier),
+    in depth-first order. local_variables_instances and state_variables_instances are left unchanged.
+    """
+    # pylint: disable=unused-argument
+
+    if liveness is None:
+        liveness = Liveness(node.function.nodes)
+
+    local_instances = _RenameStack(local_variables_instances)
+    state_instances = _RenameStack(state_variables_instances)
+
+    def rename(n: Node) -> bool:
+        if n in visited:
+            return False
+        if n.type in [NodeType.ENDIF, NodeType.ENDLOOP] and any(
+            not father in visited for father in n.fathers
+        ):
+            return False
+        # visited is shared
+        visited.add(n)
+        _generate_node_ssa_irs(
+            n,
+            local_instances,
+            all_local_variables_instances,
+            state_instances,
+            all_state_variables_instances,
+            liveness,
+        )
+        return True
+
+    _rename_walk(
+        node,
+        local_instances,
+        state_instances,
+        rename,
+        lambda n: chain(n.dominator_successors, n.dominance_frontier),
+    )
 
-    if node in visited:
-        return
-
-    if node.type in [NodeType.ENDIF, NodeType.ENDLOOP] and any(
-        not father in visited for father in node.fathers
-    ):
-        return
-
-    # visited is shared
-    visited.append(node)
 
+def _generate_node_ssa_irs(
+    node: Node,
+    local_variables_instances: Dict[str, LocalIRVariable],
+    all_local_variables_instances: Dict[str, LocalIRVariable],
+    state_variables_instances: Dict[str, StateIRVariable],
+    all_state_variables_instances: Dict[str, StateIRVariable],
+    liveness: "Liveness",
+) -> None:
     for ir in node.irs_ssa:
         assert isinstance(ir, Phi)
         update_lvalue(
@@ -281,8 +396,10 @@ def generate_ssa_irs(
             if isinstance(ir, (InternalCall, HighLevelCall, InternalDynamicCall, LowLevelCall)):
                 if isinstance(ir, LibraryCall):
                     continue
+                if not liveness.any_state_variable_used_later(node):
+                    continue
                 for variable in all_state_variables_instances.values():
-                    if not is_used_later(node, variable):
+                    if not liveness.is_used_later(node, variable):
                         continue
                     new_var = StateIRVariable(variable)
                     new_var.index = all_state_variables_instances[variable.canonical_name].index + 1
@@ -307,28 +424,6 @@ def generate_ssa_irs(
                         elif not isinstance(new_ir.rvalue, Constant):
                             new_ir.lvalue.add_refers_to(new_ir.rvalue)
 
-    for succ in node.dominator_successors:
-        generate_ssa_irs(
-            succ,
-            dict(local_variables_instances),
-            all_local_variables_instances,
-            dict(state_variables_instances),
-            all_state_variables_instances,
-            init_local_variables_instances,
-            visited,
-        )
-
-    for dominated in node.dominance_frontier:
-        generate_ssa_irs(
-            dominated,
-            dict(local_variables_instances),
-            all_local_variables_instances,
-            dict(state_variables_instances),
-            all_state_variables_instances,
-            init_local_variables_instances,
-            visited,
-        )
-
 
 # endregion
 ###################################################################################
@@ -364,45 +459,91 @@ def last_name(
     return max(candidates, key=lambda v: v.index)
 
 
-def is_used_later(
-    initial_node: Node,
-    variable: Union[StateIRVariable, LocalVariable, TemporaryVariableSSA],
-) -> bool:
-    # TODO: does not handle the case where its read and written in the declaration node
-    # It can be problematic if this happens in a loop/if structure
-    # Ex:
-    # for(;true;){
-    #   if(true){
-    #     uint a = a;
-    #    }
-    #     ..
-    to_explore = {initial_node}
-    explored = set()
-
-    while to_explore:
-        node = to_explore.pop()
-        explored.add(node)
-        if isinstance(variable, LocalVariable):
-            if any(v.name == variable.name for v in node.local_variables_read):
-                return True
-            if any(v.name == variable.name for v in node.local_variables_written):
-                return False
-        if isinstance(variable, StateVariable):
-            if any(
-                v.name == variable.name and v.contract == variable.contract
-                for v in node.state_variables_read
-            ):
-                return True
-            if any(
-                v.name == variable.name and v.contract == variable.contract
-                for v in node.state_variables_written
-            ):
-                return False
-        for son in node.sons:
-            if not son in explored:
-                to_explore.add(son)
-
-    return False
+def _liveness_key(variable: Any) -> Optional[Hashable]:
+    # Local variables by name, state variables by name and contract
+    if isinstance(variable, LocalVariable):
+        return variable.name
+    if isinstance(variable, StateVariable):
+        return variable.name, variable.contract
+    return None
+
+
+class Liveness:
+    """
+    Backward liveness of the local and state variables of a function, computed once on bitsets.
+    A variable is live at a node if the node reads it, or if the node does not write it and it is live
+    at one of the sons. is_used_later(node, variable) then answers in O(1), without exploring the CFG.
+
+    A variable is live as soon as one path reads it before writing it, whatever the order the CFG is explored in.
+    """
+
+    def __init__(self, nodes: List[Node]) -> None:
+        self._bits: Dict[Hashable, int] = {}
+        self._state_variables_mask = 0
+
+        # Sons are in the function, but follow them anyway
+        all_nodes = list(nodes)
+        seen = set(all_nodes)
+        for node in all_nodes:
+            for son in node.sons:
+                if son not in seen:
+                    seen.add(son)
+                    all_nodes.append(son)
+
+        use: Dict[Node, int] = {}
+        define: Dict[Node, int] = {}
+        for node in all_nodes:
+            use[node] = self._mask(node.local_variables_read) | self._mask(node.state_variables_read)
+            define[node] = self._mask(node.local_variables_written) | self._mask(
+                node.state_variables_written
+            )
+
+        self._live: Dict[Node, int] = dict(use)
+        to_explore = list(all_nodes)
+        in_to_explore = set(all_nodes)
+        while to_explore:
+            node = to_explore.pop()
+            in_to_explore.discard(node)
+            live_out = 0
+            for son in node.sons:
+                live_out |= self._live[son]
+            live = use[node] | (live_out & ~define[node])
+            if live != self._live[node]:
+                self._live[node] = live
+                for father in node.fathers:
+                    if father in self._live and father not in in_to_explore:
+                        in_to_explore.add(father)
+                        to_explore.append(father)
+
+    def _mask(self, variables: List[Variable]) -> int:
+        mask = 0
+        for variable in variables:
+            key = _liveness_key(variable)
+            if key is None:
+                continue
+            bit = self._bits.get(key)
+            if bit is None:
+                bit = len(self._bits)
+                self._bits[key] = bit
+                if isinstance(variable, StateVariable):
+                    self._state_variables_mask |= 1 << bit
+            mask |= 1 << bit
+        return mask
+
+    def is_used_later(
+        self,
+        node: Node,
+        variable: Union[StateIRVariable, LocalVariable, TemporaryVariableSSA],
+    ) -> bool:
+        key = _liveness_key(variable)
+        bit = self._bits.get(key) if key is not None else None
+        if bit is None:
+            # Never read nor written in the function
+            return False
+        return bool(self._live.get(node, 0) >> bit & 1)
+
+    def any_state_variable_used_later(self, node: Node) -> bool:
+        return bool(self._live.get(node, 0) & self._state_variables_mask)
 
 
 # endregion
@@ -490,6 +631,34 @@ def fix_phi_rvalues_and_storage_ref(
     state_variables_instances: Dict[str, StateIRVariable],
     all_state_variables_instances: Dict[str, StateIRVariable],
     init_local_variables_instances: Dict[str, LocalIRVariable],
+) -> None:
+    """
+    Fix the phi rvalues and the storage references of the nodes dominated by node, in depth-first order
+    """
+    local_instances = _RenameStack(local_variables_instances)
+    state_instances = _RenameStack(state_variables_instances)
+
+    def rename(n: Node) -> bool:
+        _fix_node_phi_rvalues_and_storage_ref(
+            n,
+            local_instances,
+            all_local_variables_instances,
+            state_instances,
+            all_state_variables_instances,
+            init_local_variables_instances,
+        )
+        return True
+
+    _rename_walk(node, local_instances, state_instances, rename, lambda n: n.dominator_successors)
+
+
+def _fix_node_phi_rvalues_and_storage_ref(
+    node: Node,
+    local_variables_instances: Dict[str, LocalIRVariable],
+    all_local_variables_instances: Dict[str, LocalIRVariable],
+    state_variables_instances: Dict[str, StateIRVariable],
+    all_state_variables_instances: Dict[str, StateIRVariable],
+    init_local_variables_instances: Dict[str, LocalIRVariable],
 ) -> None:
     for ir in node.irs_ssa:
         if isinstance(ir, (Phi)) and not ir.rvalues:
@@ -522,15 +691,6 @@ def fix_phi_rvalues_and_storage_ref(
                                 state_variables_instances,
                                 all_state_variables_instances,
                             )
-    for succ in node.dominator_successors:
-        fix_phi_rvalues_and_storage_ref(
-            succ,
-            dict(local_variables_instances),
-            all_local_variables_instances,
-            dict(state_variables_instances),
-            all_state_variables_instances,
-            init_local_variables_instances,
-        )
 
 
 def add_phi_origins(
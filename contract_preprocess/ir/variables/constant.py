@@ -9,6 +9,8 @@ from contract_preprocess.utils.integer_conversion import convert_string_to_int
 
 @total_ordering
 class Constant(IRVariable):
+    __slots__ = ["_index", "_original_value", "_subdenomination", "_val"]
+
     def __init__(
         self,
         val: str,
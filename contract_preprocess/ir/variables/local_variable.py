@@ -8,6 +8,8 @@ from contract_preprocess.ir.variables.state_variable import StateIRVariable
 class LocalIRVariable(
     LocalVariable, IRVariable
 ):  # pylint: disable=too-many-instance-attributes
+    __slots__ = ["_index", "_is_storage", "_refers_to", "_non_ssa_version"]
+
     def __init__(self, local_variable: LocalVariable) -> None:
         assert isinstance(local_variable, LocalVariable)
 
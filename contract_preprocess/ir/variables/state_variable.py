@@ -5,6 +5,8 @@ from contract_preprocess.ir.variables.variable import IRVariable
 class StateIRVariable(
     StateVariable, IRVariable
 ):  # pylint: disable=too-many-instance-attributes
+    __slots__ = ["_index", "_non_ssa_version"]
+
     def __init__(self, state_variable: StateVariable) -> None:
         assert isinstance(state_variable, StateVariable)
 
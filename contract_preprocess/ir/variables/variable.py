@@ -2,6 +2,9 @@ from contract_preprocess.core.variables.variable import Variable
 
 
 class IRVariable(Variable):
+    # _index is a slot of the subclasses: LocalIRVariable and StateIRVariable also derive from a core variable
+    __slots__ = []
+
     def __init__(self) -> None:
         super().__init__()
         self._index = 0
@@ -4,7 +4,7 @@ import logging
 import os
 import re
 from pathlib import Path
-from typing import List, Dict
+from typing import Any, Dict, Iterator, List, Set
 
 from contract_preprocess.analyses.data_dependency.data_dependency import compute_dependency
 from contract_preprocess.core.compilation_unit import CompilationUnitWrapper
@@ -40,6 +40,27 @@ class InheritanceResolutionError(PreprocessException):
     pass
 
 
+def _ast_nodes(data: Any) -> Iterator[Dict]:
+    """
+    Every node of a compact AST
+    """
+    stack = [data]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            yield item
+            stack.extend(item.values())
+        elif isinstance(item, list):
+            stack.extend(item)
+
+
+def _is_from_dependency(contract: Contract) -> bool:
+    try:
+        return contract.is_from_dependency()
+    except Exception:  # pylint: disable=broad-except
+        return False
+
+
 def _handle_import_aliases(
     symbol_aliases: Dict, import_directive: Import, scope: FileScope
 ) -> None:
@@ -103,6 +124,10 @@ class SolcCompilationUnitParser(CallerContextExpression):
         self._using_for_top_level_parser: List[UsingForTopLevelSolc] = []
         self._events_top_level_parser: List[EventTopLevelSolc] = []
         self._all_functions_and_modifier_parser: List[FunctionSolc] = []
+        # Top level items other than the contracts (compact AST), see _signature_only_contracts
+        self._top_level_items_data: List[Dict] = []
+        # Contracts whose function bodies are not analyzed (analyze_dependencies=False)
+        self._signature_only: Set[Contract] = set()
 
         self._top_level_contracts_counter = 0
 
@@ -260,6 +285,8 @@ class SolcCompilationUnitParser(CallerContextExpression):
             scope.exported_symbols |= set(refId)
 
         for top_level_data in data_loaded[self.get_children()]:
+            if self._is_compact_ast and top_level_data[self.get_key()] != "ContractDefinition":
+                self._top_level_items_data.append(top_level_data)
             if top_level_data[self.get_key()] == "ContractDefinition":
                 contract = Contract(self._compilation_unit, scope)
                 contract_parser = ContractSolc(self, contract, top_level_data)
@@ -554,6 +581,8 @@ class SolcCompilationUnitParser(CallerContextExpression):
                 contract_parser.set_is_analyzed(True)
                 contract_parser.delete_content()
 
+        self._signature_only = self._signature_only_contracts()
+
         contracts_to_be_analyzed = list(self._underlying_contract_to_parser.values())
 
         # Any contract can refer another contract enum without need for inheritance
@@ -587,11 +616,53 @@ class SolcCompilationUnitParser(CallerContextExpression):
 
         self._parsed = True
 
+    def _signature_only_contracts(self) -> Set[Contract]:
+        """
+        With analyze_dependencies=False: the dependency contracts that no other contract needs, parsed to
+        their signatures only. A contract is needed if it is not from a dependency, or if a needed contract
+        or a top level item inherits it or refers to one of its declarations (the contract, its functions,
+        types, events...: any referencedDeclaration of the compact AST).
+        """
+        if self._compilation_unit.core.analyze_dependencies or not self._is_compact_ast:
+            return set()
+        parsers = list(self._underlying_contract_to_parser.values())
+        if not any(_is_from_dependency(p.underlying_contract) for p in parsers):
+            return set()
+
+        # declaration id -> contract declaring it, contract -> ids it refers to
+        declarations: Dict[int, Contract] = {}
+        references: Dict[Contract, Set[int]] = {}
+        for contract_parser in parsers:
+            contract = contract_parser.underlying_contract
+            refs = references[contract] = set()
+            for node in _ast_nodes(contract_parser.data):
+                if "id" in node:
+                    declarations[node["id"]] = contract
+                if "referencedDeclaration" in node:
+                    refs.add(node["referencedDeclaration"])
+
+        to_visit = [p.underlying_contract for p in parsers if not _is_from_dependency(p.underlying_contract)]
+        for node in _ast_nodes(self._top_level_items_data):
+            if node.get("referencedDeclaration") in declarations:
+                to_visit.append(declarations[node["referencedDeclaration"]])
+
+        needed: Set[Contract] = set()
+        while to_visit:
+            contract = to_visit.pop()
+            if contract in needed:
+                continue
+            needed.add(contract)
+            to_visit += contract.inheritance
+            to_visit += [declarations[ref] for ref in references[contract] if ref in declarations]
+
+        return {p.underlying_contract for p in parsers} - needed
+
     def analyze_contracts(self) -> None:  # pylint: disable=too-many-statements,too-many-branches
         if not self._parsed:
             raise PreprocessException("Parse the contract before running analyses")
         self._convert_to_ir()
-        if not self._compilation_unit.core.skip_data_dependency:
+        # With analysis_level="calls", computed with the SSA, on first use
+        if not (self._compilation_unit.core.skip_data_dependency or self._compilation_unit.is_ssa_pending):
             compute_dependency(self._compilation_unit)
         self._compilation_unit.compute_storage_layout()
         self._analyzed = True
@@ -797,42 +868,54 @@ class SolcCompilationUnitParser(CallerContextExpression):
 
         contract.analyze_state_variables()
 
-        contract.analyze_content_modifiers()
-        contract.analyze_content_functions()
+        if contract.underlying_contract not in self._signature_only:
+            contract.analyze_content_modifiers()
+            contract.analyze_content_functions()
         self._analyze_content_top_level_function()
 
         contract.set_is_analyzed(True)
 
-    def _convert_to_ir(self) -> None:
+    @property
+    def _defer_ssa(self) -> bool:
+        # analysis_level="calls": the SSA is generated on first use (CompilationUnitWrapper.generate_ssa)
+        return self._compilation_unit.core.analysis_level == "calls"
 
-        for contract in self._compilation_unit.contracts:
-            contract.add_constructor_variables()
-
-            for func in contract.functions + contract.modifiers:
-                try:
-                    func.generate_ir_and_analyze()
-
-                except AttributeError as e:
-                    # This can happens for example if there is a call to an interface
-                    # And the interface is redefined due to contract's name reuse
-                    # But the available version misses some functions
-                    self._underlying_contract_to_parser[contract].log_incorrect_parsing(
-                        f"Impossible to generate IR for {contract.name}.{func.name} ({func.source_mapping}):\n {e}"
-                    )
-                except Exception as e:
-                    func_expressions = "\n".join([f"\t{ex}" for ex in func.expressions])
-                    logger.error(
-                        f"\nFailed to generate IR for {contract.name}.{func.name}. Please open an issue https://github.com/crytic/contract_preprocess/issues.\n{contract.name}.{func.name} ({func.source_mapping}):\n "
-                        f"{func_expressions}"
-                    )
-                    raise e
+    def _convert_contract_to_ir(self, contract: Contract) -> None:
+        contract.add_constructor_variables()
+
+        for func in contract.functions + contract.modifiers:
             try:
-                contract.convert_expression_to_ir_ssa()
+                func.generate_ir_and_analyze()
+
+            except AttributeError as e:
+                # This can happens for example if there is a call to an interface
+                # And the interface is redefined due to contract's name reuse
+                # But the available version misses some functions
+                self._underlying_contract_to_parser[contract].log_incorrect_parsing(
+                    f"Impossible to generate IR for {contract.name}.{func.name} ({func.source_mapping}):\n {e}"
+                )
             except Exception as e:
+                func_expressions = "\n".join([f"\t{ex}" for ex in func.expressions])
                 logger.error(
-                    f"\nFailed to convert IR to SSA for {contract.name} contract. Please open an issue https://github.com/crytic/contract_preprocess/issues.\n "
+                    f"\nFailed to generate IR for {contract.name}.{func.name}. Please open an issue https://github.com/crytic/contract_preprocess/issues.\n{contract.name}.{func.name} ({func.source_mapping}):\n "
+                    f"{func_expressions}"
                 )
                 raise e
+        if self._defer_ssa:
+            return
+        try:
+            contract.convert_expression_to_ir_ssa()
+        except Exception as e:
+            logger.error(
+                f"\nFailed to convert IR to SSA for {contract.name} contract. Please open an issue https://github.com/crytic/contract_preprocess/issues.\n "
+            )
+            raise e
+
+    def _convert_to_ir(self) -> None:
+
+        for contract in self._compilation_unit.contracts:
+            if contract not in self._signature_only:
+                self._convert_contract_to_ir(contract)
 
         for func in self._compilation_unit.functions_top_level:
             try:
@@ -849,6 +932,8 @@ class SolcCompilationUnitParser(CallerContextExpression):
                 )
                 raise e
 
+            if self._defer_ssa:
+                continue
             try:
                 func.generate_ir_ssa({})
             except Exception as e:
@@ -859,9 +944,13 @@ class SolcCompilationUnitParser(CallerContextExpression):
                 )
                 raise e
 
-        self._compilation_unit.propagate_function_calls()
-        for contract in self._compilation_unit.contracts:
-            contract.fix_phi()
-            contract.update_read_write_using_ssa()
+        if self._defer_ssa:
+            self._compilation_unit.defer_ssa()
+        else:
+            self._compilation_unit.propagate_function_calls()
+            for contract in self._compilation_unit.contracts:
+                contract.fix_phi()
+                contract.update_read_write_using_ssa()
+        self._compilation_unit.set_is_ir_generated(True)
 
     # endregion
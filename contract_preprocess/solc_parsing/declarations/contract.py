@@ -98,6 +98,13 @@ class ContractSolc(CallerContextExpression):
     def set_is_analyzed(self, is_analyzed: bool) -> None:
         self._is_analyzed = is_analyzed
 
+    @property
+    def data(self) -> Dict[str, Any]:
+        """
+        AST of the contract
+        """
+        return self._data
+
     @property
     def underlying_contract(self) -> Contract:
         return self._contract
@@ -197,7 +197,10 @@ def _find_in_contract(
             ).values()
         }
     else:
-        functions = {f.full_name: f for f in contract.functions if not f.is_shadowed}
+        functions = contract.symbol_index.get(
+            "functions_not_shadowed",
+            lambda: {f.full_name: f for f in contract.functions if not f.is_shadowed},
+        )
     if var_name in functions:
         return functions[var_name]
 
@@ -211,7 +214,9 @@ def _find_in_contract(
             ).values()
         }
     else:
-        modifiers = contract.available_modifiers_as_dict()
+        modifiers = contract.symbol_index.get(
+            "available_modifiers", contract.available_modifiers_as_dict
+        )
     if var_name in modifiers:
         return modifiers[var_name]
 
@@ -254,7 +259,7 @@ def _find_in_contract(
         pass
 
     # If the enum is refered as its name rather than its canonicalName
-    enums = {e.name: e for e in contract.enums}
+    enums = contract.symbol_index.get("enums_by_name", lambda: {e.name: e for e in contract.enums})
     if var_name in enums:
         return enums[var_name]
 
@@ -455,8 +460,13 @@ def find_variable(
         return ret, False
 
     # Could refer to any enum
-    all_enumss = [c.enums_as_dict for c in current_scope.contracts.values()]
-    all_enums = {k: v for d in all_enumss for k, v in d.items()}
+    all_enums = current_scope.symbol_index.get(
+        "contracts_enums",
+        lambda: {
+            k: v for c in current_scope.contracts.values() for k, v in c.enums_as_dict.items()
+        },
+        reads=lambda: [c.symbol_index for c in current_scope.contracts.values()],
+    )
     if var_name in all_enums:
         return all_enums[var_name], False
 
@@ -1,11 +1,12 @@
 import logging
 import re
-from typing import List, TYPE_CHECKING, Union, Dict, ValuesView
+from typing import Iterable, List, TYPE_CHECKING, Union, Dict
 
 from contract_preprocess.core.declarations.custom_error_contract import CustomErrorContract
 from contract_preprocess.core.declarations.custom_error_top_level import CustomErrorTopLevel
 from contract_preprocess.core.declarations.function_contract import FunctionContract
 from contract_preprocess.core.expressions.literal import Literal
+from contract_preprocess.core.scope.symbol_index import SymbolIndex, first_by
 from contract_preprocess.core.solidity_types import TypeAlias, TypeAliasTopLevel, TypeAliasContract
 from contract_preprocess.core.solidity_types.array_type import ArrayType
 from contract_preprocess.core.solidity_types.elementary_type import (
@@ -25,6 +26,7 @@ if TYPE_CHECKING:
     from contract_preprocess.core.declarations import Structure, Enum, Function
     from contract_preprocess.core.declarations.contract import Contract
     from contract_preprocess.core.compilation_unit import CompilationUnitWrapper
+    from contract_preprocess.core.scope.scope import FileScope
     from contract_preprocess.solc_parsing.compilation_unit_solc import SolcCompilationUnitParser
 
 logger = logging.getLogger("TypeParsing")
@@ -41,14 +43,118 @@ class UnknownType:  # pylint: disable=too-few-public-methods
         return self._name
 
 
-def _find_from_type_name(  # pylint: disable=too-many-locals,too-many-branches,too-many-statements,too-many-arguments
+class _TypeLookup:  # pylint: disable=too-few-public-methods
+    """
+    Name -> declaration maps used to resolve a type name.
+    Each map keeps the first declaration of a name, as the linear scans they replace did.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        functions_direct_access: Iterable["Function"],
+        contracts_direct_access: Iterable["Contract"],
+        structures_direct_access: Iterable["Structure"],
+        all_structures: Iterable["Structure"],
+        enums_direct_access: Iterable["Enum"],
+        all_enums: Iterable["Enum"],
+    ) -> None:
+        all_structures = list(all_structures)
+        all_enums = list(all_enums)
+        self.functions = first_by(functions_direct_access, lambda f: f.name)
+        self.contracts = first_by(contracts_direct_access, lambda c: c.name)
+        self.structures = first_by(structures_direct_access, lambda st: st.name)
+        self.enums = first_by(enums_direct_access, lambda e: e.name)
+        self.all_structures_by_canonical_name = first_by(all_structures, lambda st: st.canonical_name)
+        self.all_structures_by_name = first_by(all_structures, lambda st: st.name)
+        self.all_enums_by_canonical_name = first_by(all_enums, lambda e: e.canonical_name)
+        self.all_enums_by_name = first_by(all_enums, lambda e: e.name)
+
+
+def _contract_indexes(contracts: Iterable["Contract"]) -> List[SymbolIndex]:
+    # The lookups below read the structures and enums of these contracts
+    return [c.symbol_index for c in contracts]
+
+
+def _scope_type_lookup(scope: "FileScope") -> _TypeLookup:
+    """
+    Lookup for the top level declarations of a scope (structures, variables, events, errors, using for)
+    """
+
+    def build() -> _TypeLookup:
+        all_structures = [st for c in scope.contracts.values() for st in c.structures]
+        all_structures += scope.structures.values()
+        all_enums = [e for c in scope.contracts.values() for e in c.enums]
+        all_enums += scope.enums.values()
+        return _TypeLookup(
+            scope.functions,
+            scope.contracts.values(),
+            scope.structures.values(),
+            all_structures,
+            [],
+            all_enums,
+        )
+
+    # scope.functions is a set, not a SymbolTable
+    return scope.symbol_index.get(
+        "type_lookup", build, stamp=len(scope.functions), reads=lambda: _contract_indexes(scope.contracts.values())
+    )
+
+
+def _contract_type_lookup(contract: "Contract", scope: "FileScope") -> _TypeLookup:
+    """
+    Lookup for a contract and its functions: the contract's own declarations first, then the scope ones
+    """
+
+    def build() -> _TypeLookup:
+        scope_lookup = _scope_type_lookup(scope)
+        lookup = _TypeLookup(
+            contract.functions + contract.modifiers,
+            scope.contracts.values(),
+            contract.structures + list(scope.structures.values()),
+            [],
+            contract.enums + list(scope.enums.values()),
+            [],
+        )
+        lookup.all_structures_by_canonical_name = scope_lookup.all_structures_by_canonical_name
+        lookup.all_structures_by_name = scope_lookup.all_structures_by_name
+        lookup.all_enums_by_canonical_name = scope_lookup.all_enums_by_canonical_name
+        lookup.all_enums_by_name = scope_lookup.all_enums_by_name
+        return lookup
+
+    return contract.symbol_index.get(
+        ("type_lookup", scope),
+        build,
+        reads=lambda: [scope.symbol_index] + _contract_indexes(scope.contracts.values()),
+    )
+
+
+def _compilation_unit_type_lookup(sl: "CompilationUnitWrapper") -> _TypeLookup:
+    """
+    Lookup over all the contracts of the compilation unit, when we are lost in the scopes
+    """
+
+    def build() -> _TypeLookup:
+        all_structures = [st for c in sl.contracts for st in c.structures]
+        all_structures += sl.structures_top_level
+        all_enums = [e for c in sl.contracts for e in c.enums]
+        all_enums += sl.enums_top_level
+        return _TypeLookup(
+            [],
+            sl.contracts,
+            sl.structures_top_level,
+            all_structures,
+            sl.enums_top_level,
+            all_enums,
+        )
+
+    # The compilation unit keeps lists, not SymbolTables
+    stamp = (len(sl.contracts), len(sl.structures_top_level), len(sl.enums_top_level))
+    return sl.symbol_index.get("type_lookup", build, stamp=stamp, reads=lambda: _contract_indexes(sl.contracts))
+
+
+def _find_from_type_name(  # pylint: disable=too-many-branches,too-many-statements
     name: str,
-    functions_direct_access: List["Function"],
-    contracts_direct_access: List["Contract"],
-    structures_direct_access: List["Structure"],
-    all_structures: ValuesView["Structure"],
-    enums_direct_access: List["Enum"],
-    all_enums: ValuesView["Enum"],
+    lookup: _TypeLookup,
 ) -> Type:
     name_elementary = name.split(" ")[0]
     if "[" in name_elementary:
@@ -66,12 +172,12 @@ def _find_from_type_name(  # pylint: disable=too-many-locals,too-many-branches,t
         name_contract = name_contract[len("contract ") :]
     if name_contract.startswith("library "):
         name_contract = name_contract[len("library ") :]
-    var_type = next((c for c in contracts_direct_access if c.name == name_contract), None)
+    var_type = lookup.contracts.get(name_contract)
 
     if not var_type:
-        var_type = next((st for st in structures_direct_access if st.name == name), None)
+        var_type = lookup.structures.get(name)
     if not var_type:
-        var_type = next((e for e in enums_direct_access if e.name == name), None)
+        var_type = lookup.enums.get(name)
     if not var_type:
         # any contract can refer to another contract's enum
         enum_name = name
@@ -79,36 +185,30 @@ def _find_from_type_name(  # pylint: disable=too-many-locals,too-many-branches,t
             enum_name = enum_name[len("enum ") :]
         elif enum_name.startswith("type(enum"):
             enum_name = enum_name[len("type(enum ") : -1]
-        # all_enums = [c.enums for c in contracts]
-        # all_enums = [item for sublist in all_enums for item in sublist]
-        # all_enums += contract.contract_preprocess.enums_top_level
-        var_type = next((e for e in all_enums if e.canonical_name == enum_name), None)
+        var_type = lookup.all_enums_by_canonical_name.get(enum_name)
         if not var_type:
-            var_type = next((e for e in all_enums if e.name == enum_name), None)
+            var_type = lookup.all_enums_by_name.get(enum_name)
     if not var_type:
         # any contract can refer to another contract's structure
         name_struct = name
         if name_struct.startswith("struct "):
             name_struct = name_struct[len("struct ") :]
             name_struct = name_struct.split(" ")[0]  # remove stuff like storage pointer at the end
-        # all_structures = [c.structures for c in contracts]
-        # all_structures = [item for sublist in all_structures for item in sublist]
-        # all_structures += contract.contract_preprocess.structures_top_level
-        var_type = next((st for st in all_structures if st.canonical_name == name_struct), None)
+        var_type = lookup.all_structures_by_canonical_name.get(name_struct)
         if not var_type:
-            var_type = next((st for st in all_structures if st.name == name_struct), None)
+            var_type = lookup.all_structures_by_name.get(name_struct)
         # case where struct xxx.xx[] where not well formed in the AST
         if not var_type:
             depth = 0
             while name_struct.endswith("[]"):
                 name_struct = name_struct[0:-2]
                 depth += 1
-            var_type = next((st for st in all_structures if st.canonical_name == name_struct), None)
+            var_type = lookup.all_structures_by_canonical_name.get(name_struct)
             if var_type:
                 return ArrayType(UserDefinedType(var_type), Literal(depth, "uint256"))
 
     if not var_type:
-        var_type = next((f for f in functions_direct_access if f.name == name), None)
+        var_type = lookup.functions.get(name)
     if not var_type:
         if name.startswith("function "):
             found = re.findall(
@@ -123,24 +223,14 @@ def _find_from_type_name(  # pylint: disable=too-many-locals,too-many-branches,t
             params = [
                 _find_from_type_name(
                     p,
-                    functions_direct_access,
-                    contracts_direct_access,
-                    structures_direct_access,
-                    all_structures,
-                    enums_direct_access,
-                    all_enums,
+                    lookup,
                 )
                 for p in params
             ]
             return_values = [
                 _find_from_type_name(
                     r,
-                    functions_direct_access,
-                    contracts_direct_access,
-                    structures_direct_access,
-                    all_structures,
-                    enums_direct_access,
-                    all_enums,
+                    lookup,
                 )
                 for r in return_values
             ]
@@ -171,21 +261,11 @@ def _find_from_type_name(  # pylint: disable=too-many-locals,too-many-branches,t
 
             from_type = _find_from_type_name(
                 from_,
-                functions_direct_access,
-                contracts_direct_access,
-                structures_direct_access,
-                all_structures,
-                enums_direct_access,
-                all_enums,
+                lookup,
             )
             to_type = _find_from_type_name(
                 to_,
-                functions_direct_access,
-                contracts_direct_access,
-                structures_direct_access,
-                all_structures,
-                enums_direct_access,
-                all_enums,
+                lookup,
             )
 
             return MappingType(from_type, to_type)
@@ -237,13 +317,12 @@ def parse_type(
     sl: "CompilationUnitWrapper"
     renaming: Dict[str, str]
     type_aliases: Dict[str, TypeAlias]
-    enums_direct_access: List["Enum"] = []
+    lookup: _TypeLookup
     # Note: for convenience top level functions use the same parser as function in contract
     # but contract_parser is set to None
     if isinstance(caller_context, SolcCompilationUnitParser) or (
         isinstance(caller_context, FunctionSolc) and caller_context.contract_parser is None
     ):
-        structures_direct_access: List["Structure"]
         if isinstance(caller_context, SolcCompilationUnitParser):
             sl = caller_context.compilation_unit
             next_context = caller_context
@@ -255,16 +334,7 @@ def parse_type(
             next_context = caller_context.parser
             renaming = caller_context.underlying_function.file_scope.renaming
             type_aliases = caller_context.underlying_function.file_scope.type_aliases
-        structures_direct_access = sl.structures_top_level
-        all_structuress = [c.structures for c in sl.contracts]
-        all_structures = [item for sublist in all_structuress for item in sublist]
-        all_structures += structures_direct_access
-        enums_direct_access += sl.enums_top_level
-        all_enumss = [c.enums for c in sl.contracts]
-        all_enums = [item for sublist in all_enumss for item in sublist]
-        all_enums += enums_direct_access
-        contracts = sl.contracts
-        functions = []
+        lookup = _compilation_unit_type_lookup(sl)
     elif isinstance(
         caller_context,
         (
@@ -294,18 +364,7 @@ def parse_type(
 
         sl = caller_context.compilation_unit
         next_context = caller_context
-        structures_direct_access = list(scope.structures.values())
-        all_structuress = [c.structures for c in scope.contracts.values()]
-        all_structures = [item for sublist in all_structuress for item in sublist]
-        all_structures += structures_direct_access
-
-        enums_direct_access = []
-        all_enumss = [c.enums for c in scope.contracts.values()]
-        all_enums = [item for sublist in all_enumss for item in sublist]
-        all_enums += scope.enums.values()
-
-        contracts = scope.contracts.values()
-        functions = list(scope.functions)
+        lookup = _scope_type_lookup(scope)
 
         renaming = scope.renaming
         type_aliases = scope.type_aliases
@@ -324,18 +383,7 @@ def parse_type(
             next_context = caller_context
             scope = contract.file_scope
 
-        structures_direct_access = contract.structures
-        structures_direct_access += scope.structures.values()
-        all_structuress = [c.structures for c in scope.contracts.values()]
-        all_structures = [item for sublist in all_structuress for item in sublist]
-        all_structures += scope.structures.values()
-        enums_direct_access += contract.enums
-        enums_direct_access += scope.enums.values()
-        all_enumss = [c.enums for c in scope.contracts.values()]
-        all_enums = [item for sublist in all_enumss for item in sublist]
-        all_enums += scope.enums.values()
-        contracts = scope.contracts.values()
-        functions = contract.functions + contract.modifiers
+        lookup = _contract_type_lookup(contract, scope)
 
         renaming = scope.renaming
         type_aliases = scope.type_aliases
@@ -356,12 +404,7 @@ def parse_type(
             return type_aliases[name]
         return _find_from_type_name(
             name,
-            functions,
-            contracts,
-            structures_direct_access,
-            all_structures,
-            enums_direct_access,
-            all_enums,
+            lookup,
         )
 
     if t[key] == "ElementaryTypeName":
@@ -379,12 +422,7 @@ def parse_type(
                 return type_aliases[name]
             type_found = _find_from_type_name(
                 name,
-                functions,
-                contracts,
-                structures_direct_access,
-                all_structures,
-                enums_direct_access,
-                all_enums,
+                lookup,
             )
             _add_type_references(type_found, t["src"], sl)
             return type_found
@@ -400,12 +438,7 @@ def parse_type(
             return type_aliases[name]
         type_found = _find_from_type_name(
             name,
-            functions,
-            contracts,
-            structures_direct_access,
-            all_structures,
-            enums_direct_access,
-            all_enums,
+            lookup,
         )
         _add_type_references(type_found, t["src"], sl)
         return type_found
@@ -420,12 +453,7 @@ def parse_type(
                 return type_aliases[name]
             type_found = _find_from_type_name(
                 name,
-                functions,
-                contracts,
-                structures_direct_access,
-                all_structures,
-                enums_direct_access,
-                all_enums,
+                lookup,
             )
             _add_type_references(type_found, t["src"], sl)
             return type_found
@@ -124,6 +124,7 @@ class YulScope(metaclass=abc.ABCMeta):
         "_id",
         "_yul_local_variables",
         "_yul_local_functions",
+        "_yul_local_functions_by_name",
         "_parent_func",
     ]
 
@@ -132,8 +133,10 @@ class YulScope(metaclass=abc.ABCMeta):
     ) -> None:
         self._contract = contract
         self._id: List[str] = yul_id
-        self._yul_local_variables: List[YulLocalVariable] = []
+        # Identifiers are resolved once per occurrence: index the scope by (yul) name
+        self._yul_local_variables: Dict[str, YulLocalVariable] = {}
         self._yul_local_functions: List[YulFunction] = []
+        self._yul_local_functions_by_name: Dict[str, YulFunction] = {}
         self._parent_func: Function = parent_func
 
     @property
@@ -166,26 +169,30 @@ class YulScope(metaclass=abc.ABCMeta):
         return self._parent_func.file_scope
 
     def add_yul_local_variable(self, var: "YulLocalVariable") -> None:
-        self._yul_local_variables.append(var)
+        # The first declaration wins, as with a lookup in declaration order
+        self._yul_local_variables.setdefault(var.underlying.name, var)
 
     def get_yul_local_variable_from_name(self, variable_name: str) -> Optional["YulLocalVariable"]:
-        return next(
-            (
-                v
-                for v in self._yul_local_variables
-                if v.underlying.name == _name_to_yul_name(variable_name, self.id)
-            ),
-            None,
-        )
+        return self._yul_local_variables.get(_name_to_yul_name(variable_name, self.id))
 
     def add_yul_local_function(self, func: "YulFunction") -> None:
         self._yul_local_functions.append(func)
+        self._yul_local_functions_by_name.setdefault(func.underlying.name, func)
 
     def get_yul_local_function_from_name(self, func_name: str) -> Optional["YulFunction"]:
-        return next(
-            (v for v in self._yul_local_functions if v.underlying.name == func_name),
-            None,
-        )
+        return self._yul_local_functions_by_name.get(func_name)
+
+    def get_yul_function_in_scope(self, func_name: str) -> Optional["YulFunction"]:
+        """
+        Yul function visible from this scope: the local ones, then the ones of the enclosing scopes
+        up to the YulBlock
+        """
+        scope: YulScope = self
+        while True:
+            func = scope.get_yul_local_function_from_name(func_name)
+            if func is not None or not isinstance(scope, YulFunction):
+                return func
+            scope = scope.root
 
 
 class YulLocalVariable:  # pylint: disable=too-few-public-methods
@@ -803,28 +810,11 @@ def parse_yul_identifier(root: YulScope, _node: YulNode, ast: Dict) -> Optional[
     if variable:
         return Identifier(variable.underlying)
 
-    # check yul-scoped function
-    func = root.get_yul_local_function_from_name(name)
+    # check yul-scoped function, then the yul-block scoped ones
+    func = root.get_yul_function_in_scope(name)
     if func:
         return Identifier(func.underlying)
 
-    # check yul-block scoped function
-    if isinstance(root, YulFunction):
-        yul_block = root.root
-
-        # Iterate until we searched in all the scopes until the YulBlock scope
-        while not isinstance(yul_block, YulBlock):
-            func = yul_block.get_yul_local_function_from_name(name)
-            if func:
-                return Identifier(func.underlying)
-
-            if isinstance(yul_block, YulFunction):
-                yul_block = yul_block.root
-
-        func = yul_block.get_yul_local_function_from_name(name)
-        if func:
-            return Identifier(func.underlying)
-
     # check function-scoped variables
     parent_func = root.parent_func
     if parent_func:
@@ -1,24 +1,45 @@
 import argparse
 import glob
+import hashlib
 import json
 import logging
+import multiprocessing
 import os
 import re
 import sys
+import time
+from collections import Counter
+from multiprocessing.connection import Connection, wait
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Set, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple
 
 from crytic_compile import CryticCompile, compile_all, cryticparser, is_supported
-from packaging.specifiers import SpecifierSet
-from packaging.version import InvalidVersion, Version
-from solc_select.solc_select import artifact_path, get_available_versions, install_artifacts, installed_versions
+from solc_select.solc_select import artifact_path, install_artifacts
 
 from contract_preprocess import ContractPreprocess
+from contract_preprocess.core.call_graph.call_graph import CallGraph
+from contract_preprocess.core.core import ANALYSIS_LEVELS
+from contract_preprocess.tools.preprocess.compile_cache import (
+    CompileCache,
+    compiler_identity,
+    default_compile_cache_dir,
+)
+from contract_preprocess.tools.preprocess.compiler_versions import compiler_versions
+from contract_preprocess.tools.preprocess.compilers import main as compilers_main
 from contract_preprocess.tools.preprocess.function_call_tree import (
     build_function_call_edges,
     contract_functions_by_visibility,
 )
-from contract_preprocess.tools.preprocess.vyper_support import preprocess_vyper_file
+from contract_preprocess.tools.preprocess.output_writer import (
+    OUTPUT_FORMATS,
+    OutputRecorder,
+    OutputWriter,
+    output_writer,
+    replay,
+)
+from contract_preprocess.tools.preprocess.solidity_scan import scan_solidity_file
+from contract_preprocess.tools.preprocess.vyper_support import preprocess_vyper_file, preprocess_vyper_files
+from contract_preprocess.utils.snapshot import SnapshotError, load_snapshot, save_snapshot
 
 logging.basicConfig()
 logger = logging.getLogger("contract-preprocess")
@@ -149,6 +170,82 @@ def _source_content(obj: Any) -> Optional[str]:
         return None
 
 
+_BundleTarget = Tuple[str, str, Any]
+_BundleLeaf = Tuple[str, str, str]
+
+
+class _BundleCallEdges:
+    """
+    Call edges followed by the external function bundles, computed once per function and shared
+    by all the bundles of a compilation unit.
+    """
+
+    def __init__(
+        self,
+        *,
+        include_external_calls: bool,
+        include_library_calls: bool,
+        include_solidity_calls: bool,
+        include_modifiers: bool,
+        include_base_constructors: bool,
+    ) -> None:
+        self._kept_edges = {
+            "external": include_external_calls,
+            "library": include_library_calls,
+            "solidity": include_solidity_calls,
+            "modifier": include_modifiers,
+            "base-constructor": include_base_constructors,
+        }
+        self._edges: Dict[Any, Tuple[List[_BundleTarget], List[_BundleLeaf]]] = {}
+
+    def edges(self, fn: Any) -> Tuple[List[_BundleTarget], List[_BundleLeaf]]:
+        """
+        Sorted (edge, callee uid, callee) of the callees to dump and (edge, kind, label) of the leafs
+        """
+        from contract_preprocess.tools.preprocess.function_call_tree import (
+            function_display_name,
+            function_uid,
+            iter_call_targets,
+        )
+
+        if fn in self._edges:
+            return self._edges[fn]
+
+        fn_targets: List[_BundleTarget] = []
+        leafs: List[_BundleLeaf] = []
+        for call in iter_call_targets(fn):
+            if not self._kept_edges.get(call.edge, True):
+                continue
+            if call.kind == "function":
+                callee = getattr(call, "target", None)
+                if callee is None:
+                    leafs.append((call.edge, "unknown", str(call.label)))
+                    continue
+                if not getattr(callee, "is_implemented", True):
+                    # Interface/abstract: keep as a leaf label but don't dump code.
+                    leafs.append((call.edge, "abstract", function_display_name(callee)))
+                    continue
+                try:
+                    callee_id = function_uid(callee)
+                except Exception:  # pylint: disable=broad-except
+                    leafs.append((call.edge, "unknown", str(call.label)))
+                    continue
+                fn_targets.append((call.edge, callee_id, callee))
+            elif call.kind in ("variable", "solidity", "unknown"):
+                leafs.append((call.edge, call.kind, str(call.label)))
+            else:
+                leafs.append((call.edge, "unknown", str(call.label)))
+
+        # Deterministic traversal for stable output.
+        leafs.sort(key=lambda t: (t[0], t[1], t[2]))
+        fn_targets.sort(key=lambda t: (t[0], t[1]))
+        self._edges[fn] = (fn_targets, leafs)
+        return self._edges[fn]
+
+    def call_graph(self, roots: Sequence[Any]) -> CallGraph:
+        return CallGraph(roots, lambda fn: [callee for _, _, callee in self.edges(fn)[0]])
+
+
 def _dump_external_function_bundle(
     fn: Any,
     out_dir: Path,
@@ -158,30 +255,32 @@ def _dump_external_function_bundle(
     include_solidity_calls: bool,
     include_modifiers: bool,
     include_base_constructors: bool,
+    call_edges: Optional[_BundleCallEdges] = None,
+    call_graph: Optional[CallGraph] = None,
 ) -> Optional[Path]:
     """
     Write a single file for an external function containing:
       - the external function source snippet
       - source snippets for its *direct* callee functions (no recursion)
+
+    call_edges/call_graph can be shared between the bundles of a compilation unit; call_graph
+    must be built from call_edges with fn among its roots.
     """
     from contract_preprocess.tools.preprocess.function_call_tree import (
         function_display_name,
         function_uid,
-        iter_call_targets,
     )
 
-    def should_keep_edge(edge: str) -> bool:
-        if edge == "external":
-            return include_external_calls
-        if edge == "library":
-            return include_library_calls
-        if edge == "solidity":
-            return include_solidity_calls
-        if edge == "modifier":
-            return include_modifiers
-        if edge == "base-constructor":
-            return include_base_constructors
-        return True
+    if call_edges is None:
+        call_edges = _BundleCallEdges(
+            include_external_calls=include_external_calls,
+            include_library_calls=include_library_calls,
+            include_solidity_calls=include_solidity_calls,
+            include_modifiers=include_modifiers,
+            include_base_constructors=include_base_constructors,
+        )
+    if call_graph is None or fn not in call_graph:
+        call_graph = call_edges.call_graph([fn])
 
     contract_ctx = getattr(fn, "contract", None)
     contract_name = getattr(contract_ctx, "name", None) or getattr(
@@ -206,46 +305,18 @@ def _dump_external_function_bundle(
     else:
         sections.append("// <no source mapping available>")
 
-    # Collect all *reachable* functions (transitive, no recursion output), plus leaf call targets.
+    # Leaf call targets of everything reachable, computed bottom-up on the call graph
+    # (shared with the other entry points reaching the same functions).
+    leaf_targets = call_graph.transitive_values(fn, "leafs", lambda f: call_edges.edges(f)[1])
+
+    # All *reachable* functions (transitive, no recursion output), in traversal order.
     seen: Set[str] = {fn_id}
     reachable: List[Tuple[str, Any]] = []
-    leaf_targets: Set[Tuple[str, str, str]] = set()
 
     pending: List[Any] = [fn]
     while pending:
         cur = pending.pop()
-        fn_targets: List[Tuple[str, str, Any]] = []
-        leafs: List[Tuple[str, str, str]] = []
-        for call in iter_call_targets(cur):
-            if not should_keep_edge(call.edge):
-                continue
-            if call.kind == "function":
-                callee = getattr(call, "target", None)
-                if callee is None:
-                    leafs.append((call.edge, "unknown", str(call.label)))
-                    continue
-                if not getattr(callee, "is_implemented", True):
-                    # Interface/abstract: keep as a leaf label but don't dump code.
-                    leafs.append((call.edge, "abstract", function_display_name(callee)))
-                    continue
-                try:
-                    callee_id = function_uid(callee)
-                except Exception:  # pylint: disable=broad-except
-                    leafs.append((call.edge, "unknown", str(call.label)))
-                    continue
-                fn_targets.append((call.edge, callee_id, callee))
-            elif call.kind in ("variable", "solidity", "unknown"):
-                leafs.append((call.edge, call.kind, str(call.label)))
-            else:
-                leafs.append((call.edge, "unknown", str(call.label)))
-
-        # Deterministic traversal for stable output.
-        leafs.sort(key=lambda t: (t[0], t[1], t[2]))
-        for edge, kind, label in leafs:
-            leaf_targets.add((edge, kind, label))
-
-        fn_targets.sort(key=lambda t: (t[0], t[1]))
-        for edge, callee_id, callee in fn_targets:
+        for edge, callee_id, callee in call_edges.edges(cur)[0]:
             if callee_id in seen:
                 continue
             seen.add(callee_id)
@@ -276,17 +347,6 @@ def _dump_external_function_bundle(
     return out_path
 
 
-def _strip_solidity_comments(text: str) -> str:
-    text = re.sub(r"/\*.*?\*/", "", text, flags=re.DOTALL)
-    text = re.sub(r"//.*?$", "", text, flags=re.MULTILINE)
-    return text
-
-
-def _solidity_imports(text: str) -> List[str]:
-    no_comments = _strip_solidity_comments(text)
-    return re.findall(r"\bimport\b[^;]*?[\"']([^\"']+)[\"']\s*;", no_comments)
-
-
 def _collect_solidity_closure(root: Path) -> List[Path]:
     visited: Set[Path] = set()
     stack: List[Path] = [root.resolve()]
@@ -295,11 +355,10 @@ def _collect_solidity_closure(root: Path) -> List[Path]:
         if p in visited or not p.exists() or p.suffix != ".sol":
             continue
         visited.add(p)
-        try:
-            txt = p.read_text(encoding="utf8", errors="ignore")
-        except Exception:  # pylint: disable=broad-except
+        scan = scan_solidity_file(p)
+        if scan is None:
             continue
-        for imp in _solidity_imports(txt):
+        for imp in scan.imports:
             if imp.startswith("@") or imp.startswith("http://") or imp.startswith("https://"):
                 continue
             candidate = (p.parent / imp).resolve()
@@ -308,95 +367,17 @@ def _collect_solidity_closure(root: Path) -> List[Path]:
     return sorted(visited)
 
 
-def _solidity_pragma_spec(text: str) -> Optional[str]:
-    no_comments = _strip_solidity_comments(text)
-    m = re.search(r"\bpragma\s+solidity\s+([^;]+);", no_comments)
-    return m.group(1).strip() if m else None
-
-
-def _caret_to_specifier(v: Version) -> SpecifierSet:
-    lower = f">={v.public}"
-    if v.major == 0:
-        upper = f"<0.{v.minor + 1}.0"
-    else:
-        upper = f"<{v.major + 1}.0.0"
-    return SpecifierSet(",".join([lower, upper]))
-
-
-def _specifier_from_solidity_pragma(spec: str) -> SpecifierSet:
-    raw = spec.strip()
-    if not raw:
-        return SpecifierSet()
-    parts = [p for p in re.split(r"\s+", raw) if p]
-    converted: List[str] = []
-    for p in parts:
-        if p.startswith("^"):
-            converted.append(str(_caret_to_specifier(Version(p[1:]))))
-        elif re.match(r"^\d+\.\d+\.\d+$", p):
-            converted.append(f"=={p}")
-        else:
-            converted.append(p)
-    return SpecifierSet(",".join(converted))
-
-
 def _pick_solc_version_for_files(files: List[Path]) -> Optional[str]:
-    wanted_sets: List[SpecifierSet] = []
-    exact_versions: Set[str] = set()
-
-    for f in files:
-        try:
-            txt = f.read_text(encoding="utf8", errors="ignore")
-        except Exception:  # pylint: disable=broad-except
-            continue
-        pragma = _solidity_pragma_spec(txt)
-        if not pragma:
-            continue
-        if re.fullmatch(r"\d+\.\d+\.\d+", pragma):
-            exact_versions.add(pragma)
-        try:
-            wanted_sets.append(_specifier_from_solidity_pragma(pragma))
-        except Exception:  # pylint: disable=broad-except
-            continue
-
-    if len(exact_versions) == 1:
-        return next(iter(exact_versions))
-
-    installed: List[Version] = []
-    for v in installed_versions():
-        try:
-            installed.append(Version(v))
-        except InvalidVersion:
-            continue
-    installed = sorted(set(installed))
-
-    best: Optional[Version] = None
-    for v in installed:
-        if all(v in s for s in wanted_sets):
-            best = v
-    if best is not None:
-        return best.public
-
-    try:
-        available = []
-        for v in get_available_versions().keys():
-            try:
-                available.append(Version(v))
-            except InvalidVersion:
-                continue
-        available = sorted(set(available))
-        for v in available:
-            if all(v in s for s in wanted_sets):
-                best = v
-        return best.public if best is not None else None
-    except Exception:  # pylint: disable=broad-except
-        return None
+    return compiler_versions().pick_solc_version(files)
 
 
 def _ensure_solc(version: str) -> str:
-    if version not in installed_versions():
+    versions = compiler_versions()
+    if not versions.is_solc_installed(version):
         ok = install_artifacts([version])
         if not ok:
             raise RuntimeError(f"solc-select could not install {version}")
+        versions.solc_installed(version)
     return artifact_path(version).absolute().as_posix()
 
 
@@ -409,10 +390,10 @@ def _pretty_target(value: str) -> str:
     return value
 
 
-def _parse_args() -> argparse.Namespace:
+def _parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Preprocess Solidity/Vyper targets and output per-function direct call edges (A -> B).",
-        usage="contract-preprocess <target> [flag]",
+        usage="contract-preprocess <target> [flag]\n       contract-preprocess compilers sync <corpus> [flag]",
     )
     parser.add_argument(
         "targets",
@@ -431,6 +412,33 @@ def _parse_args() -> argparse.Namespace:
         default=None,
         help="Write output to file (default: stdout).",
     )
+    parser.add_argument(
+        "--output-format",
+        choices=OUTPUT_FORMATS,
+        default="json",
+        help="json: a single document (default). jsonl: one record per contract, compilation and error, "
+        "written as soon as it is produced.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Process the targets on N worker processes (default: 1, in process). "
+        "The output keeps the target order.",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=None,
+        help="Per-target timeout in seconds (runs the targets in worker processes); "
+        'a target that exceeds it gets an error with stage "timeout".',
+    )
+    parser.add_argument(
+        "--analysis-level",
+        choices=ANALYSIS_LEVELS,
+        default="calls",
+        help='"calls" (default): IR only, enough for the call edges; "full": also the SSA and data dependency.',
+    )
     parser.add_argument(
         "--dump-external-dir",
         default=None,
@@ -453,7 +461,7 @@ def _parse_args() -> argparse.Namespace:
         "--exclude-dependencies",
         action="store_true",
         default=False,
-        help="Exclude contracts coming from dependencies.",
+        help="Exclude contracts coming from dependencies (the ones no other contract uses are not analyzed).",
     )
     parser.add_argument(
         "--declared-only",
@@ -506,6 +514,26 @@ def _parse_args() -> argparse.Namespace:
         help="Best-effort: skip compilation/parsing failures where possible.",
     )
 
+    parser.add_argument(
+        "--compile-cache-dir",
+        default=None,
+        help="Solc compilation cache directory (default: $CONTRACT_PREPROCESS_CACHE or ~/.cache, "
+        "under contract-preprocess/compile).",
+    )
+    parser.add_argument(
+        "--no-compile-cache",
+        action="store_true",
+        default=False,
+        help="Always recompile (do not read or write the solc compilation cache).",
+    )
+
+    parser.add_argument(
+        "--snapshot-dir",
+        default=None,
+        help="Save the analyzed model of each target in this directory, and reload it on the next runs "
+        "instead of parsing and analyzing again (rejected once a source or the tool version changes).",
+    )
+
     parser.add_argument(
         "--vyper-version",
         default=None,
@@ -519,7 +547,7 @@ def _parse_args() -> argparse.Namespace:
     )
 
     cryticparser.init(parser)
-    return parser.parse_args()
+    return parser.parse_args(argv)
 
 
 def _crytic_kwargs(args: argparse.Namespace) -> Dict[str, Any]:
@@ -531,6 +559,10 @@ def _crytic_kwargs(args: argparse.Namespace) -> Dict[str, Any]:
         "targets",
         "targets_file",
         "output",
+        "output_format",
+        "jobs",
+        "timeout",
+        "analysis_level",
         "dump_external_dir",
         "emit_callgraph",
         "only_visibility",
@@ -541,6 +573,9 @@ def _crytic_kwargs(args: argparse.Namespace) -> Dict[str, Any]:
         "no_modifiers",
         "no_base_constructors",
         "include_solidity_calls",
+        "compile_cache_dir",
+        "no_compile_cache",
+        "snapshot_dir",
         "vyper_version",
         "no_auto_install",
     ):
@@ -548,9 +583,94 @@ def _crytic_kwargs(args: argparse.Namespace) -> Dict[str, Any]:
     return kwargs
 
 
+def _analysis_kwargs(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    ContractPreprocess kwargs that do not change the output (kept out of the snapshot key;
+    analyze_dependencies follows exclude_dependencies, which is part of it)
+    """
+    return {
+        "analysis_level": args.analysis_level,
+        # The dependency contracts are not written: only the ones the others need are analyzed
+        "analyze_dependencies": not args.exclude_dependencies,
+    }
+
+
+def _snapshot_path(target: str, args: argparse.Namespace, compile_kwargs: Dict[str, Any]) -> Path:
+    """
+    compile_kwargs: with the solc picked for the target (_resolve_solc), whose `solc --version` is part of the key
+    """
+    key = json.dumps(
+        {
+            "target": os.path.abspath(target),
+            "kwargs": compile_kwargs,
+            "compiler": compiler_identity(str(compile_kwargs.get("solc") or "solc")),
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return Path(args.snapshot_dir) / f"{hashlib.sha256(key.encode('utf8')).hexdigest()}.snapshot"
+
+
 def _iter_instances_for_target(
     target: str, args: argparse.Namespace, kwargs: Dict[str, Any]
 ) -> Tuple[List[ContractPreprocess], List[Dict[str, Any]]]:
+    if not args.snapshot_dir:
+        return _build_instances_for_target(target, args, kwargs)
+
+    try:
+        resolved = _resolve_solc(target, kwargs)
+    except Exception:  # pylint: disable=broad-except
+        # Reported by the build
+        return _build_instances_for_target(target, args, kwargs)
+    snapshot_path = _snapshot_path(target, args, resolved[0])
+    if snapshot_path.exists():
+        try:
+            return load_snapshot(snapshot_path), []
+        except SnapshotError as e:
+            logger.info(str(e))
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning(f"Ignoring the snapshot {snapshot_path}: {e}")
+
+    instances, errors = _build_instances_for_target(target, args, kwargs, resolved)
+    # A partial result is not worth reusing
+    if instances and not errors:
+        try:
+            save_snapshot(instances, snapshot_path)
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning(f"Could not write the snapshot of {target}: {e}")
+    return instances, errors
+
+
+def _resolve_solc(target: str, kwargs: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[List[Path]]]:
+    """
+    Compile kwargs with the solc picked from the pragmas of a single .sol target, and its import closure.
+    Other targets, or a solc given by the user, keep the kwargs as is (and no closure).
+    """
+    compile_kwargs = dict(kwargs)
+    closure: Optional[List[Path]] = None
+    if (
+        os.path.isfile(target)
+        and target.endswith(".sol")
+        and compile_kwargs.get("solc", "solc") == "solc"
+        and not compile_kwargs.get("solc_solcs_bin")
+        and not compile_kwargs.get("solc_solcs_select")
+    ):
+        closure = _collect_solidity_closure(Path(target))
+        solc_version = _pick_solc_version_for_files(closure) or _pick_solc_version_for_files([Path(target)])
+        if solc_version:
+            compile_kwargs["solc"] = _ensure_solc(solc_version)
+    return compile_kwargs, closure
+
+
+def _build_instances_for_target(
+    target: str,
+    args: argparse.Namespace,
+    kwargs: Dict[str, Any],
+    resolved: Optional[Tuple[Dict[str, Any], Optional[List[Path]]]] = None,
+) -> Tuple[List[ContractPreprocess], List[Dict[str, Any]]]:
+    """
+    resolved: _resolve_solc(target, kwargs), when already known
+    """
     errors: List[Dict[str, Any]] = []
 
     # AST json inputs (solc --ast-compact-json or legacy ast json)
@@ -562,43 +682,54 @@ def _iter_instances_for_target(
         instances: List[ContractPreprocess] = []
         for filename in filenames:
             try:
-                instances.append(ContractPreprocess(filename, **kwargs))
+                instances.append(ContractPreprocess(filename, **_analysis_kwargs(args), **kwargs))
             except Exception as e:  # pylint: disable=broad-except
                 errors.append({"target": filename, "stage": "contract_preprocess", "error": str(e)})
                 if not args.no_fail:
                     raise
         return instances, errors
 
-    compile_kwargs = dict(kwargs)
-    if (
-        os.path.isfile(target)
-        and target.endswith(".sol")
-        and compile_kwargs.get("solc", "solc") == "solc"
-        and not compile_kwargs.get("solc_solcs_bin")
-        and not compile_kwargs.get("solc_solcs_select")
-    ):
-        try:
-            closure = _collect_solidity_closure(Path(target))
-            solc_version = _pick_solc_version_for_files(closure) or _pick_solc_version_for_files([Path(target)])
-            if solc_version:
-                compile_kwargs["solc"] = _ensure_solc(solc_version)
-        except Exception as e:  # pylint: disable=broad-except
-            errors.append({"target": target, "stage": "solc-select", "error": str(e)})
-            if not args.no_fail:
-                raise
-
+    compile_kwargs: Dict[str, Any] = dict(kwargs)
+    closure: Optional[List[Path]] = None
     try:
-        compilations: List[CryticCompile] = compile_all(target, **compile_kwargs)
+        compile_kwargs, closure = resolved or _resolve_solc(target, kwargs)
     except Exception as e:  # pylint: disable=broad-except
-        errors.append({"target": target, "stage": "compile_all", "error": str(e)})
+        errors.append({"target": target, "stage": "solc-select", "error": str(e)})
         if not args.no_fail:
             raise
-        return [], errors
+
+    cache: Optional[CompileCache] = None
+    if not args.no_compile_cache and CompileCache.supports(target, compile_kwargs):
+        cache_dir = Path(args.compile_cache_dir) if args.compile_cache_dir else default_compile_cache_dir()
+        cache = CompileCache(cache_dir)
+        if closure is None:
+            closure = _collect_solidity_closure(Path(target))
+
+    compilations: Optional[List[CryticCompile]] = None
+    if cache is not None:
+        try:
+            compilations = cache.load(target, compile_kwargs, closure)
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning(f"Ignoring the compilation cache for {target}: {e}")
+
+    if compilations is None:
+        try:
+            compilations = compile_all(target, **compile_kwargs)
+        except Exception as e:  # pylint: disable=broad-except
+            errors.append({"target": target, "stage": "compile_all", "error": str(e)})
+            if not args.no_fail:
+                raise
+            return [], errors
+        if cache is not None:
+            try:
+                cache.store(target, compile_kwargs, closure, compilations)
+            except Exception as e:  # pylint: disable=broad-except
+                logger.warning(f"Could not store the compilation of {target} in the cache: {e}")
 
     instances = []
     for compilation in compilations:
         try:
-            instances.append(ContractPreprocess(compilation, **kwargs))
+            instances.append(ContractPreprocess(compilation, **_analysis_kwargs(args), **kwargs))
         except Exception as e:  # pylint: disable=broad-except
             errors.append({"target": getattr(compilation, "target", target), "stage": "contract_preprocess", "error": str(e)})
             if not args.no_fail:
@@ -627,29 +758,194 @@ def _load_targets(args: argparse.Namespace) -> List[str]:
     return uniq
 
 
-def main() -> None:
-    args = _parse_args()
+class _CallgraphWriter(OutputWriter):
+    """
+    Forwards to writer, and writes the callgraphs next to --output as the compilations are produced:
+    out.callgraph.dot for a single compilation, out.callgraph/NNN.<target>.dot otherwise
+    (the first one is moved once a second one comes).
+    """
+
+    def __init__(self, writer: OutputWriter, out_path: Path) -> None:  # pylint: disable=super-init-not-called
+        self._writer = writer
+        self._out_path = out_path
+        self._target: Optional[str] = None
+        self._contracts: List[Dict[str, Any]] = []
+        self._count = 0
+        self._first_target: Optional[str] = None
+
+    def _multi_path(self, idx: int, target: Optional[str]) -> Path:
+        tgt = _safe_fs_name(str(target or f"compilation_{idx}"))
+        return self._out_path.parent / f"{self._out_path.stem}.callgraph" / f"{idx:03d}.{tgt}.dot"
+
+    def begin_compilation(self, target: str) -> None:
+        super().begin_compilation(target)
+        self._contracts = []
+        self._writer.begin_compilation(target)
+
+    def add_contract(self, contract: Dict[str, Any]) -> None:
+        self._contracts.append(contract)
+        self._writer.add_contract(contract)
+
+    def end_compilation(self) -> None:
+        compilation = {"target": self._target, "contracts": self._contracts}
+        super().end_compilation()
+        self._writer.end_compilation()
+        self._contracts = []
+
+        single = self._out_path.with_suffix(".callgraph.dot")
+        if self._count == 0:
+            self._first_target = compilation["target"]
+            _write_callgraph_dot(compilation, single)
+        else:
+            if self._count == 1:
+                first = self._multi_path(0, self._first_target)
+                first.parent.mkdir(parents=True, exist_ok=True)
+                for src, dst in ((single, first), (single.with_suffix(".svg"), first.with_suffix(".svg"))):
+                    if src.exists():
+                        os.replace(src, dst)
+            _write_callgraph_dot(compilation, self._multi_path(self._count, compilation["target"]))
+        self._count += 1
+
+    def add_error(self, error: Dict[str, Any]) -> None:
+        self._writer.add_error(error)
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if argv[:1] == ["compilers"]:
+        compilers_main(argv[1:])
+        return
+    args = _parse_args(argv)
     targets = _load_targets(args)
     if not targets:
         raise SystemExit("No targets provided. Pass targets as arguments or via --targets-file.")
+    if args.emit_callgraph and not args.output:
+        raise SystemExit("--emit-callgraph requires --output")
+    if args.jobs < 1:
+        raise SystemExit("--jobs must be at least 1")
 
     visibilities: Optional[List[str]] = None
     if args.only_visibility:
         visibilities = [v.strip() for v in args.only_visibility.split(",") if v.strip()]
 
-    result: Dict[str, Any] = {
-        "tool": "contract-preprocess",
-        "targets": targets,
-        "compilations": [],
-    }
+    if args.output and args.output_format == "json":
+        # The document is only valid once complete: write it aside and move it to --output on success
+        # (jsonl records are written in place, to be read as they come)
+        output = Path(args.output)
+        tmp = output.with_name(f".{output.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp, "w", encoding="utf8") as f:
+                _preprocess_targets(args, targets, visibilities, output_writer(args.output_format, f, targets))
+            os.replace(tmp, output)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+    elif args.output:
+        with open(args.output, "w", encoding="utf8") as f:
+            _preprocess_targets(args, targets, visibilities, output_writer(args.output_format, f, targets))
+    else:
+        _preprocess_targets(args, targets, visibilities, output_writer(args.output_format, sys.stdout, targets))
 
-    kwargs = _crytic_kwargs(args)
-    all_errors: List[Dict[str, Any]] = []
-    dump_external_base = Path(args.dump_external_dir).resolve() if args.dump_external_dir else None
 
-    for target in targets:
-        if os.path.isfile(target) and target.endswith(".vy"):
-            try:
+def _preprocess_targets(
+    args: argparse.Namespace,
+    targets: List[str],
+    visibilities: Optional[List[str]],
+    writer: OutputWriter,
+) -> None:
+    """
+    Write the call edges of every target to writer, one contract at a time, in target order
+    """
+    if args.emit_callgraph:
+        writer = _CallgraphWriter(writer, Path(args.output))
+
+    dump_keys = _dump_external_keys(targets)
+    # A timeout needs a worker process that can be killed
+    if args.jobs > 1 or args.timeout:
+        for events, error in _preprocess_targets_parallel(args, targets, visibilities, dump_keys):
+            replay(events, writer)
+            if error is not None:
+                raise error
+    else:
+        vyper_results = _preprocess_vyper_targets(targets, args)
+        for target, dump_key in zip(targets, dump_keys):
+            _preprocess_target(target, args, visibilities, dump_key, writer, vyper_results)
+
+    writer.close()
+
+
+DumpKey = Optional[Tuple[int, bool]]
+
+
+def _dump_external_keys(targets: List[str]) -> List[DumpKey]:
+    """
+    Per target, what names its --dump-external-dir subdirectories (see _dump_external_dir):
+    None for a single target, else (target index, whether another target has the same name)
+    """
+    if len(targets) < 2:
+        return [None] * len(targets)
+    names = [_safe_fs_name(_pretty_target(t)) for t in targets]
+    counts = Counter(names)
+    return [(i, counts[name] > 1) for i, name in enumerate(names)]
+
+
+def _dump_external_dir(base: Path, target: str, compilation_target: str, dump_key: DumpKey) -> Path:
+    """
+    Directory of the bundles of compilation_target: base for a single target, else base/<compilation target>,
+    suffixed with -<target index> unless the compilation is named after its target and no other target has that name
+    (the compilations of exported zips are all named tmp.zip): no two targets, possibly processed at the same time
+    by different workers, write to the same directory
+    """
+    if dump_key is None:
+        return base
+    index, shared = dump_key
+    name = _safe_fs_name(compilation_target)
+    if shared or compilation_target != _pretty_target(target):
+        name = f"{name}-{index}"
+    return base / name
+
+
+def _preprocess_vyper_targets(targets: List[str], args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    """
+    Results of the .vy targets compiled together (one vyper run per compiler version), by target;
+    the missing ones are compiled on their own by _preprocess_target
+    """
+    vyper_targets = [t for t in targets if os.path.isfile(t) and t.endswith(".vy")]
+    if len(vyper_targets) < 2:
+        return {}
+    try:
+        results = preprocess_vyper_files(
+            [Path(t) for t in vyper_targets],
+            vyper_version=args.vyper_version,
+            auto_install=not args.no_auto_install,
+            include_external_calls=not args.no_external_calls,
+            include_solidity_calls=args.include_solidity_calls,
+        )
+    except Exception as e:  # pylint: disable=broad-except
+        logger.warning(f"Could not compile the Vyper targets together: {e}")
+        return {}
+    return {t: results[Path(t)] for t in vyper_targets if Path(t) in results}
+
+
+def _preprocess_target(
+    target: str,
+    args: argparse.Namespace,
+    visibilities: Optional[List[str]],
+    dump_key: DumpKey,
+    writer: OutputWriter,
+    vyper_results: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> None:
+    """
+    Compile and analyze target, and write its call edges to writer
+    (dump_key: see _dump_external_keys; vyper_results: already compiled .vy targets, see _preprocess_vyper_targets)
+    """
+    if os.path.isfile(target) and target.endswith(".vy"):
+        try:
+            vy = vyper_results.get(target) if vyper_results else None
+            if vy is None:
                 vy = preprocess_vyper_file(
                     Path(target),
                     vyper_version=args.vyper_version,
@@ -657,140 +953,251 @@ def main() -> None:
                     include_external_calls=not args.no_external_calls,
                     include_solidity_calls=args.include_solidity_calls,
                 )
-                if visibilities is not None:
-                    wanted = set(visibilities)
-                    for k in list(vy["functions"].keys()):
-                        if k not in wanted:
-                            vy["functions"][k] = []
-                result["compilations"].append(
-                    {
-                        "target": target,
-                        "contracts": [{"name": vy["contract_name"], "functions": vy["functions"]}],
-                    }
-                )
-            except Exception as e:  # pylint: disable=broad-except
-                all_errors.append({"target": target, "stage": "vyper", "error": str(e)})
-                if not args.no_fail:
-                    raise
-            continue
+            if visibilities is not None:
+                wanted = set(visibilities)
+                for k in list(vy["functions"].keys()):
+                    if k not in wanted:
+                        vy["functions"][k] = []
+            writer.begin_compilation(target)
+            writer.add_contract({"name": vy["contract_name"], "functions": vy["functions"]})
+            writer.end_compilation()
+        except Exception as e:  # pylint: disable=broad-except
+            writer.add_error({"target": target, "stage": "vyper", "error": str(e)})
+            if not args.no_fail:
+                raise
+        return
 
-        instances, errors = _iter_instances_for_target(target, args, kwargs)
-        all_errors.extend(errors)
-        for instance in instances:
-            contracts = instance.contracts
-            if args.exclude_dependencies:
-                filtered = []
-                for c in contracts:
-                    try:
-                        if not c.is_from_dependency():
-                            filtered.append(c)
-                    except Exception:  # pylint: disable=broad-except
+    kwargs = _crytic_kwargs(args)
+    dump_external_base = Path(args.dump_external_dir).resolve() if args.dump_external_dir else None
+
+    instances, errors = _iter_instances_for_target(target, args, kwargs)
+    for error in errors:
+        writer.add_error(error)
+    for instance in instances:
+        contracts = instance.contracts
+        if args.exclude_dependencies:
+            filtered = []
+            for c in contracts:
+                try:
+                    if not c.is_from_dependency():
                         filtered.append(c)
-                contracts = filtered
-
-            contracts_sorted = sorted(
-                contracts,
-                key=lambda c: (
-                    c.name,
-                    (
-                        getattr(
-                            getattr(getattr(c, "source_mapping", None), "filename", None), "absolute", ""
-                        )
-                        or ""
-                    ),
+                except Exception:  # pylint: disable=broad-except
+                    filtered.append(c)
+            contracts = filtered
+
+        contracts_sorted = sorted(
+            contracts,
+            key=lambda c: (
+                c.name,
+                (
+                    getattr(getattr(getattr(c, "source_mapping", None), "filename", None), "absolute", "")
+                    or ""
                 ),
-            )
-
-            compilation: Dict[str, Any] = {
-                "target": _pretty_target(instance.crytic_compile.target) if instance.crytic_compile else _pretty_target(target),
-                "contracts": [],
-            }
-
-            for contract in contracts_sorted:
-                grouped = contract_functions_by_visibility(
-                    contract,
-                    include_inherited=not args.declared_only,
-                    include_shadowed=args.include_shadowed,
-                    visibilities=visibilities,
-                )
+            ),
+        )
 
-                contract_entry: Dict[str, Any] = {"name": contract.name, "functions": {}}
+        compilation_target = (
+            _pretty_target(instance.crytic_compile.target) if instance.crytic_compile else _pretty_target(target)
+        )
+        writer.begin_compilation(compilation_target)
+
+        bundle_edges = _BundleCallEdges(
+            include_external_calls=not args.no_external_calls,
+            include_library_calls=not args.no_library_calls,
+            include_solidity_calls=args.include_solidity_calls,
+            include_modifiers=not args.no_modifiers,
+            include_base_constructors=not args.no_base_constructors,
+        )
+        for contract in contracts_sorted:
+            grouped = contract_functions_by_visibility(
+                contract,
+                include_inherited=not args.declared_only,
+                include_shadowed=args.include_shadowed,
+                visibilities=visibilities,
+            )
 
-                for visibility, functions in grouped.items():
-                    contract_entry["functions"][visibility] = [
-                        build_function_call_edges(
-                            f,
+            contract_entry: Dict[str, Any] = {"name": contract.name, "functions": {}}
+
+            for visibility, functions in grouped.items():
+                contract_entry["functions"][visibility] = [
+                    build_function_call_edges(
+                        f,
+                        include_external_calls=not args.no_external_calls,
+                        include_library_calls=not args.no_library_calls,
+                        include_solidity_calls=args.include_solidity_calls,
+                        include_modifiers=not args.no_modifiers,
+                        include_base_constructors=not args.no_base_constructors,
+                    )
+                    for f in functions
+                ]
+
+            if any(contract_entry["functions"].get(v) for v in contract_entry["functions"]):
+                writer.add_contract(contract_entry)
+
+            if dump_external_base is not None:
+                try:
+                    external_only = contract_functions_by_visibility(
+                        contract,
+                        include_inherited=not args.declared_only,
+                        include_shadowed=args.include_shadowed,
+                        visibilities=["external"],
+                    )["external"]
+                    dump_dir = _dump_external_dir(dump_external_base, target, compilation_target, dump_key)
+                    bundle_graph = bundle_edges.call_graph(external_only)
+                    for ext_fn in external_only:
+                        _dump_external_function_bundle(
+                            ext_fn,
+                            dump_dir,
                             include_external_calls=not args.no_external_calls,
                             include_library_calls=not args.no_library_calls,
                             include_solidity_calls=args.include_solidity_calls,
                             include_modifiers=not args.no_modifiers,
                             include_base_constructors=not args.no_base_constructors,
+                            call_edges=bundle_edges,
+                            call_graph=bundle_graph,
                         )
-                        for f in functions
-                    ]
+                except Exception as e:  # pylint: disable=broad-except
+                    writer.add_error(
+                        {
+                            "target": compilation_target,
+                            "stage": "dump-external",
+                            "error": str(e),
+                        }
+                    )
+                    if not args.no_fail:
+                        raise
 
-                if any(contract_entry["functions"].get(v) for v in contract_entry["functions"]):
-                    compilation["contracts"].append(contract_entry)
+        writer.end_compilation()
 
-                if dump_external_base is not None:
-                    try:
-                        external_only = contract_functions_by_visibility(
-                            contract,
-                            include_inherited=not args.declared_only,
-                            include_shadowed=args.include_shadowed,
-                            visibilities=["external"],
-                        )["external"]
-                        dump_dir = (
-                            dump_external_base / _safe_fs_name(compilation["target"])
-                            if len(targets) > 1
-                            else dump_external_base
-                        )
-                        for ext_fn in external_only:
-                            _dump_external_function_bundle(
-                                ext_fn,
-                                dump_dir,
-                                include_external_calls=not args.no_external_calls,
-                                include_library_calls=not args.no_library_calls,
-                                include_solidity_calls=args.include_solidity_calls,
-                                include_modifiers=not args.no_modifiers,
-                                include_base_constructors=not args.no_base_constructors,
-                            )
-                    except Exception as e:  # pylint: disable=broad-except
-                        all_errors.append(
-                            {
-                                "target": compilation["target"],
-                                "stage": "dump-external",
-                                "error": str(e),
-                            }
-                        )
-                        if not args.no_fail:
-                            raise
 
-            result["compilations"].append(compilation)
+TargetResult = Tuple[List[Tuple[str, Any]], Optional[BaseException]]
 
-    if all_errors:
-        result["errors"] = all_errors
 
-    out = json.dumps(result, indent=2, sort_keys=True) + "\n"
+def _target_worker_main(
+    conn: Connection,
+    args: argparse.Namespace,
+    visibilities: Optional[List[str]],
+) -> None:
+    """
+    Pool worker: process the (target, dump key) pairs received from the pipe, and send back the recorded output
+    of each (plus the exception that stopped it, if any)
+    """
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if task is None:
+            return
+        target, dump_key = task
+        recorder = OutputRecorder()
+        error: Optional[BaseException] = None
+        try:
+            _preprocess_target(target, args, visibilities, dump_key, recorder)
+        except Exception as e:  # pylint: disable=broad-except
+            # Exceptions may pickle and still fail to unpickle (e.g. custom constructor arguments):
+            # only send a plain RuntimeError back
+            error = RuntimeError(f"{type(e).__name__}: {e}")
+        conn.send((recorder.events, error))
+
+
+class _TargetWorker:
+    def __init__(self, ctx: Any, args: argparse.Namespace, visibilities: Optional[List[str]]) -> None:
+        self.conn, child_conn = ctx.Pipe()
+        self.proc = ctx.Process(target=_target_worker_main, args=(child_conn, args, visibilities), daemon=True)
+        self.proc.start()
+        child_conn.close()
+        self.index: Optional[int] = None
+        self.started = 0.0
+
+    def submit(self, index: int, target: str, dump_key: DumpKey) -> None:
+        self.index = index
+        self.started = time.monotonic()
+        self.conn.send((target, dump_key))
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.proc.join(timeout=5)
+        if self.proc.is_alive():
+            self.kill()
+
+    def kill(self) -> None:
+        self.proc.kill()
+        self.proc.join()
+        self.conn.close()
+
+
+def _preprocess_targets_parallel(
+    args: argparse.Namespace,
+    targets: List[str],
+    visibilities: Optional[List[str]],
+    dump_keys: List[DumpKey],
+) -> Iterator[TargetResult]:
+    """
+    Process the targets on --jobs worker processes; yield the recorded output of each target in target order,
+    as soon as it and all the previous ones are done.
+    A worker that exceeds --timeout or dies is killed and replaced; its target gets an error
+    with stage "timeout" / "worker-crash".
+    """
+    ctx = multiprocessing.get_context()
+    timeout: Optional[float] = args.timeout
+    next_index = 0
+    results: Dict[int, TargetResult] = {}
+    workers: List[_TargetWorker] = [
+        _TargetWorker(ctx, args, visibilities) for _ in range(min(args.jobs, len(targets)))
+    ]
 
-    if args.output:
-        with open(args.output, "w", encoding="utf8") as f:
-            f.write(out)
-        if args.emit_callgraph:
-            out_path = Path(args.output)
-            compilations = result.get("compilations") or []
-            if len(compilations) == 1:
-                _write_callgraph_dot(compilations[0], out_path.with_suffix(".callgraph.dot"))
-            elif len(compilations) > 1:
-                cg_dir = out_path.parent / f"{out_path.stem}.callgraph"
-                cg_dir.mkdir(parents=True, exist_ok=True)
-                for idx, comp in enumerate(compilations):
-                    tgt = _safe_fs_name(str(comp.get("target") or f"compilation_{idx}"))
-                    _write_callgraph_dot(comp, cg_dir / f"{idx:03d}.{tgt}.dot")
-    else:
-        if args.emit_callgraph:
-            raise SystemExit("--emit-callgraph requires --output")
-        sys.stdout.write(out)
+    def replace(worker: _TargetWorker) -> None:
+        workers[workers.index(worker)] = _TargetWorker(ctx, args, visibilities)
+
+    def failed(index: int, stage: str, message: str) -> TargetResult:
+        return [("error", {"target": targets[index], "stage": stage, "error": message})], None
+
+    try:
+        done = 0
+        while done < len(targets):
+            for w in workers:
+                if w.index is None and next_index < len(targets):
+                    w.submit(next_index, targets[next_index], dump_keys[next_index])
+                    next_index += 1
+            busy = [w for w in workers if w.index is not None]
+
+            wait_for = None
+            if timeout:
+                wait_for = max(0.0, min(w.started + timeout for w in busy) - time.monotonic())
+            ready = wait([w.conn for w in busy], timeout=wait_for)
+
+            for w in busy:
+                index = w.index
+                assert index is not None
+                if w.conn in ready:
+                    try:
+                        results[index] = w.conn.recv()
+                    except (EOFError, OSError):
+                        w.kill()
+                        replace(w)
+                        results[index] = failed(index, "worker-crash", f"worker exited with code {w.proc.exitcode}")
+                    except Exception as e:  # pylint: disable=broad-except
+                        # The whole message was read but could not be unpickled: the worker is still usable
+                        results[index] = failed(index, "worker-crash", f"could not read the worker result: {e}")
+                    w.index = None
+                elif timeout and time.monotonic() - w.started >= timeout:
+                    w.kill()
+                    replace(w)
+                    results[index] = failed(index, "timeout", f"preprocess exceeded {timeout}s")
+
+            while done in results:
+                yield results.pop(done)
+                done += 1
+    finally:
+        for w in workers:
+            if w.index is None:
+                w.stop()
+            else:
+                w.kill()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from crytic_compile import CryticCompile
+from crytic_compile.crytic_compile import get_platforms
+from crytic_compile.platform import Type as PlatformType
+from crytic_compile.platform import standard
+from crytic_compile.platform.archive import Archive, generate_archive_export
+from crytic_compile.platform.solc import Solc
+
+COMPILE_CACHE_VERSION = 1
+
+# Source sets remembered per lookup key (a lookup key only covers the import closure known before compiling)
+_MAX_CANDIDATES = 16
+
+# kwargs that make the compilation depend on more than the sources and the compiler options
+_UNCACHEABLE_KWARGS = ("compile_custom_build", "compile_libraries", "ignore_compile")
+
+
+def default_compile_cache_dir() -> Path:
+    base = Path(os.environ.get("CONTRACT_PREPROCESS_CACHE", Path.home() / ".cache")) / "contract-preprocess"
+    return base / "compile"
+
+
+def _sha256_file(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+@lru_cache(maxsize=None)
+def _crytic_compile_version() -> str:
+    try:
+        from importlib.metadata import version  # pylint: disable=import-outside-toplevel
+
+        return version("crytic-compile")
+    except Exception:  # pylint: disable=broad-except
+        return "unknown"
+
+
+@lru_cache(maxsize=None)
+def _framework_in(cwd: str) -> bool:
+    """
+    True if cwd is a framework project: CryticCompile then takes solc, remappings and optimizer
+    settings from the framework config instead of the kwargs.
+    """
+    return any(not issubclass(p, Solc) and p.is_supported(cwd) for p in get_platforms())
+
+
+def compiler_identity(solc: str) -> Optional[str]:
+    """
+    `solc --version` of the binary solc resolves to. None (not cacheable) if there is none, or for a script:
+    the solc-select shim picks the version (`solc-select use`, SOLC_VERSION) at each call.
+    """
+    resolved = os.path.realpath(shutil.which(solc) or solc)
+    try:
+        st = os.stat(resolved)
+        with open(resolved, "rb") as f:
+            if f.read(2) == b"#!":
+                return None
+    except OSError:
+        return None
+    return _solc_version(resolved, st.st_size, st.st_mtime_ns)
+
+
+@lru_cache(maxsize=None)
+def _solc_version(path: str, size: int, mtime_ns: int) -> Optional[str]:
+    # Memoized per binary; size and mtime are only there to ask again a binary replaced in place
+    try:
+        proc = subprocess.run([path, "--version"], capture_output=True, check=True, timeout=60)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return proc.stdout.decode("utf8", "replace").strip() or None
+
+
+def _remap_dirs(remaps: Any) -> List[Path]:
+    if not remaps:
+        return []
+    items = remaps.split() if isinstance(remaps, str) else list(remaps)
+    dirs = []
+    for item in items:
+        if "=" in item:
+            path = Path(item.rsplit("=", 1)[1]).resolve()
+            if path.exists():
+                dirs.append(path)
+    return dirs
+
+
+def _relocate(text: str, old: Sequence[str], new: Sequence[str]) -> str:
+    """
+    Replace the directory prefixes old by new in a JSON text. A prefix is only replaced at the start
+    of a path: after a quote, a "=" (remappings) or a blank, and before a "/".
+    "." (paths relative to the prefix itself) is left as is.
+    """
+    for o, n in zip(old, new):
+        if o in (n, "."):
+            continue
+        o_json = json.dumps(o)[1:-1]
+        n_json = json.dumps(n)[1:-1]
+        text = re.sub(r'(?<![^"=\s])' + re.escape(o_json) + r"(?=/)", lambda _: n_json, text)
+    return text
+
+
+class _CachedArtifact(Archive):
+    """
+    Platform loading a compilation from the cache (crytic-compile archive export),
+    keeping the original target.
+    """
+
+    def __init__(self, target: str, artifact: Dict[str, Any]) -> None:
+        super().__init__(target)
+        self._artifact = artifact
+
+    def compile(self, crytic_compile: CryticCompile, **_kwargs: str) -> None:
+        underlying_type, unit_tests = standard.load_from_compile(crytic_compile, self._artifact)
+        self._underlying_platform = next(
+            (p for p in get_platforms() if p.TYPE == PlatformType(underlying_type)), Archive
+        )
+        self._unit_tests = unit_tests
+        crytic_compile.src_content = self._artifact["source_content"]
+        crytic_compile.working_dir = Path.cwd()
+
+    @property
+    def platform_name_used(self) -> str:
+        return self._underlying_platform.NAME
+
+    @property
+    def platform_project_url_used(self) -> str:
+        return self._underlying_platform.PROJECT_URL
+
+    @property
+    def platform_type_used(self) -> PlatformType:
+        return self._underlying_platform.TYPE
+
+
+class CompileCache:
+    """
+    Content-addressed store of crytic-compile outputs (ASTs, source maps, bytecode) for single-file
+    Solidity targets, so identical inputs are not recompiled across runs or across addresses.
+
+    - A lookup key is computed before compiling: compiler identity (`solc --version`), compile kwargs and the import closure
+      (paths relative to the project directory + content hashes). It maps to the source sets compiled
+      for it (remapped imports are not part of the closure).
+    - An object key covers a full source set and the compiler settings, and stores the archive export
+      of the compilations.
+
+    Paths are stored relative to the project directory (the directory containing the target, its closure
+    and the remapping targets), and rewritten on load, so a copy of a project at another place hits.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+
+    @staticmethod
+    def supports(target: str, kwargs: Dict[str, Any]) -> bool:
+        if not (os.path.isfile(target) and target.endswith(".sol")):
+            return False
+        if kwargs.get("compile_force_framework") not in (None, "", "solc"):
+            return False
+        if any(kwargs.get(k) for k in _UNCACHEABLE_KWARGS):
+            return False
+        if compiler_identity(str(kwargs.get("solc") or "solc")) is None:
+            return False
+        return not _framework_in(str(kwargs.get("cwd") or Path.cwd()))
+
+    def _context(
+        self, target: str, kwargs: Dict[str, Any], closure: Iterable[Path]
+    ) -> Tuple[Path, List[str], str]:
+        """
+        (project directory, its [absolute, cwd-relative] prefixes, normalized compiler settings)
+        """
+        target_path = Path(target).resolve()
+        dirs = [target_path.parent] + [p.parent for p in closure]
+        dirs += _remap_dirs(kwargs.get("solc_remaps"))
+        base = Path(os.path.commonpath([d.as_posix() for d in dirs]))
+        cwd = Path(kwargs.get("cwd") or Path.cwd()).resolve()
+        prefixes = [base.as_posix(), Path(os.path.relpath(base, cwd)).as_posix()]
+
+        settings = json.dumps(
+            {
+                "version": COMPILE_CACHE_VERSION,
+                "crytic_compile": _crytic_compile_version(),
+                "solc": compiler_identity(str(kwargs.get("solc") or "solc")),
+                "kwargs": kwargs,
+                "target": target_path.relative_to(base).as_posix(),
+                # with the project directory as cwd, relative paths have no prefix to rewrite
+                "cwd_is_base": prefixes[1] == ".",
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return base, prefixes, _relocate(settings, prefixes, ["<base>", "<cwd-base>"])
+
+    @staticmethod
+    def _source_key(path: Path, base: Path) -> str:
+        try:
+            return path.relative_to(base).as_posix()
+        except ValueError:
+            return path.as_posix()
+
+    @staticmethod
+    def _digest(settings: str, sources: Dict[str, str]) -> str:
+        h = hashlib.sha256(settings.encode("utf8"))
+        for name in sorted(sources):
+            h.update(f"\0{name}\0{sources[name]}".encode("utf8"))
+        return h.hexdigest()
+
+    def _path(self, kind: str, key: str) -> Path:
+        return self.root / kind / key[:2] / f"{key}.json"
+
+    def _write(self, path: Path, data: str) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(data, encoding="utf8")
+        os.replace(tmp, path)
+
+    def _lookup_key(
+        self, target: str, kwargs: Dict[str, Any], closure: Sequence[Path]
+    ) -> Tuple[str, Path, List[str], str]:
+        base, prefixes, settings = self._context(target, kwargs, closure)
+        closure_sources = {self._source_key(p, base): _sha256_file(p) for p in closure}
+        return self._digest(settings, closure_sources), base, prefixes, settings
+
+    def load(
+        self, target: str, kwargs: Dict[str, Any], closure: Sequence[Path]
+    ) -> Optional[List[CryticCompile]]:
+        lookup_key, base, prefixes, _ = self._lookup_key(target, kwargs, closure)
+        try:
+            candidates = json.loads(self._path("lookup", lookup_key).read_text(encoding="utf8"))
+        except (OSError, ValueError):
+            return None
+
+        for candidate in candidates:
+            sources: Dict[str, str] = candidate["sources"]
+            try:
+                if any(_sha256_file(base / name) != digest for name, digest in sources.items()):
+                    continue
+            except OSError:
+                continue
+            try:
+                text = self._path("objects", candidate["object"]).read_text(encoding="utf8")
+            except OSError:
+                continue
+            header, body = text.split("\n", 1)
+            entry = json.loads(_relocate(body, json.loads(header)["prefixes"], prefixes))
+            return [
+                CryticCompile(_CachedArtifact(target, artifact), cwd=str(kwargs.get("cwd") or Path.cwd()))
+                for artifact in entry["compilations"]
+            ]
+        return None
+
+    def store(
+        self,
+        target: str,
+        kwargs: Dict[str, Any],
+        closure: Sequence[Path],
+        compilations: Sequence[CryticCompile],
+    ) -> None:
+        lookup_key, base, prefixes, settings = self._lookup_key(target, kwargs, closure)
+        files = {Path(f.absolute) for compilation in compilations for f in compilation.filenames}
+        files.update(closure)
+        sources = {self._source_key(p, base): _sha256_file(p) for p in files}
+        object_key = self._digest(settings, sources)
+
+        object_path = self._path("objects", object_key)
+        if not object_path.exists():
+            compilations_json = [generate_archive_export(compilation)[0] for compilation in compilations]
+            # First line: the prefixes of the stored paths, never rewritten
+            header = json.dumps({"prefixes": prefixes})
+            self._write(object_path, header + "\n" + json.dumps({"compilations": compilations_json}))
+
+        lookup_path = self._path("lookup", lookup_key)
+        try:
+            candidates = json.loads(lookup_path.read_text(encoding="utf8"))
+        except (OSError, ValueError):
+            candidates = []
+        candidates = [c for c in candidates if c["object"] != object_key]
+        candidates.insert(0, {"sources": sources, "object": object_key})
+        self._write(lookup_path, json.dumps(candidates[:_MAX_CANDIDATES]))
@@ -0,0 +1,233 @@
+"""
+Compiler version resolution shared by the preprocess CLI, Etherscan/run_all.py and the Vyper support.
+
+A batch run resolves the same pragmas against the same compiler lists over and over; everything is
+memoized for the life of the process:
+    - the installed solc versions (solc-select directory scan),
+    - the available solc/vyper versions, also persisted under
+      $CONTRACT_PREPROCESS_CACHE/contract-preprocess/versions (default ~/.cache) and refreshed once a day,
+      so a run makes at most one network call per compiler, and none offline while the index is there,
+    - the pragma of each source file (solidity_scan),
+    - the version chosen for a set of pragmas.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.request import urlopen
+
+from packaging.specifiers import SpecifierSet
+from packaging.version import InvalidVersion, Version
+from solc_select.solc_select import get_available_versions, installed_versions
+
+from contract_preprocess.tools.preprocess.solidity_scan import scan_solidity_file
+
+logger = logging.getLogger("contract-preprocess")
+
+# Age after which a persisted index of available versions is refreshed (a stale one is still used offline)
+INDEX_TTL_S = 24 * 3600
+
+
+def default_versions_dir() -> Path:
+    base = Path(os.environ.get("CONTRACT_PREPROCESS_CACHE", Path.home() / ".cache")) / "contract-preprocess"
+    return base / "versions"
+
+
+def caret_to_specifier(v: Version) -> SpecifierSet:
+    lower = f">={v.public}"
+    if v.major == 0:
+        # 0.y.z -> <0.(y+1).0
+        upper = f"<0.{v.minor + 1}.0"
+    else:
+        upper = f"<{v.major + 1}.0.0"
+    return SpecifierSet(",".join([lower, upper]))
+
+
+def specifier_from_solidity_pragma(spec: str) -> SpecifierSet:
+    raw = spec.strip()
+    if not raw:
+        return SpecifierSet()
+    # Solidity allows multiple ranges separated by spaces.
+    parts = [p for p in re.split(r"\s+", raw) if p]
+    converted: List[str] = []
+    for p in parts:
+        if p.startswith("^"):
+            converted.append(str(caret_to_specifier(Version(p[1:]))))
+        elif re.match(r"^\d+\.\d+\.\d+$", p):
+            converted.append(f"=={p}")
+        else:
+            converted.append(p)
+    # SpecifierSet expects comma-separated.
+    return SpecifierSet(",".join(converted))
+
+
+def _parse_versions(values: Iterable[str]) -> List[Version]:
+    versions: Set[Version] = set()
+    for v in values:
+        try:
+            versions.add(Version(v))
+        except InvalidVersion:
+            continue
+    return sorted(versions)
+
+
+def _fetch_solc_versions() -> List[str]:
+    return list(get_available_versions().keys())
+
+
+def fetch_pypi_versions(package: str, *, timeout_s: int = 10) -> List[str]:
+    with urlopen(f"https://pypi.org/pypi/{package}/json", timeout=timeout_s) as resp:
+        payload = json.loads(resp.read().decode("utf-8"))
+    return list(payload.get("releases", {}).keys())
+
+
+def _fetch_vyper_versions() -> List[str]:
+    return fetch_pypi_versions("vyper")
+
+
+class CompilerVersions:
+    """
+    Process-wide memo of the compiler versions; use compiler_versions() to get the shared instance
+    """
+
+    def __init__(self, index_dir: Optional[Path] = None) -> None:
+        self.index_dir = index_dir or default_versions_dir()
+        self._installed_solc: Optional[Set[str]] = None
+        self._available: Dict[str, List[Version]] = {}
+        self._solc_choices: Dict[Tuple[Tuple[str, ...], bool], Optional[str]] = {}
+
+    # Installed solc
+
+    def installed_solc(self, refresh: bool = False) -> Set[str]:
+        if self._installed_solc is None or refresh:
+            self._installed_solc = set(installed_versions())
+            self._solc_choices.clear()
+        return self._installed_solc
+
+    def is_solc_installed(self, version: str) -> bool:
+        # Another process may have installed it since the scan
+        return version in self.installed_solc() or version in self.installed_solc(refresh=True)
+
+    def solc_installed(self, version: str) -> None:
+        """
+        Record a version installed by this process
+        """
+        self.installed_solc().add(version)
+        self._solc_choices.clear()
+
+    # Available versions
+
+    def _index_path(self, compiler: str) -> Path:
+        return self.index_dir / f"{compiler}.json"
+
+    def _read_index(self, compiler: str) -> Optional[Tuple[float, List[str]]]:
+        try:
+            data = json.loads(self._index_path(compiler).read_text(encoding="utf8"))
+            return float(data["fetched"]), list(data["versions"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _write_index(self, compiler: str, versions: List[str]) -> None:
+        path = self._index_path(compiler)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps({"fetched": time.time(), "versions": versions}), encoding="utf8")
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    def _available_versions(self, compiler: str, fetch: Callable[[], List[str]], allow_network: bool) -> List[Version]:
+        """
+        Available versions: memo, then the persisted index while fresh, then the network
+        (falling back to a stale index). A failed lookup is remembered too, as an empty list.
+        """
+        if compiler in self._available:
+            return self._available[compiler]
+        index = self._read_index(compiler)
+        values: List[str] = []
+        if index is not None and (not allow_network or time.time() - index[0] < INDEX_TTL_S):
+            values = index[1]
+        elif allow_network:
+            try:
+                values = fetch()
+                self._write_index(compiler, values)
+            except Exception as e:  # pylint: disable=broad-except
+                logger.warning(f"Could not fetch the available {compiler} versions: {e}")
+                if index is not None:
+                    values = index[1]
+        else:
+            # Offline without an index: do not remember, a later online lookup may succeed
+            return []
+        self._available[compiler] = _parse_versions(values)
+        return self._available[compiler]
+
+    def use_available(self, compiler: str, values: Iterable[str]) -> None:
+        """
+        Take values as the available versions of compiler (e.g. the ones of a local mirror), instead of fetching them
+        """
+        self._available[compiler] = _parse_versions(values)
+        self._solc_choices.clear()
+
+    def available_solc(self, allow_network: bool = True) -> List[Version]:
+        return self._available_versions("solc", _fetch_solc_versions, allow_network)
+
+    def available_vyper(self, allow_network: bool = True) -> List[Version]:
+        """
+        Stable vyper releases on PyPI (pre/dev releases are skipped: for compiler selection, stable is preferable)
+        """
+        return [
+            v
+            for v in self._available_versions("vyper", _fetch_vyper_versions, allow_network)
+            if not (v.is_prerelease or v.is_devrelease)
+        ]
+
+    def pick_solc_version(self, files: Iterable[Path], include_available: bool = True) -> Optional[str]:
+        """
+        solc version for files: the exact version they pin if it is unique, else the newest installed
+        version satisfying every pragma, else (include_available) the newest available one
+        """
+        pragmas = {scan.pragma for scan in map(scan_solidity_file, files) if scan is not None and scan.pragma}
+        key = (tuple(sorted(pragmas)), include_available)
+        if key not in self._solc_choices:
+            self._solc_choices[key] = self._solc_version_for_pragmas(pragmas, include_available)
+        return self._solc_choices[key]
+
+    def _solc_version_for_pragmas(self, pragmas: Set[str], include_available: bool) -> Optional[str]:
+        wanted_sets: List[SpecifierSet] = []
+        exact_versions: Set[str] = set()
+        for pragma in pragmas:
+            if re.fullmatch(r"\d+\.\d+\.\d+", pragma):
+                exact_versions.add(pragma)
+            try:
+                wanted_sets.append(specifier_from_solidity_pragma(pragma))
+            except Exception:  # pylint: disable=broad-except
+                continue
+
+        # If any file pins an exact version, prefer it (must be consistent to compile).
+        if len(exact_versions) == 1:
+            return next(iter(exact_versions))
+
+        # Prefer already-installed versions for speed.
+        best: Optional[Version] = None
+        for v in _parse_versions(self.installed_solc()):
+            if all(v in s for s in wanted_sets):
+                best = v
+        if best is not None or not include_available:
+            return best.public if best is not None else None
+
+        for v in self.available_solc():
+            if all(v in s for s in wanted_sets):
+                best = v
+        return best.public if best is not None else None
+
+
+@lru_cache(maxsize=None)
+def compiler_versions() -> CompilerVersions:
+    return CompilerVersions()
@@ -0,0 +1,287 @@
+"""
+`contract-preprocess compilers sync <corpus>...`: install, before a batch run, every compiler version its
+targets need, so that the run never waits for an install.
+
+The needed versions are the ones the preprocess picks:
+    - solc: the version chosen for the import closure of each root file, i.e. a `.sol` file with a
+      `pragma solidity` that no other file of the corpus imports (files under a `@...` directory are
+      dependencies, never roots). Imports are resolved relative to the importing file, then to its
+      parent directories (remapped `@org/...` directories, project-root relative paths).
+    - vyper: the first candidate version of each `.vy` file (and of each `.sol` file with a Vyper header).
+
+The versions are installed in parallel, from a local mirror for the versions it has (downloaded otherwise,
+unless offline):
+    <mirror>/solc/solc-<version>          solc binaries (or solc-select's solc-<version>/solc-<version>)
+    <mirror>/wheels/                       wheels of vyper and its dependencies (pip download vyper==<version> -d ...)
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from packaging.version import InvalidVersion, Version
+from solc_select.solc_select import artifact_path, install_artifacts
+
+from contract_preprocess.tools.preprocess.compiler_versions import compiler_versions
+from contract_preprocess.tools.preprocess.solidity_scan import scan_solidity_file
+from contract_preprocess.tools.preprocess.vyper_support import (
+    default_cache_root,
+    detect_vyper_version_spec,
+    ensure_vyper_binary,
+    vyper_version_for_source,
+)
+
+_WHEEL_VERSION = re.compile(r"^vyper-(?P<version>[^-]+)-", re.IGNORECASE)
+
+
+def _corpus_files(paths: Sequence[Path]) -> List[Path]:
+    files: Set[Path] = set()
+    for path in paths:
+        if path.is_dir():
+            files.update(p for p in path.rglob("*") if p.suffix in (".sol", ".vy") and p.is_file())
+        elif path.is_file():
+            files.add(path)
+    return sorted(p.resolve() for p in files)
+
+
+def _resolve_import(current_file: Path, imp: str, top: Path) -> Optional[Path]:
+    if imp.startswith("http://") or imp.startswith("https://"):
+        return None
+    if imp.startswith("."):
+        candidate = (current_file.parent / imp).resolve()
+        return candidate if candidate.is_file() else None
+    # "@org/pkg/..." or a path relative to a project directory: the closest parent directory that has it
+    base = current_file.parent
+    while True:
+        candidate = (base / imp).resolve()
+        if candidate.is_file():
+            return candidate
+        if base == top or base == base.parent:
+            return None
+        base = base.parent
+
+
+def _import_closure(root: Path, top: Path) -> List[Path]:
+    visited: Set[Path] = set()
+    stack = [root]
+    while stack:
+        p = stack.pop()
+        if p in visited:
+            continue
+        visited.add(p)
+        scan = scan_solidity_file(p)
+        if scan is None:
+            continue
+        for imp in scan.imports:
+            resolved = _resolve_import(p, imp, top)
+            if resolved is not None and resolved.suffix == ".sol":
+                stack.append(resolved)
+    return sorted(visited)
+
+
+def _top(path: Path, tops: Sequence[Path]) -> Path:
+    for top in tops:
+        if top == path or top in path.parents:
+            return top
+    return path.parent
+
+
+def needed_versions(
+    paths: Sequence[Path], allow_network: bool = True
+) -> Tuple[Dict[Optional[str], List[Path]], Dict[str, List[Path]]]:
+    """
+    (solc version -> root files, vyper version -> files) of the corpus;
+    the roots no known solc version satisfies are under None
+    """
+    tops = [p.resolve() if p.is_dir() else p.resolve().parent for p in paths]
+    files = _corpus_files(paths)
+
+    vyper_files: List[Path] = [p for p in files if p.suffix == ".vy"]
+    sol_files: List[Path] = []
+    imported: Set[Path] = set()
+    for p in files:
+        if p.suffix != ".sol":
+            continue
+        scan = scan_solidity_file(p)
+        if scan is None:
+            continue
+        if scan.pragma is None:
+            # Vyper sources are sometimes saved as .sol
+            if detect_vyper_version_spec(p.read_text(encoding="utf8", errors="ignore")):
+                vyper_files.append(p)
+            continue
+        sol_files.append(p)
+        for imp in scan.imports:
+            resolved = _resolve_import(p, imp, _top(p, tops))
+            if resolved is not None:
+                imported.add(resolved)
+
+    solc: Dict[Optional[str], List[Path]] = {}
+    versions = compiler_versions()
+    for root in sol_files:
+        if root in imported or any(part.startswith("@") for part in root.parts):
+            continue
+        solc.setdefault(versions.pick_solc_version(_import_closure(root, _top(root, tops))), []).append(root)
+
+    vyper: Dict[str, List[Path]] = {}
+    for p in vyper_files:
+        version = vyper_version_for_source(p.read_text(encoding="utf8", errors="ignore"), allow_network=allow_network)
+        if version is not None:
+            vyper.setdefault(version, []).append(p)
+
+    return solc, vyper
+
+
+def _mirror_solc(mirror: Path, version: str) -> Optional[Path]:
+    for candidate in (mirror / "solc" / f"solc-{version}", mirror / "solc" / f"solc-{version}" / f"solc-{version}"):
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+def _mirror_solc_versions(mirror: Path) -> List[str]:
+    if not (mirror / "solc").is_dir():
+        return []
+    return [p.name[len("solc-") :] for p in (mirror / "solc").iterdir() if p.name.startswith("solc-")]
+
+
+def _mirror_vyper_versions(mirror: Path) -> List[str]:
+    if not (mirror / "wheels").is_dir():
+        return []
+    return [m.group("version") for m in map(_WHEEL_VERSION.match, os.listdir(mirror / "wheels")) if m]
+
+
+def _install_solc(version: str, mirror: Optional[Path], allow_network: bool) -> str:
+    source = _mirror_solc(mirror, version) if mirror is not None else None
+    if source is not None:
+        target = artifact_path(version)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+        shutil.copyfile(source, tmp)
+        tmp.chmod(0o775)
+        os.replace(tmp, target)
+        return "installed from the mirror"
+    if not allow_network:
+        raise RuntimeError("not in the mirror" if mirror is not None else "offline")
+    if not install_artifacts([version], silent=True):
+        raise RuntimeError(f"solc-select could not install {version}")
+    return "installed"
+
+
+def _install_vyper(version: str, mirror: Optional[Path], allow_network: bool, cache_dir: Path) -> str:
+    in_mirror = mirror is not None and version in _mirror_vyper_versions(mirror)
+    if not in_mirror and not allow_network:
+        raise RuntimeError("not in the mirror" if mirror is not None else "offline")
+    ensure_vyper_binary(version, cache_dir=cache_dir, find_links=mirror / "wheels" if in_mirror else None)
+    return "installed from the mirror" if in_mirror else "installed"
+
+
+def _version_key(version: str) -> Tuple[int, object]:
+    try:
+        return 0, Version(version)
+    except InvalidVersion:
+        return 1, version
+
+
+def sync(
+    paths: Sequence[Path],
+    *,
+    mirror: Optional[Path] = None,
+    jobs: int = 4,
+    allow_network: bool = True,
+    dry_run: bool = False,
+    cache_dir: Optional[Path] = None,
+) -> int:
+    """
+    Install the compiler versions the corpus needs (one line per version on stdout); 1 if any install failed
+    """
+    cache_root = cache_dir or default_cache_root()
+    versions = compiler_versions()
+    if not allow_network:
+        # Choose among the versions known offline: the persisted index and the mirror
+        mirror_solc = _mirror_solc_versions(mirror) if mirror is not None else []
+        mirror_vyper = _mirror_vyper_versions(mirror) if mirror is not None else []
+        versions.use_available("solc", [v.public for v in versions.available_solc(allow_network=False)] + mirror_solc)
+        versions.use_available("vyper", [v.public for v in versions.available_vyper(allow_network=False)] + mirror_vyper)
+
+    solc, vyper = needed_versions(paths, allow_network=allow_network)
+
+    # (compiler, version, number of files, install or None if already there)
+    tasks: List[Tuple[str, str, int, Optional[Callable[[], str]]]] = []
+    failed = 0
+    if None in solc:
+        failed += 1
+        n_files = len(solc.pop(None))
+        print(f"solc ? ({n_files} file{'s' if n_files > 1 else ''}): no known version satisfies their pragmas", flush=True)
+    for version in sorted(solc, key=_version_key):
+        install = None if versions.is_solc_installed(version) else partial(_install_solc, version, mirror, allow_network)
+        tasks.append(("solc", version, len(solc[version]), install))
+    for version in sorted(vyper, key=_version_key):
+        installed = (cache_root / "vyper" / version / "bin" / "vyper").exists()
+        install = None if installed else partial(_install_vyper, version, mirror, allow_network, cache_root)
+        tasks.append(("vyper", version, len(vyper[version]), install))
+
+    def run(task: Tuple[str, str, int, Optional[Callable[[], str]]]) -> Tuple[bool, str]:
+        install = task[3]
+        if install is None:
+            return True, "already installed"
+        if dry_run:
+            return True, "missing"
+        try:
+            return True, install()
+        except Exception as e:  # pylint: disable=broad-except
+            return False, f"failed: {str(e).strip().splitlines()[-1] if str(e).strip() else type(e).__name__}"
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        results = list(pool.map(run, tasks))
+
+    for (compiler, version, n_files, install), (ok, status) in zip(tasks, results):
+        if compiler == "solc" and install is not None and ok and not dry_run:
+            versions.solc_installed(version)
+        failed += not ok
+        print(f"{compiler} {version} ({n_files} file{'s' if n_files > 1 else ''}): {status}", flush=True)
+    return 1 if failed else 0
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="contract-preprocess compilers",
+        description="Manage the solc/vyper versions used by contract-preprocess.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    sync_parser = commands.add_parser(
+        "sync", help="Install every compiler version the targets of a corpus need, ahead of a batch run."
+    )
+    sync_parser.add_argument("paths", nargs="+", help="Files or directories to scan (e.g. Etherscan/SourceCode).")
+    sync_parser.add_argument(
+        "--mirror",
+        default=None,
+        help="Local mirror to install from: <mirror>/solc/solc-<version> binaries, <mirror>/wheels/ vyper wheels.",
+    )
+    sync_parser.add_argument("--jobs", type=int, default=4, help="Parallel installs (default: 4).")
+    sync_parser.add_argument(
+        "--offline",
+        action="store_true",
+        default=False,
+        help="No network: versions are chosen from the last index and the mirror, and only installed from the mirror.",
+    )
+    sync_parser.add_argument(
+        "--dry-run", action="store_true", default=False, help="List the needed versions without installing them."
+    )
+    args = parser.parse_args(argv)
+
+    raise SystemExit(
+        sync(
+            [Path(p) for p in args.paths],
+            mirror=Path(args.mirror) if args.mirror else None,
+            jobs=args.jobs,
+            allow_network=not args.offline,
+            dry_run=args.dry_run,
+        )
+    )
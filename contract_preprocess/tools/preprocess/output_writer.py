@@ -0,0 +1,178 @@
+"""
+Writers of the preprocess output, fed one contract at a time so that only the current contract
+has to be kept in memory.
+
+- json: the {"compilations": [...], "errors": [...], "targets": [...], "tool": ...} document, byte for byte
+  what json.dumps(result, indent=2, sort_keys=True) gives for the whole result.
+- jsonl: one JSON record per line, flushed as soon as it is produced:
+    {"record": "run", "targets": [...], "tool": ...}                  first line
+    {"record": "contract", "functions": {...}, "name": ..., "target": ...}
+    {"record": "compilation", "contracts": <number of contract records>, "target": ...}
+    {"record": "error", "error": ..., "stage": ..., "target": ...}
+"""
+from __future__ import annotations
+
+import abc
+import json
+from typing import Any, Dict, List, Optional, TextIO, Tuple
+
+TOOL_NAME = "contract-preprocess"
+
+OUTPUT_FORMATS = ("json", "jsonl")
+
+
+def _dumps(value: Any, level: int) -> str:
+    """
+    value as json.dumps(..., indent=2, sort_keys=True) writes it at the given nesting level
+    (JSON strings never contain a raw line break)
+    """
+    return json.dumps(value, indent=2, sort_keys=True).replace("\n", "\n" + "  " * level)
+
+
+class OutputWriter(abc.ABC):
+    """
+    begin_compilation(target), add_contract(entry)..., end_compilation() for each compilation,
+    add_error(error) at any time, then close(). The stream is not closed.
+    """
+
+    def __init__(self, stream: TextIO, targets: List[str]) -> None:
+        self._stream = stream
+        self._targets = targets
+        self._target: Optional[str] = None
+
+    def begin_compilation(self, target: str) -> None:
+        assert self._target is None
+        self._target = target
+
+    @abc.abstractmethod
+    def add_contract(self, contract: Dict[str, Any]) -> None:
+        pass
+
+    def end_compilation(self) -> None:
+        assert self._target is not None
+        self._target = None
+
+    @abc.abstractmethod
+    def add_error(self, error: Dict[str, Any]) -> None:
+        pass
+
+    def close(self) -> None:
+        self._stream.flush()
+
+
+class JsonOutputWriter(OutputWriter):
+    def __init__(self, stream: TextIO, targets: List[str]) -> None:
+        super().__init__(stream, targets)
+        # Written after the compilations, as json.dumps(sort_keys=True) orders them
+        self._errors: List[Dict[str, Any]] = []
+        self._compilations = 0
+        self._contracts = 0
+        self._stream.write('{\n  "compilations": [')
+
+    def begin_compilation(self, target: str) -> None:
+        super().begin_compilation(target)
+        self._stream.write(",\n" if self._compilations else "\n")
+        self._stream.write('    {\n      "contracts": [')
+        self._compilations += 1
+        self._contracts = 0
+
+    def add_contract(self, contract: Dict[str, Any]) -> None:
+        assert self._target is not None
+        self._stream.write(",\n" if self._contracts else "\n")
+        self._stream.write("        " + _dumps(contract, 4))
+        self._contracts += 1
+
+    def end_compilation(self) -> None:
+        target = self._target
+        super().end_compilation()
+        self._stream.write("\n      ]" if self._contracts else "]")
+        self._stream.write(f',\n      "target": {json.dumps(target)}\n    }}')
+
+    def add_error(self, error: Dict[str, Any]) -> None:
+        self._errors.append(error)
+
+    def close(self) -> None:
+        assert self._target is None
+        self._stream.write("\n  ]" if self._compilations else "]")
+        if self._errors:
+            self._stream.write(f',\n  "errors": {_dumps(self._errors, 1)}')
+        self._stream.write(f',\n  "targets": {_dumps(self._targets, 1)}')
+        self._stream.write(f',\n  "tool": {json.dumps(TOOL_NAME)}\n}}\n')
+        super().close()
+
+
+class JsonLinesOutputWriter(OutputWriter):
+    def __init__(self, stream: TextIO, targets: List[str]) -> None:
+        super().__init__(stream, targets)
+        self._contracts = 0
+        self._write("run", {"targets": targets, "tool": TOOL_NAME})
+
+    def _write(self, record: str, fields: Dict[str, Any]) -> None:
+        # "record" first, then the sorted fields
+        line = json.dumps({"record": record})[:-1] + ", " + json.dumps(fields, sort_keys=True)[1:]
+        self._stream.write(line + "\n")
+        self._stream.flush()
+
+    def begin_compilation(self, target: str) -> None:
+        super().begin_compilation(target)
+        self._contracts = 0
+
+    def add_contract(self, contract: Dict[str, Any]) -> None:
+        assert self._target is not None
+        self._write("contract", {"target": self._target, **contract})
+        self._contracts += 1
+
+    def end_compilation(self) -> None:
+        target = self._target
+        super().end_compilation()
+        self._write("compilation", {"target": target, "contracts": self._contracts})
+
+    def add_error(self, error: Dict[str, Any]) -> None:
+        self._write("error", error)
+
+
+class OutputRecorder(OutputWriter):
+    """
+    Keeps the calls instead of writing them, to replay them later on another writer
+    (the output of a target processed by a --jobs worker). Only the targets' edge dicts are kept.
+    """
+
+    def __init__(self) -> None:  # pylint: disable=super-init-not-called
+        self._target = None
+        self.events: List[Tuple[str, Any]] = []
+
+    def begin_compilation(self, target: str) -> None:
+        super().begin_compilation(target)
+        self.events.append(("begin", target))
+
+    def add_contract(self, contract: Dict[str, Any]) -> None:
+        assert self._target is not None
+        self.events.append(("contract", contract))
+
+    def end_compilation(self) -> None:
+        super().end_compilation()
+        self.events.append(("end", None))
+
+    def add_error(self, error: Dict[str, Any]) -> None:
+        self.events.append(("error", error))
+
+    def close(self) -> None:
+        pass
+
+
+def replay(events: List[Tuple[str, Any]], writer: OutputWriter) -> None:
+    for kind, value in events:
+        if kind == "begin":
+            writer.begin_compilation(value)
+        elif kind == "contract":
+            writer.add_contract(value)
+        elif kind == "end":
+            writer.end_compilation()
+        else:
+            writer.add_error(value)
+
+
+def output_writer(output_format: str, stream: TextIO, targets: List[str]) -> OutputWriter:
+    if output_format == "jsonl":
+        return JsonLinesOutputWriter(stream, targets)
+    return JsonOutputWriter(stream, targets)
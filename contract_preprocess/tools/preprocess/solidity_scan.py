@@ -0,0 +1,137 @@
+"""
+Single-pass scan of a Solidity source for what is needed before compiling: the imported paths, the
+`pragma solidity` spec and the declared contracts, libraries and interfaces.
+
+One tokenizer pass per file (comments and string literals are tokens, so a "//" in a string or a
+"contract X" in a comment is not taken for code). Scans are memoized by content hash, and files by
+path, size and mtime, so root picking, closure collection and version selection share one read per file.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+_TOKEN = re.compile(
+    r"""
+    (?P<comment>//[^\n]*|/\*.*?(?:\*/|\Z))
+    |(?P<string>"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')
+    |(?P<number>\d[\w.]*)
+    |(?P<word>[A-Za-z_$][\w$]*)
+    |(?P<semicolon>;)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+_DECLARATIONS = ("contract", "library", "interface")
+
+
+@dataclass(frozen=True)
+class SolidityScan:
+    imports: Tuple[str, ...]
+    # Spec of the first `pragma solidity` (e.g. "^0.8.0", ">=0.4.22 <0.6.0")
+    pragma: Optional[str]
+    contracts: Tuple[str, ...]
+    libraries: Tuple[str, ...]
+    interfaces: Tuple[str, ...]
+
+
+def scan_solidity(text: str) -> SolidityScan:
+    imports: List[str] = []
+    pragma: Optional[str] = None
+    declared: Dict[str, List[str]] = {kind: [] for kind in _DECLARATIONS}
+
+    # Statement being read: "import", "pragma" (before "solidity"), "solidity" or a declaration keyword
+    state: Optional[str] = None
+    import_path: Optional[str] = None
+    # `pragma solidity` spec: the source from the end of "solidity" to the ";", minus comments
+    spec_parts: List[str] = []
+    spec_start = 0
+
+    for m in _TOKEN.finditer(text):
+        kind = m.lastgroup
+        if kind == "comment":
+            if state == "solidity":
+                spec_parts.append(text[spec_start : m.start()])
+                spec_start = m.end()
+            continue
+
+        if state == "import":
+            if kind == "string" and import_path is None:
+                import_path = m.group()[1:-1]
+            elif kind == "semicolon":
+                if import_path is not None:
+                    imports.append(import_path)
+                state = None
+            continue
+        if state == "pragma":
+            if kind == "word" and m.group() == "solidity":
+                state = "solidity"
+                spec_parts = []
+                spec_start = m.end()
+            else:
+                state = None if kind == "semicolon" else "other"
+            continue
+        if state == "solidity":
+            if kind == "semicolon":
+                spec_parts.append(text[spec_start : m.start()])
+                if pragma is None:
+                    pragma = "".join(spec_parts).strip()
+                state = None
+            continue
+        if state in _DECLARATIONS:
+            if kind == "word":
+                declared[state].append(m.group())
+            state = None
+            continue
+        if state == "other":
+            if kind == "semicolon":
+                state = None
+            continue
+
+        if kind == "word":
+            word = m.group()
+            if word == "import":
+                state = "import"
+                import_path = None
+            elif word == "pragma":
+                state = "pragma"
+            elif word in _DECLARATIONS:
+                state = word
+
+    return SolidityScan(
+        imports=tuple(imports),
+        pragma=pragma or None,
+        contracts=tuple(declared["contract"]),
+        libraries=tuple(declared["library"]),
+        interfaces=tuple(declared["interface"]),
+    )
+
+
+_scans: Dict[str, SolidityScan] = {}
+_file_digests: Dict[Tuple[str, int, int], str] = {}
+
+
+def scan_solidity_file(path: Path) -> Optional[SolidityScan]:
+    """
+    Memoized scan of a file; None if it cannot be read
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key = (os.fspath(path), st.st_size, st.st_mtime_ns)
+    digest = _file_digests.get(key)
+    if digest is None:
+        try:
+            data = Path(path).read_bytes()
+        except OSError:
+            return None
+        digest = hashlib.sha256(data).hexdigest()
+        if digest not in _scans:
+            _scans[digest] = scan_solidity(data.decode("utf8", errors="ignore"))
+        _file_digests[key] = digest
+    return _scans[digest]
@@ -1,39 +1,64 @@
 from __future__ import annotations
 
+import atexit
 import json
 import os
 import re
+import struct
 import subprocess
 import sys
 import venv
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
-from urllib.request import urlopen
 
 from packaging.specifiers import SpecifierSet
 from packaging.version import InvalidVersion, Version
 
+from contract_preprocess.tools.preprocess.compiler_versions import compiler_versions
 
-_VYPER_STD_JSON: Dict[str, Any] = {
-    "language": "Vyper",
-    "sources": {},
-    "settings": {
-        "outputSelection": {
-            "*": {
-                "*": [
-                    "abi",
-                    "devdoc",
-                    "userdoc",
-                    "evm.bytecode",
-                    "evm.deployedBytecode",
-                    "evm.deployedBytecode.sourceMap",
-                ],
-                "": ["ast"],
-            }
-        }
-    },
+
+# Every output of a standard-json compile (abi, bytecodes, source maps: runs the codegen)
+_VYPER_FULL_OUTPUT: Dict[str, Any] = {
+    "*": [
+        "abi",
+        "devdoc",
+        "userdoc",
+        "evm.bytecode",
+        "evm.deployedBytecode",
+        "evm.deployedBytecode.sourceMap",
+    ],
+    "": ["ast"],
 }
+# What extract_vyper_functions_and_calls reads: the module AST, no codegen
+# (the version pragma and the syntax are still checked)
+_VYPER_AST_OUTPUT: Dict[str, Any] = {"": ["ast"]}
+
+
+def _vyper_standard_json_input(sources: Dict[str, str], *, ast_only: bool) -> Dict[str, Any]:
+    return {
+        "language": "Vyper",
+        "sources": {key: {"content": content} for key, content in sources.items()},
+        "settings": {"outputSelection": {"*": _VYPER_AST_OUTPUT if ast_only else _VYPER_FULL_OUTPUT}},
+    }
+
+
+# vyper_worker.py: a long-lived `vyper --standard-json` per vyper venv
+_WORKER_SCRIPT = Path(__file__).with_name("vyper_worker.py")
+_FRAME_HEADER = struct.Struct(">I")
+# A worker exits after this long without a request (the next compile starts a new one)
+VYPER_WORKER_IDLE_TIMEOUT_S = 300
+
+
+class VyperWorkerError(RuntimeError):
+    pass
+
+
+class VyperCompilationError(RuntimeError):
+    def __init__(self, message: str, sources: Set[str]) -> None:
+        super().__init__(message)
+        # std-json keys of the sources vyper reported errors for
+        self.sources = sources
 
 
 @dataclass(frozen=True)
@@ -99,22 +124,6 @@ def _specifier_from_version_spec(spec: str) -> SpecifierSet:
     return SpecifierSet(raw)
 
 
-def _fetch_pypi_versions(package: str, *, timeout_s: int = 10) -> List[Version]:
-    with urlopen(f"https://pypi.org/pypi/{package}/json", timeout=timeout_s) as resp:
-        payload = json.loads(resp.read().decode("utf-8"))
-    versions: List[Version] = []
-    for v in payload.get("releases", {}).keys():
-        try:
-            ver = Version(v)
-        except InvalidVersion:
-            continue
-        # Skip pre/dev by default: for compiler selection, stable is preferable.
-        if ver.is_prerelease or ver.is_devrelease:
-            continue
-        versions.append(ver)
-    return sorted(set(versions))
-
-
 def resolve_vyper_version(spec: Optional[str], *, allow_network: bool = True) -> Optional[str]:
     if not spec:
         return None
@@ -127,10 +136,9 @@ def resolve_vyper_version(spec: Optional[str], *, allow_network: bool = True) ->
     if str(wanted).startswith("=="):
         return str(wanted).replace("==", "", 1).strip()
 
-    if not allow_network:
+    versions = compiler_versions().available_vyper(allow_network=allow_network)
+    if not versions:
         return spec
-
-    versions = _fetch_pypi_versions("vyper")
     best: Optional[Version] = None
     for v in versions:
         if v in wanted:
@@ -138,10 +146,11 @@ def resolve_vyper_version(spec: Optional[str], *, allow_network: bool = True) ->
     return best.public if best else spec
 
 
-def ensure_vyper_binary(version: str, *, cache_dir: Path) -> Path:
+def ensure_vyper_binary(version: str, *, cache_dir: Path, find_links: Optional[Path] = None) -> Path:
     """
     Ensure a `vyper` executable for a given version exists.
     Implementation: a dedicated venv per version under cache_dir.
+    With find_links, vyper and its dependencies are installed from the wheels of that directory only (no network).
     """
     env_dir = cache_dir / "vyper" / version
     vyper_bin = env_dir / "bin" / "vyper"
@@ -152,8 +161,9 @@ def ensure_vyper_binary(version: str, *, cache_dir: Path) -> Path:
     venv.EnvBuilder(with_pip=True, clear=False).create(env_dir)
 
     py = env_dir / "bin" / "python"
+    index_args = ["--no-index", "--find-links", str(find_links)] if find_links is not None else []
     res = subprocess.run(
-        [str(py), "-m", "pip", "install", f"vyper=={version}"],
+        [str(py), "-m", "pip", "install", *index_args, f"vyper=={version}"],
         stdout=subprocess.PIPE,
         stderr=subprocess.STDOUT,
         check=False,
@@ -222,35 +232,150 @@ def compile_vyper_standard_json(
     *,
     vyper_bin: Path,
     source_override: Optional[str] = None,
+    ast_only: bool = True,
 ) -> Dict[str, Any]:
     source = source_override if source_override is not None else source_path.read_text(encoding="utf8")
-    std = json.loads(json.dumps(_VYPER_STD_JSON))  # deep copy
     # Use a stable short key to avoid path normalization issues across vyper versions.
-    key = source_path.name
-    std["sources"][key] = {"content": source}
+    return compile_vyper_sources({source_path.name: source}, vyper_bin=vyper_bin, ast_only=ast_only)
 
-    proc = subprocess.run(
-        [str(vyper_bin), "--standard-json"],
-        input=json.dumps(std).encode("utf-8"),
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        check=False,
-    )
-    out = proc.stdout.decode("utf-8", errors="replace").strip()
-    try:
-        artifacts = json.loads(out) if out else {}
-    except json.JSONDecodeError:
-        stderr = proc.stderr.decode("utf-8", errors="replace")
-        raise RuntimeError(f"vyper did not return JSON.\nstdout:\n{out}\nstderr:\n{stderr}") from None
+
+class VyperWorker:
+    """
+    Client of a vyper_worker.py process, run by the Python of a vyper venv: vyper is imported once
+    for all the compiles. The process is started on demand, and started again after a crash or its
+    idle shutdown.
+    """
+
+    def __init__(self, python: Path, idle_timeout_s: float = VYPER_WORKER_IDLE_TIMEOUT_S) -> None:
+        self.python = python
+        self.idle_timeout_s = idle_timeout_s
+        # Process that owns the pipes (a forked child must start its own worker)
+        self.owner_pid = os.getpid()
+        self._proc: Optional[subprocess.Popen] = None
+
+    def _process(self) -> subprocess.Popen:
+        if self._proc is None or self._proc.poll() is not None:
+            self._proc = subprocess.Popen(
+                [str(self.python), "-I", str(_WORKER_SCRIPT), str(self.idle_timeout_s)],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+        return self._proc
+
+    def compile(self, std_input: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Output of `vyper --standard-json` for std_input. A request that gets no answer (the worker
+        died, or shut down meanwhile) is sent once more to a new worker; raise VyperWorkerError if
+        that fails too, or if the worker could not compile.
+        """
+        payload = json.dumps(std_input).encode("utf-8")
+        error: Optional[Exception] = None
+        for _ in range(2):
+            proc = self._process()
+            assert proc.stdin is not None and proc.stdout is not None
+            try:
+                proc.stdin.write(_FRAME_HEADER.pack(len(payload)) + payload)
+                proc.stdin.flush()
+                header = proc.stdout.read(_FRAME_HEADER.size)
+                if len(header) != _FRAME_HEADER.size:
+                    raise EOFError("the worker exited")
+                size = _FRAME_HEADER.unpack(header)[0]
+                body = proc.stdout.read(size)
+                if len(body) != size:
+                    raise EOFError("the worker exited")
+                response = json.loads(body)
+            except (OSError, EOFError, ValueError) as e:
+                error = e
+                self.close()
+                continue
+            if "error" in response:
+                raise VyperWorkerError(response["error"])
+            return response["output"]
+        raise VyperWorkerError(f"vyper worker {self.python}: {error}")
+
+    def close(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            # EOF: the worker exits
+            assert proc.stdin is not None
+            proc.stdin.close()
+            proc.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            proc.kill()
+            proc.wait()
+        finally:
+            if proc.stdout is not None:
+                proc.stdout.close()
+
+
+_vyper_workers: Dict[Path, VyperWorker] = {}
+
+
+def vyper_worker(vyper_bin: Path) -> Optional[VyperWorker]:
+    """
+    Shared worker of the venv of vyper_bin, None if there is no Python next to it
+    """
+    python = vyper_bin.with_name("python")
+    if not python.is_file():
+        return None
+    worker = _vyper_workers.get(python)
+    if worker is None or worker.owner_pid != os.getpid():
+        worker = _vyper_workers[python] = VyperWorker(python)
+    return worker
+
+
+@atexit.register
+def close_vyper_workers() -> None:
+    for worker in _vyper_workers.values():
+        if worker.owner_pid == os.getpid():
+            worker.close()
+    _vyper_workers.clear()
+
+
+def compile_vyper_sources(sources: Dict[str, str], *, vyper_bin: Path, ast_only: bool = True) -> Dict[str, Any]:
+    """
+    Compile the sources (std-json key -> content) in one `vyper --standard-json` run, on the warm
+    worker of the venv when there is one (see vyper_worker).
+    Raise VyperCompilationError if any of them fails (vyper stops at the first error).
+    """
+    std_input = _vyper_standard_json_input(sources, ast_only=ast_only)
+    artifacts: Optional[Dict[str, Any]] = None
+    worker = vyper_worker(vyper_bin)
+    if worker is not None:
+        try:
+            artifacts = worker.compile(std_input)
+        except VyperWorkerError:
+            # Compiled again by the vyper CLI, which reports the errors as before
+            artifacts = None
+
+    if artifacts is None:
+        proc = subprocess.run(
+            [str(vyper_bin), "--standard-json"],
+            input=json.dumps(std_input).encode("utf-8"),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            check=False,
+        )
+        out = proc.stdout.decode("utf-8", errors="replace").strip()
+        try:
+            artifacts = json.loads(out) if out else {}
+        except json.JSONDecodeError:
+            stderr = proc.stderr.decode("utf-8", errors="replace")
+            raise RuntimeError(f"vyper did not return JSON.\nstdout:\n{out}\nstderr:\n{stderr}") from None
 
     diagnostics = artifacts.get("errors") or []
     errors: List[str] = []
+    failed: Set[str] = set()
     for diag in diagnostics:
         if diag.get("severity") == "warning":
             continue
         errors.append(diag.get("formattedMessage") or diag.get("message") or str(diag))
+        failed.add(str((diag.get("sourceLocation") or {}).get("file")))
     if errors:
-        raise RuntimeError("\n\n".join(errors))
+        raise VyperCompilationError("\n\n".join(errors), failed)
     return artifacts
 
 
@@ -540,6 +665,50 @@ def extract_vyper_functions_and_calls_from_source(
     return groups
 
 
+def _vyper_version_candidates(spec: Optional[str], resolved: Optional[str], *, allow_network: bool) -> List[str]:
+    candidates: List[str] = []
+
+    if resolved:
+        try:
+            candidates.append(Version(resolved).public)
+        except InvalidVersion:
+            pass
+
+    # If the source pins an older version that can't be installed on the current Python,
+    # try the newest patch versions in the same minor series (e.g. 0.3.x).
+    if allow_network and spec:
+        try:
+            pinned = Version(str(spec).lstrip("^v"))
+            same_minor = [
+                v for v in compiler_versions().available_vyper() if (v.major, v.minor) == (pinned.major, pinned.minor)
+            ]
+            # Try newest first; limit to keep it fast.
+            for v in reversed(same_minor[-10:]):
+                if v.public not in candidates:
+                    candidates.append(v.public)
+        except Exception:
+            pass
+
+    return candidates
+
+
+def vyper_version_for_source(
+    source: str, *, vyper_version: Optional[str] = None, allow_network: bool = True
+) -> Optional[str]:
+    """
+    Version preprocess_vyper_file tries first for source (None: the `vyper` of the PATH is used)
+    """
+    spec = vyper_version or detect_vyper_version_spec(source)
+    candidates = _vyper_version_candidates(
+        spec, resolve_vyper_version(spec, allow_network=allow_network), allow_network=allow_network
+    )
+    return candidates[0] if candidates else None
+
+
+def default_cache_root() -> Path:
+    return Path(os.environ.get("CONTRACT_PREPROCESS_CACHE", Path.home() / ".cache")) / "contract-preprocess"
+
+
 def preprocess_vyper_file(
     source_path: Path,
     *,
@@ -554,33 +723,7 @@ def preprocess_vyper_file(
     spec = vyper_version or detect_vyper_version_spec(source)
     resolved = resolve_vyper_version(spec, allow_network=allow_network)
 
-    def best_effort_vyper_versions() -> List[str]:
-        candidates: List[str] = []
-
-        if resolved:
-            try:
-                candidates.append(Version(resolved).public)
-            except InvalidVersion:
-                pass
-
-        # If the source pins an older version that can't be installed on the current Python,
-        # try the newest patch versions in the same minor series (e.g. 0.3.x).
-        if allow_network and spec:
-            try:
-                pinned = Version(str(spec).lstrip("^v"))
-                same_minor = [
-                    v for v in _fetch_pypi_versions("vyper") if (v.major, v.minor) == (pinned.major, pinned.minor)
-                ]
-                # Try newest first; limit to keep it fast.
-                for v in reversed(same_minor[-10:]):
-                    if v.public not in candidates:
-                        candidates.append(v.public)
-            except Exception:
-                pass
-
-        return candidates
-
-    cache_root = cache_dir or Path(os.environ.get("CONTRACT_PREPROCESS_CACHE", Path.home() / ".cache")) / "contract-preprocess"
+    cache_root = cache_dir or default_cache_root()
 
     artifacts: Optional[Dict[str, Any]] = None
     used_version: Optional[str] = None
@@ -588,7 +731,7 @@ def preprocess_vyper_file(
 
     if auto_install:
         last_error: Optional[Exception] = None
-        for v in best_effort_vyper_versions():
+        for v in _vyper_version_candidates(spec, resolved, allow_network=allow_network):
             try:
                 vyper_bin = ensure_vyper_binary(v, cache_dir=cache_root)
                 patched_source = rewrite_vyper_version_directive(source, v)
@@ -613,6 +756,97 @@ def preprocess_vyper_file(
         except Exception as e:  # pylint: disable=broad-except
             compile_error = e
 
+    return _vyper_result(
+        source_path,
+        source,
+        artifacts,
+        version=used_version or (resolved or spec),
+        compile_error=compile_error,
+        include_external_calls=include_external_calls,
+        include_solidity_calls=include_solidity_calls,
+    )
+
+
+def preprocess_vyper_files(
+    source_paths: Sequence[Path],
+    *,
+    vyper_version: Optional[str],
+    cache_dir: Optional[Path] = None,
+    allow_network: bool = True,
+    auto_install: bool = True,
+    include_external_calls: bool = True,
+    include_solidity_calls: bool = False,
+) -> Dict[Path, Dict[str, Any]]:
+    """
+    preprocess_vyper_file of several files, with one `vyper --standard-json` run per compiler version:
+    the files whose first candidate version is the same are compiled together.
+    Only the files of the batches that compiled are returned; use preprocess_vyper_file for the others
+    (it tries the other candidate versions and the fallbacks, as for a single file).
+    """
+    if not auto_install:
+        return {}
+    cache_root = cache_dir or default_cache_root()
+
+    # version -> [(path, patched source)]
+    batches: Dict[str, List[Tuple[Path, str]]] = {}
+    for source_path in source_paths:
+        try:
+            source = source_path.read_text(encoding="utf8")
+        except OSError:
+            continue
+        version = vyper_version_for_source(source, vyper_version=vyper_version, allow_network=allow_network)
+        if version is not None:
+            batches.setdefault(version, []).append((source_path, source))
+
+    results: Dict[Path, Dict[str, Any]] = {}
+    for version, batch in batches.items():
+        # One directory per file: a file can neither clash with nor import (as an interface) another one
+        keyed = {f"{i}/{source_path.name}": (source_path, source) for i, (source_path, source) in enumerate(batch)}
+        artifacts: Optional[Dict[str, Any]] = None
+        # A file that fails is left to preprocess_vyper_file, the others are compiled again without it
+        while len(keyed) > 1 and artifacts is None:
+            try:
+                vyper_bin = ensure_vyper_binary(version, cache_dir=cache_root)
+                artifacts = compile_vyper_sources(
+                    {key: rewrite_vyper_version_directive(source, version) for key, (_, source) in keyed.items()},
+                    vyper_bin=vyper_bin,
+                )
+            except VyperCompilationError as e:
+                if not e.sources or not e.sources <= keyed.keys():
+                    break
+                for key in e.sources:
+                    del keyed[key]
+            except Exception:  # pylint: disable=broad-except
+                break
+        if artifacts is None:
+            continue
+        for key, (source_path, source) in keyed.items():
+            file_artifacts = {
+                "sources": {key: (artifacts.get("sources") or {}).get(key, {})},
+                "contracts": {key: (artifacts.get("contracts") or {}).get(key, {})},
+            }
+            results[source_path] = _vyper_result(
+                source_path,
+                source,
+                file_artifacts,
+                version=version,
+                compile_error=None,
+                include_external_calls=include_external_calls,
+                include_solidity_calls=include_solidity_calls,
+            )
+    return results
+
+
+def _vyper_result(
+    source_path: Path,
+    source: str,
+    artifacts: Optional[Dict[str, Any]],
+    *,
+    version: Optional[str],
+    compile_error: Optional[Exception],
+    include_external_calls: bool,
+    include_solidity_calls: bool,
+) -> Dict[str, Any]:
     # Best-effort contract name: file stem.
     contract_name = source_path.stem
 
@@ -625,7 +859,7 @@ def preprocess_vyper_file(
         )
         return {
             "contract_name": contract_name,
-            "compiler": {"name": "vyper", "version": used_version or (resolved or spec), "mode": "source"},
+            "compiler": {"name": "vyper", "version": version, "mode": "source"},
             "functions": functions,
             "warning": str(compile_error) if compile_error else "vyper compilation failed; used source parser",
         }
@@ -647,6 +881,6 @@ def preprocess_vyper_file(
 
     return {
         "contract_name": contract_name,
-        "compiler": {"name": "vyper", "version": used_version or (resolved or spec)},
+        "compiler": {"name": "vyper", "version": version},
         "functions": functions,
     }
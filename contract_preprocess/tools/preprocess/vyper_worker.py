@@ -0,0 +1,68 @@
+"""
+Long-lived `vyper --standard-json`, run by the Python of a vyper venv (see vyper_support.VyperWorker):
+
+    <venv>/bin/python -I vyper_worker.py <idle timeout in seconds>
+
+vyper is imported once, then each request is compiled as `vyper --standard-json` would.
+Frames on stdin/stdout: a 4 bytes big-endian length, then as many bytes of UTF-8 JSON.
+    request:  the standard-json input
+    response: {"output": <standard-json output>} or {"error": <traceback>}
+The worker exits on EOF, or once idle for the timeout.
+
+Standalone on purpose (the standard library and vyper only): contract_preprocess is not installed in the venvs.
+"""
+import json
+import os
+import select
+import struct
+import sys
+import traceback
+
+_HEADER = struct.Struct(">I")
+
+
+def _read_exact(fd, size):
+    chunks = []
+    while size:
+        chunk = os.read(fd, size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _write_frame(fd, payload):
+    data = _HEADER.pack(len(payload)) + payload
+    while data:
+        data = data[os.write(fd, data) :]
+
+
+def main():
+    idle_timeout = float(sys.argv[1]) if len(sys.argv) > 1 else None
+    stdin = sys.stdin.fileno()
+    # Whatever vyper prints must not end up in the frames: they get their own copy of stdout, and stdout goes to stderr
+    stdout = os.dup(sys.stdout.fileno())
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    from vyper.cli.vyper_json import compile_json, exc_handler_to_dict  # pylint: disable=import-outside-toplevel
+
+    while True:
+        if idle_timeout is not None and not select.select([stdin], [], [], idle_timeout)[0]:
+            return
+        header = _read_exact(stdin, _HEADER.size)
+        if header is None:
+            return
+        request = _read_exact(stdin, _HEADER.unpack(header)[0])
+        if request is None:
+            return
+        try:
+            output = compile_json(request.decode("utf-8"), exc_handler_to_dict, None, "<stdin>")
+            response = {"output": output}
+        except Exception:  # pylint: disable=broad-except
+            response = {"error": traceback.format_exc()}
+        _write_frame(stdout, json.dumps(response, sort_keys=True, default=str).encode("utf-8"))
+
+
+if __name__ == "__main__":
+    main()
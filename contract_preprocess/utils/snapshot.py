@@ -0,0 +1,261 @@
+"""
+Snapshots of analyzed ContractPreprocess objects (contracts, functions, nodes, IR, SSA).
+
+A snapshot file is:
+    - a magic line,
+    - a JSON header line: version stamp, and the hash of every analyzed source,
+    - a pickle stream of the objects.
+The header is checked before anything is unpickled: a snapshot written by another format
+or tool version, or whose sources changed on disk, is rejected with a SnapshotError.
+"""
+import gc
+import hashlib
+import json
+import os
+import pickle
+import sys
+from enum import Enum
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+from contract_preprocess.exceptions import PreprocessError
+from contract_preprocess.utils.tool_version import tool_version
+
+if TYPE_CHECKING:
+    from contract_preprocess.contract_preprocess import ContractPreprocess
+
+SNAPSHOT_FORMAT = 2
+
+_MAGIC = b"contract-preprocess-snapshot\n"
+
+# Module prefix of the model classes, whose objects are written breadth first
+_PACKAGE = "contract_preprocess."
+
+
+class SnapshotError(PreprocessError):
+    pass
+
+
+def snapshot_stamp() -> Dict[str, Any]:
+    """
+    Everything the pickled objects depend on, besides the sources
+    """
+    return {
+        "format": SNAPSHOT_FORMAT,
+        # Package version and sources hash: the pickled classes change with the code
+        "tool": tool_version(),
+        "python": f"{sys.version_info.major}.{sys.version_info.minor}",
+        "pickle": pickle.HIGHEST_PROTOCOL,
+    }
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf8")).hexdigest()
+
+
+def _sources(instances: Sequence["ContractPreprocess"]) -> Dict[str, str]:
+    ret: Dict[str, str] = {}
+    for instance in instances:
+        if instance.crytic_compile is None:
+            continue
+        for filename, content in instance.crytic_compile.src_content.items():
+            ret[filename] = _sha256(content)
+    return ret
+
+
+def _changed_sources(sources: Dict[str, str]) -> List[str]:
+    """
+    Sources whose content on disk differs from the snapshot.
+    Files that do not exist (e.g. loaded from an archive) cannot be checked and are not reported.
+    """
+    changed = []
+    for filename, digest in sources.items():
+        if not os.path.isfile(filename):
+            continue
+        # Same reading as CryticCompile.src_content
+        with open(filename, encoding="utf8") as f:
+            if _sha256(f.read()) != digest:
+                changed.append(filename)
+    return changed
+
+
+def _hash_depends_on_state(value: Any) -> bool:
+    """
+    True if hash(value) reads attributes of a model object (Contract, Structure, types, ...)
+    """
+    cls = type(value)
+    if cls is str:
+        return False
+    if isinstance(value, tuple):
+        return any(_hash_depends_on_state(v) for v in value)
+    return cls.__hash__ is not object.__hash__ and cls.__module__.startswith(_PACKAGE) and not isinstance(value, Enum)
+
+
+def _set_state(obj: Any, state: Any) -> None:
+    """
+    Same as the BUILD opcode of pickle
+    """
+    setstate = getattr(type(obj), "__setstate__", None)
+    if setstate is not None:
+        setstate(obj, state)
+        return
+    slotstate = None
+    if isinstance(state, tuple) and len(state) == 2:
+        state, slotstate = state
+    if state:
+        obj.__dict__.update(state)
+    if slotstate:
+        for key, value in slotstate.items():
+            setattr(obj, key, value)
+
+
+class _Pickler(pickle.Pickler):
+    """
+    Writes the model breadth first: an object of the package is written as its creation only (e.g. cls.__new__(cls)),
+    and its state is queued for a later dump() (see save_snapshot). The nesting of the stream is then the nesting of
+    the containers, not the depth of the graph (node -> sons -> ...), which would overflow the stack.
+
+    Sets and dicts keyed by objects whose hash depends on their state are written empty, and filled once every
+    object was loaded: hashing an object whose state is not set yet would fail. The C pickler does not call
+    reducer_override for the builtin set and dict: they are caught by persistent_id, and loaded by _Unpickler.
+    """
+
+    def __init__(self, file: Any) -> None:
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        # (object, state, list items, dict items) of the objects written without their state
+        self.states: List[Tuple[Any, Any, Optional[List[Any]], Optional[List[Any]]]] = []
+        # (container, items) of the containers written empty
+        self.deferred: List[Tuple[Any, List[Any]]] = []
+        # id -> (persistent id, container) of the builtin containers written empty (kept alive: ids are not reused)
+        self._empty: Dict[int, Tuple[Tuple[bool, int], Any]] = {}
+
+    def persistent_id(self, obj: Any) -> Optional[Tuple[bool, int]]:
+        cls = type(obj)
+        if cls is not set and cls is not dict:
+            return None
+        known = self._empty.get(id(obj))
+        if known is not None:
+            return known[0]
+        if not any(_hash_depends_on_state(v) for v in obj):
+            return None
+        pid = (cls is set, len(self._empty))
+        self._empty[id(obj)] = (pid, obj)
+        self.deferred.append((obj, list(obj) if cls is set else list(obj.items())))
+        return pid
+
+    def reducer_override(self, obj: Any) -> Any:
+        in_package = type(obj).__module__.startswith(_PACKAGE)
+        if not in_package and not isinstance(obj, dict):
+            return NotImplemented
+        rv = obj.__reduce_ex__(pickle.HIGHEST_PROTOCOL)
+        if isinstance(rv, str):
+            return NotImplemented
+        func, args, state, listitems, dictitems, state_setter = rv + (None,) * (6 - len(rv))
+        if in_package and state_setter is None:
+            if state is None and listitems is None and dictitems is None:
+                return NotImplemented
+            self.states.append(
+                (
+                    obj,
+                    state,
+                    None if listitems is None else list(listitems),
+                    None if dictitems is None else list(dictitems),
+                )
+            )
+            return func, args
+        # dict subclasses of other packages (defaultdict, OrderedDict, ...)
+        if dictitems is not None and any(_hash_depends_on_state(k) for k in obj):
+            self.deferred.append((obj, list(obj.items())))
+            return func, args, state, listitems, None, state_setter
+        return NotImplemented
+
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, file: Any) -> None:
+        super().__init__(file)
+        self._empty: Dict[Tuple[bool, int], Any] = {}
+
+    def persistent_load(self, pid: Tuple[bool, int]) -> Any:
+        container = self._empty.get(pid)
+        if container is None:
+            container = self._empty[pid] = set() if pid[0] else {}
+        return container
+
+
+def save_snapshot(instances: Sequence["ContractPreprocess"], path: Path) -> None:
+    """
+    Write the analyzed instances to path
+    """
+    header = {"stamp": snapshot_stamp(), "sources": _sources(instances)}
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+
+    try:
+        with open(tmp, "wb") as f:
+            f.write(_MAGIC)
+            f.write(json.dumps(header, sort_keys=True).encode("utf8") + b"\n")
+            pickler = _Pickler(f)
+            pickler.dump(list(instances))
+            # One batch per level of the graph: the states and items written reach new objects
+            while pickler.states or pickler.deferred:
+                batch = (pickler.states, pickler.deferred)
+                pickler.states, pickler.deferred = [], []
+                pickler.dump(batch)
+            pickler.dump(None)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def load_snapshot(path: Path, check_sources: bool = True) -> List["ContractPreprocess"]:
+    """
+    Load the instances saved by save_snapshot.
+    Raise SnapshotError if the snapshot was written with another stamp, or (check_sources)
+    if one of its sources changed since.
+    """
+    path = Path(path)
+    with open(path, "rb") as f:
+        if f.readline() != _MAGIC:
+            raise SnapshotError(f"{path} is not a contract-preprocess snapshot")
+        header = json.loads(f.readline())
+        if header.get("stamp") != snapshot_stamp():
+            raise SnapshotError(
+                f"Stale snapshot {path}: written by {header.get('stamp')}, expected {snapshot_stamp()}"
+            )
+        if check_sources:
+            changed = _changed_sources(header.get("sources", {}))
+            if changed:
+                raise SnapshotError(f"Stale snapshot {path}: {', '.join(changed)} changed")
+
+        # Disabling the gc avoids collections triggered by the many new objects, which find nothing to free
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            unpickler = _Unpickler(f)
+            instances = unpickler.load()
+            items: List[Tuple[Any, Optional[List[Any]], Optional[List[Any]]]] = []
+            deferred: List[Tuple[Any, List[Any]]] = []
+            batch = unpickler.load()
+            while batch is not None:
+                states, batch_deferred = batch
+                for obj, state, listitems, dictitems in states:
+                    if state is not None:
+                        _set_state(obj, state)
+                    if listitems is not None or dictitems is not None:
+                        items.append((obj, listitems, dictitems))
+                deferred += batch_deferred
+                batch = unpickler.load()
+        finally:
+            if gc_enabled:
+                gc.enable()
+    # Every object has its state: hashing is now safe (SymbolTable also needs the state of its SymbolIndex)
+    for obj, listitems, dictitems in items:
+        if listitems is not None:
+            obj.extend(listitems)
+        for key, value in dictitems or ():
+            obj[key] = value
+    for container, container_items in deferred:
+        container.update(container_items)
+    return instances
@@ -0,0 +1,40 @@
+"""
+Version stamp of the running contract_preprocess, for the artifacts reused across runs
+(snapshots, cached results, manifest entries).
+
+The package version is only bumped on releases: the stamp also has a hash of the package sources,
+so that any code change invalidates what an older build wrote.
+"""
+import hashlib
+from functools import lru_cache
+from pathlib import Path
+
+_PACKAGE_DIR = Path(__file__).resolve().parent.parent
+
+
+def package_version() -> str:
+    try:
+        from importlib.metadata import version  # pylint: disable=import-outside-toplevel
+
+        return version("contract-preprocess")
+    except Exception:  # pylint: disable=broad-except
+        return "unknown"
+
+
+@lru_cache(maxsize=None)
+def sources_digest() -> str:
+    """
+    sha256 of the package's Python sources (relative paths + contents)
+    """
+    h = hashlib.sha256()
+    for path in sorted(_PACKAGE_DIR.rglob("*.py")):
+        h.update(path.relative_to(_PACKAGE_DIR).as_posix().encode("utf8") + b"\0")
+        h.update(hashlib.sha256(path.read_bytes()).digest())
+    return h.hexdigest()
+
+
+def tool_version() -> str:
+    """
+    <package version>+<16 first hex digits of the sources digest>
+    """
+    return f"{package_version()}+{sources_digest()[:16]}"
@@ -62,19 +62,28 @@ class VyperCompilationUnit:
 
         self._convert_to_ir()
 
-        compute_dependency(self._compilation_unit)
+        # With analysis_level="calls", computed with the SSA, on first use
+        if not self._compilation_unit.is_ssa_pending:
+            compute_dependency(self._compilation_unit)
 
         self._analyzed = True
 
     def _convert_to_ir(self) -> None:
+        # analysis_level="calls": the SSA is generated on first use (CompilationUnitWrapper.generate_ssa)
+        defer_ssa = self._compilation_unit.core.analysis_level == "calls"
         for contract in self._compilation_unit.contracts:
             contract.add_constructor_variables()
             for func in contract.functions:
                 func.generate_ir_and_analyze()
 
-            contract.convert_expression_to_ir_ssa()
-
-        self._compilation_unit.propagate_function_calls()
-        for contract in self._compilation_unit.contracts:
-            contract.fix_phi()
-            contract.update_read_write_using_ssa()
+            if not defer_ssa:
+                contract.convert_expression_to_ir_ssa()
+
+        if defer_ssa:
+            self._compilation_unit.defer_ssa()
+        else:
+            self._compilation_unit.propagate_function_calls()
+            for contract in self._compilation_unit.contracts:
+                contract.fix_phi()
+                contract.update_read_write_using_ssa()
+        self._compilation_unit.set_is_ir_generated(True)